@@ -0,0 +1,62 @@
+# Benchmark: per-section encode loop vs one batched encode per resume
+# Run from smartPitchBackend/: python -m app.bench_batch_encode
+import time
+import random
+from app.utils.embedding_model import get_embedding_model, encode_sections, DEFAULT_EMBEDDING_MODEL
+
+WORDS = (
+    "python sql machine learning data pipelines fastapi react docker kubernetes "
+    "aws spark pandas numpy deep learning nlp transformers dashboards analytics "
+    "designed built deployed optimized led team production scalable api services"
+).split()
+
+SECTION_NAMES = [
+    "summary", "education", "experience", "skills", "projects",
+    "certifications", "profile", "objective", "contact", "links",
+]
+
+
+def make_resume(rng: random.Random) -> dict:
+    """Synthetic resume with ten sections of varying chunk counts and lengths."""
+    resume = {}
+    for name in SECTION_NAMES:
+        chunk_count = rng.randint(1, 8)
+        resume[name] = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 60)))
+            for _ in range(chunk_count)
+        ]
+    return resume
+
+
+def bench_per_section(resumes, model_name):
+    embedder = get_embedding_model(model_name)
+    start = time.perf_counter()
+    for resume in resumes:
+        for texts in resume.values():
+            embedder.encode(texts, convert_to_numpy=True)
+    return time.perf_counter() - start
+
+
+def bench_batched(resumes, model_name):
+    start = time.perf_counter()
+    for resume in resumes:
+        encode_sections(resume, model_name)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    resumes = [make_resume(rng) for _ in range(50)]
+    chunk_total = sum(len(texts) for resume in resumes for texts in resume.values())
+
+    # Load the model and warm up kernels before timing
+    get_embedding_model(DEFAULT_EMBEDDING_MODEL)
+    encode_sections(resumes[0], DEFAULT_EMBEDDING_MODEL)
+
+    loop_seconds = bench_per_section(resumes, DEFAULT_EMBEDDING_MODEL)
+    batch_seconds = bench_batched(resumes, DEFAULT_EMBEDDING_MODEL)
+
+    print(f"Resumes: {len(resumes)}, sections each: {len(SECTION_NAMES)}, chunks: {chunk_total}")
+    print(f"Per-section encode: {loop_seconds:.2f}s ({len(resumes) / loop_seconds:.1f} resumes/s)")
+    print(f"Batched encode:     {batch_seconds:.2f}s ({len(resumes) / batch_seconds:.1f} resumes/s)")
+    print(f"Speedup: {loop_seconds / batch_seconds:.2f}x")
@@ -0,0 +1,70 @@
+# Benchmark: OTP email per request (connect, send, quit inside the handler) vs the pooled background queue
+# Runs against the local SMTP stand-in; the connect delay stands in for TLS + AUTH to a real provider.
+# Run from smartPitchBackend/: python -m app.bench_mail_delivery
+import time
+from app.utils.smtp_standin import LocalSMTPServer
+from app.utils.mail_delivery import MailDelivery, SMTPConnection
+
+MESSAGES = 200
+CONNECT_DELAY = 0.05    # seconds per new SMTP session
+MESSAGE_DELAY = 0.002   # seconds per message on the server
+POOL_SIZE = 2
+MESSAGE = "Subject: Your SmartPitch OTP Code\r\n\r\nYour OTP code is: 123456\r\n"
+
+
+def connection_factory(port: int):
+    return lambda: SMTPConnection(host="127.0.0.1", port=port, username="", password="", starttls=False)
+
+
+def per_request(port: int):
+    """Previous behaviour: every request opens its own session and waits for the send."""
+    latencies = []
+    for idx in range(MESSAGES):
+        start = time.perf_counter()
+        connection = connection_factory(port)()
+        connection.send("noreply@smartpitch.local", [f"user{idx}@example.com"], MESSAGE)
+        connection.close()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def queued(port: int):
+    """Requests only enqueue; POOL_SIZE senders deliver over persistent sessions."""
+    delivery = MailDelivery(pool_size=POOL_SIZE, queue_size=MESSAGES, connection_factory=connection_factory(port))
+    delivery.start()
+    latencies = []
+    start_all = time.perf_counter()
+    for idx in range(MESSAGES):
+        start = time.perf_counter()
+        assert delivery.enqueue("noreply@smartpitch.local", [f"user{idx}@example.com"], MESSAGE)
+        latencies.append(time.perf_counter() - start)
+    delivery.join()
+    drained = time.perf_counter() - start_all
+    stats = delivery.stats()
+    delivery.stop()
+    return latencies, drained, stats
+
+
+def p95(values):
+    return sorted(values)[int(len(values) * 0.95)]
+
+
+if __name__ == "__main__":
+    server = LocalSMTPServer(connect_delay=CONNECT_DELAY, message_delay=MESSAGE_DELAY, keep_messages=False).start()
+    try:
+        start = time.perf_counter()
+        sync_latencies = per_request(server.port)
+        sync_total = time.perf_counter() - start
+        sync_connections = server.counters["connections"]
+
+        queued_latencies, drained, stats = queued(server.port)
+        assert stats["sent"] == MESSAGES and stats["failed"] == 0
+        pooled_connections = server.counters["connections"] - sync_connections
+    finally:
+        server.stop()
+
+    print(f"Messages: {MESSAGES}, session setup: {CONNECT_DELAY * 1000:.0f} ms, per message: {MESSAGE_DELAY * 1000:.0f} ms")
+    print(f"Per request:  handler p95 {p95(sync_latencies) * 1000:8.2f} ms, all sent in {sync_total:6.2f} s, "
+          f"{sync_connections} sessions")
+    print(f"Queue + pool: handler p95 {p95(queued_latencies) * 1000:8.2f} ms, all sent in {drained:6.2f} s, "
+          f"{pooled_connections} sessions, delivery p95 {stats['delivery_ms_p95']:.0f} ms")
@@ -0,0 +1,60 @@
+# Benchmark: recall@k of float16 / int8 embedding storage against float32
+# Run from smartPitchBackend/: python -m app.bench_quantization
+import time
+import numpy as np
+from app.utils.vector_quantization import quantize_embeddings, STORAGE_MODES
+
+DIM = 384            # all-MiniLM-L6-v2 output size
+CORPUS_SIZE = 20000
+QUERY_COUNT = 500
+TOPICS = 200
+K_VALUES = (1, 5, 10)
+
+
+def make_corpus(rng: np.random.Generator):
+    """
+    Synthetic corpus with topical structure similar to resume chunks:
+    vectors are noisy copies of topic centroids, so many neighbours are close.
+    """
+    centroids = rng.standard_normal((TOPICS, DIM)).astype(np.float32)
+    topic_ids = rng.integers(0, TOPICS, CORPUS_SIZE)
+    corpus = centroids[topic_ids] + 0.6 * rng.standard_normal((CORPUS_SIZE, DIM)).astype(np.float32)
+    query_topics = rng.integers(0, TOPICS, QUERY_COUNT)
+    queries = centroids[query_topics] + 0.6 * rng.standard_normal((QUERY_COUNT, DIM)).astype(np.float32)
+    return corpus, queries
+
+
+def cosine_matrix(queries: np.ndarray, stored: np.ndarray) -> np.ndarray:
+    rows = stored.astype(np.float32)
+    rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return q @ rows.T
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def recall_at_k(exact: np.ndarray, approx: np.ndarray, k: int) -> float:
+    hits = sum(len(set(e) & set(a)) for e, a in zip(top_k(exact, k), top_k(approx, k)))
+    return hits / (k * len(exact))
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(7)
+    corpus, queries = make_corpus(rng)
+    exact_scores = cosine_matrix(queries, corpus)
+
+    print(f"Corpus: {CORPUS_SIZE} x {DIM}, queries: {QUERY_COUNT}")
+    print(f"{'mode':<8} {'bytes/vec':>10} {'score ms':>9} " + " ".join(f"{'R@' + str(k):>7}" for k in K_VALUES))
+    for mode in STORAGE_MODES:
+        data, scales = quantize_embeddings(corpus, mode)
+        bytes_per_vector = data.itemsize * DIM + (scales.itemsize if scales is not None else 0)
+
+        start = time.perf_counter()
+        # int8 rows are scored directly: the per-row scale cancels in cosine normalization
+        scores = cosine_matrix(queries, data)
+        score_ms = 1000 * (time.perf_counter() - start)
+
+        recalls = " ".join(f"{recall_at_k(exact_scores, scores, k):>7.4f}" for k in K_VALUES)
+        print(f"{mode:<8} {bytes_per_vector:>10} {score_ms:>9.1f} {recalls}")
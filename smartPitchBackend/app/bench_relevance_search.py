@@ -0,0 +1,57 @@
+# Benchmark: per-row cosine loop (previous relevance_search) vs one matmul + argpartition
+# Run from smartPitchBackend/: python -m app.bench_relevance_search
+import time
+import numpy as np
+from app.utils.upload_jd_utils import cosine_similarity
+from app.utils.search_engine import normalize_rows, similarity_matrix, aggregate_scores, top_k
+
+DIM = 384
+RESUME_CHUNKS = 40      # rows in one resume section
+JD_CHUNKS = 12          # points in one JD section
+TOP_K = 3
+ROUNDS = 2000
+
+
+def loop_first_chunk(jd: np.ndarray, resume: np.ndarray):
+    """Previous behaviour: only jd[0] is scored, one row at a time, full sort."""
+    scores = [(cosine_similarity(jd[0], row), idx) for idx, row in enumerate(resume)]
+    return sorted(scores, key=lambda x: x[0], reverse=True)[:TOP_K]
+
+
+def loop_all_chunks(jd: np.ndarray, resume: np.ndarray):
+    """Same loop extended to every JD chunk (max per resume row), for a like-for-like comparison."""
+    scores = []
+    for idx, row in enumerate(resume):
+        scores.append((max(cosine_similarity(q, row) for q in jd), idx))
+    return sorted(scores, key=lambda x: x[0], reverse=True)[:TOP_K]
+
+
+def matrix_all_chunks(jd: np.ndarray, resume_normalized: np.ndarray):
+    similarities = similarity_matrix(normalize_rows(jd), resume_normalized)
+    return top_k(aggregate_scores(similarities, "max"), TOP_K)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(*args)
+    return (time.perf_counter() - start) / ROUNDS * 1e6, result
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(3)
+    jd = rng.standard_normal((JD_CHUNKS, DIM)).astype(np.float32)
+    resume = rng.standard_normal((RESUME_CHUNKS, DIM)).astype(np.float32)
+    # Stored pre-normalized, as written to the bundle at upload time
+    resume_normalized = normalize_rows(resume)
+
+    first_us, _ = timed(loop_first_chunk, jd, resume)
+    loop_us, loop_result = timed(loop_all_chunks, jd, resume)
+    matrix_us, matrix_result = timed(matrix_all_chunks, jd, resume_normalized)
+
+    assert [idx for _, idx in loop_result] == [idx for idx, _ in matrix_result]
+
+    print(f"JD chunks: {JD_CHUNKS}, resume chunks: {RESUME_CHUNKS}, dim: {DIM}")
+    print(f"Loop, first JD chunk only: {first_us:8.1f} us/section")
+    print(f"Loop, all JD chunks:       {loop_us:8.1f} us/section")
+    print(f"Matmul + argpartition:     {matrix_us:8.1f} us/section ({loop_us / matrix_us:.1f}x vs loop)")
@@ -1,10 +1,29 @@
+from sqlalchemy import inspect, text
 from app.database import Base, engine
 
 # IMPORT ALL YOUR MODELS 
 from app import models  # This imports models.py where all models are defined
 
+def add_missing_columns():
+    """
+    create_all does not alter existing tables: add nullable columns introduced
+    after the table was created (e.g. resumes.content_hash).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    print(f"Added column {table.name}.{column.name}")
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
     print("All tables created or verified.")
 
 if __name__ == "__main__":
@@ -1,11 +1,16 @@
 from app.database import SessionLocal
 from app.models import User
+from app.utils.search_engine import RELEVANCE_BACKEND
 
 def delete_user_by_email(email: str):
     db = SessionLocal()
     try:
         user = db.query(User).filter(User.email == email).first()
         if user:
+            # Drop the user's resume chunks from the shared FAISS index (only maintained for the faiss backend)
+            if RELEVANCE_BACKEND == "faiss":
+                from app.utils.faiss_index import get_resume_index
+                get_resume_index().remove_user(user.user_id)
             db.delete(user)
             db.commit()
             print(f"User with email {email} deleted successfully.")
@@ -0,0 +1,10 @@
+# Standalone resume ingestion worker: python -m app.ingestion_worker
+# Run it (as many copies as needed) with INGESTION_WORKERS=0 on the API to keep ingestion off the API hosts.
+from app.utils.embedding_model import warm_up_models
+from app.utils.ingestion_queue import run_worker
+from app.utils.upload_utils import ingest_resume_job
+
+if __name__ == "__main__":
+    warm_up_models()
+    print("Ingestion worker polling for jobs")
+    run_worker(ingest_resume_job)
@@ -1,7 +1,20 @@
 # main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, upload, upload_jd, draft_email
+from app.routers import auth, upload, upload_jd, draft_email, recruiter
+from app.utils.embedding_model import warm_up_models, get_model_stats
+from app.utils.embedding_cache import get_embedding_cache
+from app.utils.embedding_scheduler import get_scheduler_stats
+from app.utils.faiss_index import get_resume_index
+from app.utils.resume_cache import get_resume_cache
+from app.utils.executors import get_executor_stats, shutdown_executors
+from app.utils.llm_cache import get_llm_cache
+from app.utils.match_gate import get_match_gate
+from app.utils.ingestion_queue import get_ingestion_queue, start_ingestion_workers, stop_ingestion_workers
+from app.utils.speculative_drafts import get_speculative_drafts
+from app.utils.otp_cache import get_otp_store
+from app.utils.auth_principal import get_principal_cache
+from app.utils.mail_delivery import get_mail_delivery, stop_mail_delivery
 
 app = FastAPI()
 
@@ -15,10 +28,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def load_embedding_models():
+    # Load the embedding model once per worker so the first upload doesn't pay for it
+    warm_up_models()
+
+@app.on_event("startup")
+def start_ingestion():
+    # Worker processes draining the background resume ingestion queue
+    start_ingestion_workers()
+
+@app.on_event("shutdown")
+def stop_executors():
+    shutdown_executors()
+    stop_ingestion_workers()
+    # Sends the OTP emails still queued before the worker exits
+    stop_mail_delivery()
+
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
 
+@app.get("/metrics")
+def metrics():
+    return {
+        "embedding_models": get_model_stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "embedding_scheduler": get_scheduler_stats(),
+        "resume_index": get_resume_index().stats(),
+        "resume_cache": get_resume_cache().stats(),
+        "executors": get_executor_stats(),
+        "llm_cache": get_llm_cache().stats(),
+        "match_gate": get_match_gate().stats(),
+        "ingestion_queue": get_ingestion_queue().stats(),
+        "speculative_drafts": get_speculative_drafts().stats(),
+        "otp_store": get_otp_store().stats(),
+        "auth_principals": get_principal_cache().stats(),
+        "mail_delivery": get_mail_delivery().stats(),
+    }
+
 # Include the auth router
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 
@@ -31,4 +79,7 @@ app.include_router(upload_jd.router, prefix="/upload", tags=["jd"])
 # Include draft email endpoint under /upload
 app.include_router(draft_email.router, prefix="/upload", tags=["draft_email"])
 
+# Include the recruiter endpoints (rank all stored resumes against one JD)
+app.include_router(recruiter.router, prefix="/recruiter", tags=["recruiter"])
+
 # uvicorn app.main:app --reload
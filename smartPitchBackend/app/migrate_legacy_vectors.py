@@ -0,0 +1,29 @@
+# One-shot migration of pre-bundle resume vector folders (<section>.json + <section>.npy) to bundles.
+# The API also migrates a folder on first use; this converts every stored resume ahead of time.
+# Run from smartPitchBackend/: python -m app.migrate_legacy_vectors
+from app.database import SessionLocal
+from app.models import VectorMeta
+from app.utils.resume_cache import resolve_vector_folder
+from app.utils.legacy_vectors import has_legacy_vectors, migrate_legacy_folder
+
+
+def migrate_all() -> int:
+    db = SessionLocal()
+    migrated = 0
+    try:
+        for vector_meta in db.query(VectorMeta).filter(VectorMeta.vector_folder_path.isnot(None)).yield_per(500):
+            folder = resolve_vector_folder(vector_meta.vector_folder_path)
+            if not has_legacy_vectors(folder):
+                continue
+            try:
+                if migrate_legacy_folder(folder):
+                    migrated += 1
+            except Exception as e:
+                print(f"Could not migrate {folder} (user {vector_meta.user_id}): {e}")
+    finally:
+        db.close()
+    return migrated
+
+
+if __name__ == "__main__":
+    print(f"Migrated {migrate_all()} legacy vector folders")
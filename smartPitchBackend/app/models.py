@@ -24,6 +24,7 @@ class Resume(Base):
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False, index=True)
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=True)  # store path to resume file
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded PDF bytes
     uploaded_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     user = relationship("User", back_populates="resumes")
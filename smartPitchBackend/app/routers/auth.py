@@ -2,15 +2,13 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.schemas.auth_schemas import EmailSchema, OTPVerifySchema
 from app.utils.otp_utils import generate_otp
-from app.utils.otp_cache import store_otp, is_blocked, verify_otp, is_otp_verified
-from app.utils.email_utils import send_otp_email
+from app.utils.otp_cache import store_otp, is_blocked, verify_otp, consume_verification_token
+from app.utils.email_utils import queue_otp_email
 from fastapi import Body
 from app.schemas.auth_schemas import PasswordCreateSchema
-from app.utils.otp_cache import is_otp_verified, clear_otp_verified
 from sqlalchemy.orm import Session
 from app.schemas.auth_schemas import PasswordCreateSchema
 from app.utils.security import hash_password
-from app.utils.otp_cache import clear_otp_verified, otp_cache
 from app.crud import create_user
 from app.database import get_db
 from app.models import User
@@ -41,10 +39,12 @@ def request_otp(data: EmailSchema):
     otp = generate_otp()
     store_otp(email, otp)
 
-    if send_otp_email(email, otp):
+    # Delivery happens in the background senders; only a full outbound queue fails the request
+    if queue_otp_email(email, otp):
         return {"message": "OTP sent to your email."}
     else:
-        raise HTTPException(status_code=500, detail="Failed to send OTP email.")
+        raise HTTPException(status_code=503, detail="Failed to send OTP email, try again shortly.",
+                            headers={"Retry-After": "30"})
 
 
 # OTP Verification Endpoint 
@@ -53,27 +53,23 @@ def verify_otp_endpoint(data: OTPVerifySchema):
     email = data.email
     otp = data.otp
 
-    if verify_otp(email, otp):
-        return {"message": "OTP verified successfully."}
+    verification_token = verify_otp(email, otp)
+    if verification_token:
+        return {"message": "OTP verified successfully.", "verification_token": verification_token}
     else:
         raise HTTPException(status_code=401, detail="Invalid or expired OTP.")
 
 # password creation endpoint
 @router.post("/set-password")
 def set_password(data: PasswordCreateSchema, db: Session = Depends(get_db)):
-    # Find email with OTP verified in cache
-    email = None
-    for cached_email, record in otp_cache.items():
-        if record.get("otp_verified"):
-            email = cached_email
-            break
+    if data.password != data.confirm_password:
+        raise HTTPException(status_code=400, detail="Passwords do not match.")
 
+    # The token from /verify-otp names the verified email; it is used up here
+    email = consume_verification_token(data.verification_token)
     if not email:
         raise HTTPException(status_code=403, detail="OTP verification required.")
 
-    if data.password != data.confirm_password:
-        raise HTTPException(status_code=400, detail="Passwords do not match.")
-
     existing_user = db.query(User).filter(User.email == email).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists.")
@@ -83,8 +79,6 @@ def set_password(data: PasswordCreateSchema, db: Session = Depends(get_db)):
     # Use your CRUD function to create the user
     create_user(db=db, email=email, hashed_password=hashed_pw)
 
-    clear_otp_verified(email)
-
     return {"message": "Account created successfully. You can now log in."}
 
 #login endpoint
@@ -100,5 +94,5 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid username or password")
 
     # Create JWT token
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "user_id": user.user_id})
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
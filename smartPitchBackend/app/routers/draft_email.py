@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from app.utils.auth_bearer import JWTBearer
-from app.utils.auth_handler import decode_access_token
+from app.utils.auth_principal import Principal, get_current_principal
 from app.database import get_db
-from app.utils.draft_email_utils import drafting_email
+from app.utils.draft_email_utils import drafting_email, build_draft_email_messages, stream_drafting_email
+from app.utils.streaming import SSE_MEDIA_TYPE, STREAM_HEADERS, accepts, sse_event
+from app.utils.executors import run_io
+from app.utils.speculative_drafts import get_speculative_drafts
 
 
 router = APIRouter()
@@ -20,29 +23,74 @@ class DraftEmailRequest(BaseModel):
     closing: str = "Regards"         # New param for email closing line
 
 
-@router.post("/draft-email", dependencies=[Depends(JWTBearer())], status_code=status.HTTP_200_OK)
+@router.post("/draft-email", status_code=status.HTTP_200_OK)
 async def draft_email_endpoint(
     request: DraftEmailRequest,
-    token: str = Depends(JWTBearer()),
+    http_request: Request,
+    principal: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    payload = decode_access_token(token)
-    if not payload or "sub" not in payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or missing token.")
-    user_email = payload["sub"]
+    """
+    Drafts the application email. Returns {"email_draft"} as JSON, or streams the draft
+    as server-sent events ("token" events, then "done" with the full draft) when the
+    client sends Accept: text/event-stream.
+    """
+    user_email = principal.email
+
+    draft_params = dict(
+        jd_sections=request.jd_sections,
+        llm_relevance_response=request.llm_relevance_summary,
+        user_email=user_email,
+        db_session=db,
+        email_length=request.email_length,
+        tone=request.tone,
+        detail_level=request.detail_level,
+        closing=request.closing,
+        candidate_name=request.candidate_name,
+    )
+
+    # The default draft is usually pre-generated right after the JD was matched
+    email_draft = await get_speculative_drafts().take(
+        user_email,
+        request.jd_sections,
+        request.llm_relevance_summary,
+        {
+            "email_length": request.email_length,
+            "tone": request.tone,
+            "detail_level": request.detail_level,
+            "closing": request.closing,
+            "candidate_name": request.candidate_name,
+        },
+    )
+    if email_draft is not None:
+        if accepts(http_request, SSE_MEDIA_TYPE):
+            return StreamingResponse(replay_draft_events(email_draft), media_type=SSE_MEDIA_TYPE, headers=STREAM_HEADERS)
+        return {"email_draft": email_draft}
 
     try:
-        email_draft = drafting_email(
-            jd_sections=request.jd_sections,
-            llm_relevance_response=request.llm_relevance_summary,
-            user_email=user_email,
-            db_session=db,
-            email_length=request.email_length,
-            tone=request.tone,
-            detail_level=request.detail_level,
-            closing=request.closing,
-            candidate_name=request.candidate_name,
-        )
+        if accepts(http_request, SSE_MEDIA_TYPE):
+            # Resume lookup happens before the stream starts, the draft is streamed as it is generated
+            messages = await run_io(build_draft_email_messages, **draft_params)
+            return StreamingResponse(stream_draft_events(messages), media_type=SSE_MEDIA_TYPE, headers=STREAM_HEADERS)
+
+        # Resume lookup and the LLM call block: run them on the I/O pool
+        email_draft = await run_io(drafting_email, **draft_params)
         return {"email_draft": email_draft}
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+async def replay_draft_events(email_draft: str):
+    yield sse_event("token", {"text": email_draft})
+    yield sse_event("done", {"email_draft": email_draft})
+
+
+async def stream_draft_events(messages: list):
+    draft = []
+    try:
+        async for text in stream_drafting_email(messages):
+            draft.append(text)
+            yield sse_event("token", {"text": text})
+        yield sse_event("done", {"email_draft": "".join(draft)})
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
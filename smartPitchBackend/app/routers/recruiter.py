@@ -0,0 +1,64 @@
+import os
+from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, status
+from typing import Optional
+from app.utils.auth_principal import Principal, get_current_principal
+from app.utils.upload_jd_utils import load_jd_async, prepare_jd
+from app.utils.executors import run_io
+from app.utils.recruiter_utils import rank_resumes
+
+# Upper bound on candidates returned by one /rank call
+RECRUITER_MAX_TOP_N = int(os.getenv("RECRUITER_MAX_TOP_N", 100))
+
+# RECRUITER_MODE=1 enables /recruiter/rank; off by default since it ranks every user's resume
+RECRUITER_MODE_ENABLED = os.getenv("RECRUITER_MODE", "0") == "1"
+
+# Comma-separated emails of the accounts allowed to rank candidates
+RECRUITER_ALLOWED_EMAILS = {
+    email.strip().lower() for email in os.getenv("RECRUITER_ALLOWED_EMAILS", "").split(",") if email.strip()
+}
+
+router = APIRouter()
+
+
+def require_recruiter(principal: Principal = Depends(get_current_principal)) -> Principal:
+    """Recruiter mode is off unless enabled, and then limited to the allowlisted accounts."""
+    if not RECRUITER_MODE_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if principal.email.lower() not in RECRUITER_ALLOWED_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Recruiter access required.")
+    return principal
+
+
+@router.post("/rank", dependencies=[Depends(require_recruiter)], status_code=status.HTTP_200_OK)
+async def rank_candidates(
+    file: Optional[UploadFile] = File(None),
+    jd_text: Optional[str] = Form(None),
+    top_n: int = Form(10),
+):
+    """
+    Recruiter mode: ranks every stored resume against one JD (pasted text or PDF).
+    Returns the top_n candidates with their match score and the sections that drove it;
+    the candidates' resume text is never returned.
+    """
+    if not file and not jd_text:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide either JD file or pasted text.")
+    if file and jd_text:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide only JD text or only a file, not both.")
+    if top_n < 1 or top_n > RECRUITER_MAX_TOP_N:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"top_n must be between 1 and {RECRUITER_MAX_TOP_N}.")
+
+    try:
+        jd_raw_text, filetype = await load_jd_async(file=file, text=jd_text)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    jd_sections, jd_embeddings, jd_hash, _ = await run_io(prepare_jd, jd_raw_text)
+
+    candidates = await rank_resumes(jd_sections, jd_embeddings, top_n=top_n)
+
+    return {
+        "jd_sections": jd_sections,
+        "file_type": filetype,
+        "jd_hash": jd_hash,
+        "count": len(candidates),
+        "candidates": candidates,
+    }
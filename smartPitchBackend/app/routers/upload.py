@@ -1,63 +1,132 @@
-from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, status
+from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from app.utils.auth_bearer import JWTBearer
-from app.utils.auth_handler import decode_access_token
+from app.utils.auth_principal import Principal, get_current_principal, get_principal_cache
 from app.utils.upload_utils import (
     save_resume_file,
     extract_text_from_pdf,
-    save_json_sectionwise,
+    structure_resume_sections,
     create_section_embeddings,
+    index_resume_vectors,
+    upload_content_hash,
+    find_duplicate_resume,
+    stage_resume_upload,
+    resume_upload_response,
 )
+from app.utils.ingestion_queue import QueueFullError, get_ingestion_queue, describe_job
 from app.database import get_db
 from app.models import Resume
 from app.utils.upload_utils import update_resume_record, update_vector_meta_record
+from app.utils.vector_bundle import bundle_path
+from app.utils.executors import run_cpu, run_io
 import os
 
 router = APIRouter()
 
-@router.post("/resume", dependencies=[Depends(JWTBearer())], status_code=status.HTTP_201_CREATED)
+@router.post("/resume", status_code=status.HTTP_201_CREATED)
 async def upload_resume(
     file: UploadFile = File(...),
-    token: str = Depends(JWTBearer()),
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+    principal: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
+    """
+    Uploads the user's resume. mode=sync runs the whole pipeline in the request;
+    mode=async queues it and answers 202 with a job id to poll at /upload/jobs/{job_id}.
+    """
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only PDF files are allowed.")
 
-    payload = decode_access_token(token)
-    if not payload or "sub" not in payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token or missing user info.")
-    user_email = payload["sub"]
+    user_email = principal.email
 
-    # Save the uploaded resume PDF locally
-    file_path = save_resume_file(user_email, file)
+    # Byte-identical re-upload (e.g. a frontend retry): return what is stored, no parsing or embedding
+    content_hash = await run_io(upload_content_hash, file)
+    duplicate = None
+    if principal.resume_id is not None:
+        duplicate = await run_io(find_duplicate_resume, db, principal.user_id, content_hash)
+    if duplicate:
+        resume, vector_meta, bundle = duplicate
+        return {
+            "user_email": user_email,
+            "resume_file_path": str(resume.file_path),
+            "extracted_sections": bundle.to_sections_dict(),
+            "vector_folder": vector_meta.vector_folder_path,
+            "vector_bundle": bundle_path(vector_meta.vector_folder_path),
+            "resume_id": resume.res_id,
+            "vector_meta_id": vector_meta.vector_id,
+            "faiss_vector_id": vector_meta.faiss_vector_id,
+            "content_hash": content_hash,
+            "deduplicated": True,
+            "chunks_reused": bundle.rows,
+            "chunks_embedded": 0,
+        }
+
+    if mode == "async":
+        # Stage the upload and hand the pipeline to the ingestion workers
+        staged_path = await run_io(stage_resume_upload, file)
+        try:
+            job_id = await run_io(
+                get_ingestion_queue().enqueue,
+                user_email,
+                {
+                    "user_email": user_email,
+                    "user_id": principal.user_id,
+                    "filename": file.filename,
+                    "staged_path": staged_path,
+                    "content_hash": content_hash,
+                },
+            )
+        except QueueFullError as e:
+            os.remove(staged_path)
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e),
+                                headers={"Retry-After": "30"})
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"job_id": job_id, "status": "queued", "status_url": f"/upload/jobs/{job_id}"},
+        )
 
-    # Extract the sections dictionary from the saved PDF
-    sections_dict = extract_text_from_pdf(file_path)
+    # Save the uploaded resume PDF locally
+    file_path = await run_io(save_resume_file, user_email, file)
 
-    # Save each section as a JSON file under resume_vectors/user_email/
-    saved_folder_path = save_json_sectionwise(user_email, sections_dict)
+    # Extract the sections dictionary from the saved PDF (CPU-bound: process pool)
+    sections_dict = await run_cpu(extract_text_from_pdf, file_path)
 
-    # Create section-wise embeddings and save as .npy files in the same folder
-    create_section_embeddings(user_email)
+    # Format sections and write them with their embeddings into the user's bundle file;
+    # only chunks that are new or changed since the previous upload are embedded.
+    # I/O pool, not process pool: encoding goes through this process's shared model and
+    # micro-batching scheduler, so concurrent uploads are merged into one batch
+    structured_sections = structure_resume_sections(sections_dict)
+    saved_folder_path, embedding_stats = await run_io(create_section_embeddings, user_email, structured_sections)
 
     # Update or insert resume metadata record
-    resume = update_resume_record(db, user_email, file.filename, file_path)
+    resume = await run_io(update_resume_record, db, user_email, file.filename, file_path, content_hash,
+                          user_id=principal.user_id)
 
-    # Update or insert vector meta record with path info and generated faiss_vector_id
-    vector_meta = update_vector_meta_record(
+    # Add the resume chunks to the shared FAISS index (replacing the user's previous ones; no-op unless RELEVANCE_BACKEND=faiss)
+    faiss_vector_id = await run_io(index_resume_vectors, resume.user_id, saved_folder_path)
+
+    # Update or insert vector meta record with path info and the user's FAISS id base
+    vector_meta = await run_io(
+        update_vector_meta_record,
         db,
         user_email,
         resume.res_id,
-        vector_folder_path=saved_folder_path
+        faiss_vector_id=faiss_vector_id,
+        vector_folder_path=saved_folder_path,
+        user_id=principal.user_id,
     )
+    # The cached principal still carries the previous resume/vector ids
+    get_principal_cache().invalidate_user(principal.user_id)
+
+    return resume_upload_response(user_email, file_path, sections_dict, saved_folder_path,
+                                  resume, vector_meta, content_hash, embedding_stats)
+
 
-    return {
-        "user_email": user_email,
-        "resume_file_path": str(file_path),
-        "extracted_sections": sections_dict,
-        "json_sections_folder": saved_folder_path,
-        "embedding_files_folder": saved_folder_path,
-        "resume_id": resume.res_id,
-        "vector_meta_id": vector_meta.vector_id,
-    }
+@router.get("/jobs/{job_id}")
+async def ingestion_job_status(job_id: str, principal: Principal = Depends(get_current_principal)):
+    """Status and per-stage progress of a background resume ingestion job; the result once it succeeded."""
+    job = await run_io(get_ingestion_queue().get, job_id)
+    # Other users' jobs are reported as missing
+    if job is None or job["user_email"] != principal.email:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    return describe_job(job)
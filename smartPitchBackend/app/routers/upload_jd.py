@@ -1,87 +1,235 @@
 import os
-import glob
-from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, status
+from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
-from app.utils.auth_bearer import JWTBearer
-from app.utils.auth_handler import decode_access_token
-from app.database import get_db
-import json
+from typing import List, Optional
+from app.utils.auth_principal import Principal, get_current_principal
+from app.database import get_db, SessionLocal
+from app.utils.executors import run_io
+from app.utils.streaming import NDJSON_MEDIA_TYPE, STREAM_HEADERS, accepts, ndjson_line
+from app.utils.match_gate import DECISION_LLM, get_match_gate, templated_summary
+from app.utils.speculative_drafts import get_speculative_drafts
 from app.utils.upload_jd_utils import (
-    load_jd,
-    extract_jd_sections,
-    create_jd_json_files,
-    create_jd_section_embeddings,
-    relevance_search,
-    job_relevance  
+    load_jd_async,
+    prepare_jd,
+    prepare_jds,
+    scored_relevance_search,
+    job_relevance,
+    stream_job_relevance,
+    batch_relevance_search,
 )
 
+# Max number of postings accepted by one /jd/batch call
+JD_BATCH_MAX_ITEMS = int(os.getenv("JD_BATCH_MAX_ITEMS", 200))
+
 router = APIRouter()
 
-@router.post("/jd", dependencies=[Depends(JWTBearer())], status_code=status.HTTP_201_CREATED)
+@router.post("/jd", status_code=status.HTTP_201_CREATED)
 async def upload_jd(
+    request: Request,
     file: Optional[UploadFile] = File(None),
     jd_text: Optional[str] = Form(None),
-    token: str = Depends(JWTBearer()),
+    principal: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
+    """
+    Parses a JD, matches it against the user's resume and summarizes the fit.
+    Returns one JSON object, or progressive NDJSON when the client sends
+    Accept: application/x-ndjson (see stream_jd_events).
+    """
     if not file and not jd_text:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide either JD file or pasted text.")
     if file and jd_text:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide only JD text or only a file, not both.")
 
-    payload = decode_access_token(token)
-    if not payload or "sub" not in payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token or missing user info.")
-    user_email = payload["sub"]
+    user_email = principal.email
 
-    temp_path = None
-    relevance_results = None
-    llm_response = None
+    jd_raw_text, filetype = await load_jd_async(file=file, text=jd_text)
 
-    try:
-        jd_raw_text, filetype, temp_path = load_jd(file=file, text=jd_text)
-        jd_sections = extract_jd_sections(jd_raw_text)
-
-        # Create JSON files and embeddings for JD sections
-        jd_json_files = create_jd_json_files(jd_sections)
-        jd_json_dir = os.path.dirname(next(iter(jd_json_files.values())))
-        jd_embedding_dir = create_jd_section_embeddings(jd_json_dir)
-
-        # List embedding files by section
-        embedding_files_glob = glob.glob(os.path.join(jd_embedding_dir, "*.npy"))
-        jd_embedding_files = {
-            os.path.splitext(os.path.basename(f))[0]: f
-            for f in embedding_files_glob
-        }
+    # Sections and embeddings of the searched JD sections, shared with anyone who sent the same posting;
+    # embedded on the I/O pool through this process's shared model and scheduler
+    jd_sections, jd_embeddings, jd_hash, jd_reused = await run_io(prepare_jd, jd_raw_text)
 
-        # Run relevance search to get relevant resume chunks mapped to JD sections
-        relevance_results = relevance_search(
-            user_email=user_email,
-            jd_json_dir=jd_json_dir,
-            jd_embedding_dir=jd_embedding_dir,
-            db_session=db
+    if accepts(request, NDJSON_MEDIA_TYPE):
+        jd_info = {
+            "user_email": user_email,
+            "jd_sections": jd_sections,
+            "file_type": filetype,
+            "jd_hash": jd_hash,
+            "jd_deduplicated": jd_reused,
+        }
+        # A returned response keeps its own status code, the route's 201 is not applied to it
+        return StreamingResponse(
+            stream_jd_events(jd_info, jd_embeddings, principal.user_id),
+            status_code=status.HTTP_201_CREATED,
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=STREAM_HEADERS,
         )
 
-        # Combine relevant resume chunks and JD sections as strings for LLM prompt
-        # Here converting dicts to string summaries. Adjust formatting as needed.
-        relevant_resume_chunks_str = json.dumps(relevance_results, indent=2)
-        jd_sections_str = json.dumps(jd_sections, indent=2)
+    # Run relevance search to get relevant resume chunks mapped to JD sections and the match score
+    scored = await run_io(
+        scored_relevance_search,
+        user_email=user_email,
+        jd_sections=jd_sections,
+        jd_embeddings=jd_embeddings,
+        db_session=db,
+        user_id=principal.user_id,
+    )
+    relevance_results = scored["relevance_results"]
 
-        # Call job relevance function (LLM) to generate the relevance summary text
-        llm_response = job_relevance(relevant_resume_chunks_str, jd_sections_str)
-
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+    # Clearly irrelevant JDs get a templated summary instead of an LLM round-trip
+    gate = get_match_gate()
+    decision = gate.decide(scored["match_score"], relevance_results, scored["jd_point_scores"])
+    if decision == DECISION_LLM:
+        # Call job relevance function (LLM) to generate the relevance summary text;
+        # the prompt builder renders the matches and JD sections within the token budget
+        llm_response = await run_io(job_relevance, relevance_results, jd_sections)
+        # The default email draft is the usual next request: start it now
+        get_speculative_drafts().start(user_email, jd_sections, llm_response)
+    else:
+        llm_response = templated_summary(scored["match_score"], scored["jd_point_scores"], relevance_results, decision)
 
     return {
         "user_email": user_email,
         "jd_sections": jd_sections,
-        "jd_json_files": jd_json_files,
-        "jd_embedding_dir": jd_embedding_dir,
-        "jd_embedding_files": jd_embedding_files,
         "relevance_results": relevance_results,
         "llm_relevance_summary": llm_response,  # Add LLM-generated relevance summary to response
         "file_type": filetype,
+        "jd_hash": jd_hash,
+        "jd_deduplicated": jd_reused,
+        "match_score": scored["match_score"],
+        "match_gate": gate.describe(decision, scored["match_score"]),
+    }
+
+
+async def stream_jd_events(jd_info: dict, jd_embeddings: dict, user_id: int):
+    """
+    NDJSON events of /jd, one object per line:
+    {"type": "sections", ...}, {"type": "matches", "relevance_results", "match_score", "match_gate"},
+    {"type": "summary", "text"} per LLM fragment (one fragment for a templated low-match summary),
+    then {"type": "done", "llm_relevance_summary"}.
+    A failure after the stream started is reported as {"type": "error", "detail"}.
+    """
+    yield ndjson_line({"type": "sections", **jd_info})
+
+    # The request's session is closed once the response starts, the stream uses its own
+    db = SessionLocal()
+    try:
+        scored = await run_io(
+            scored_relevance_search,
+            user_email=jd_info["user_email"],
+            jd_sections=jd_info["jd_sections"],
+            jd_embeddings=jd_embeddings,
+            db_session=db,
+            user_id=user_id,
+        )
+        relevance_results = scored["relevance_results"]
+        gate = get_match_gate()
+        decision = gate.decide(scored["match_score"], relevance_results, scored["jd_point_scores"])
+        yield ndjson_line({
+            "type": "matches",
+            "relevance_results": relevance_results,
+            "match_score": scored["match_score"],
+            "match_gate": gate.describe(decision, scored["match_score"]),
+        })
+
+        summary = []
+        if decision == DECISION_LLM:
+            async for text in stream_job_relevance(relevance_results, jd_info["jd_sections"]):
+                summary.append(text)
+                yield ndjson_line({"type": "summary", "text": text})
+        else:
+            text = templated_summary(scored["match_score"], scored["jd_point_scores"], relevance_results, decision)
+            summary.append(text)
+            yield ndjson_line({"type": "summary", "text": text})
+        yield ndjson_line({"type": "done", "llm_relevance_summary": "".join(summary)})
+        if decision == DECISION_LLM:
+            get_speculative_drafts().start(jd_info["user_email"], jd_info["jd_sections"], "".join(summary))
+    except Exception as e:
+        yield ndjson_line({"type": "error", "detail": str(e)})
+    finally:
+        db.close()
+
+
+@router.post("/jd/batch", status_code=status.HTTP_200_OK)
+async def upload_jd_batch(
+    files: Optional[List[UploadFile]] = File(None),
+    jd_texts: Optional[List[str]] = Form(None),
+    summarize_top_n: int = Form(0),
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    """
+    Score one resume against many JDs (pasted texts and/or PDFs) in a single request.
+    Returns JDs ranked by match score; LLM summaries only for the top summarize_top_n.
+    """
+    files = files or []
+    jd_texts = [text for text in (jd_texts or []) if text and text.strip()]
+    total = len(files) + len(jd_texts)
+    if total == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide at least one JD file or text.")
+    if total > JD_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {JD_BATCH_MAX_ITEMS} JDs per batch.")
+
+    user_email = principal.email
+
+    # Load every JD, keeping where it came from
+    sources = []
+    jd_raw_texts = []
+    for text in jd_texts:
+        jd_raw_text, filetype = await load_jd_async(text=text)
+        sources.append({"file_type": filetype, "filename": None})
+        jd_raw_texts.append(jd_raw_text)
+    for file in files:
+        try:
+            jd_raw_text, filetype = await load_jd_async(file=file)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{file.filename}: {e}")
+        sources.append({"file_type": filetype, "filename": file.filename})
+        jd_raw_texts.append(jd_raw_text)
+
+    # Known postings come from their shared artifact; the rest are embedded in one encode
+    prepared = await run_io(prepare_jds, jd_raw_texts)
+    jd_sections_list = [jd_sections for jd_sections, _, _, _ in prepared]
+    jd_embeddings_list = [jd_embeddings for _, jd_embeddings, _, _ in prepared]
+    for source, (_, _, jd_hash, jd_reused) in zip(sources, prepared):
+        source["jd_hash"] = jd_hash
+        source["jd_deduplicated"] = jd_reused
+
+    # One matmul of all JD chunks against the cached resume matrix
+    scored = await run_io(batch_relevance_search, user_email, jd_sections_list, jd_embeddings_list, db,
+                          user_id=principal.user_id)
+
+    ranked = sorted(
+        (
+            {"index": idx, **sources[idx], "jd_sections": jd_sections_list[idx], **scored[idx]}
+            for idx in range(total)
+        ),
+        key=lambda item: item["match_score"],
+        reverse=True,
+    )
+
+    # LLM summaries are the expensive part: only for the best matches, only if asked,
+    # and low matches among them get the templated summary
+    gate = get_match_gate()
+    for rank, item in enumerate(ranked):
+        item["rank"] = rank + 1
+        item["llm_relevance_summary"] = None
+        item["match_gate"] = None
+        if rank < summarize_top_n:
+            decision = gate.decide(item["match_score"], item["relevance_results"], item["jd_point_scores"])
+            item["match_gate"] = gate.describe(decision, item["match_score"])
+            if decision == DECISION_LLM:
+                item["llm_relevance_summary"] = await run_io(
+                    job_relevance, item["relevance_results"], item["jd_sections"]
+                )
+            else:
+                item["llm_relevance_summary"] = templated_summary(
+                    item["match_score"], item["jd_point_scores"], item["relevance_results"], decision
+                )
+
+    return {
+        "user_email": user_email,
+        "count": total,
+        "results": ranked,
     }
@@ -10,6 +10,7 @@ class OTPVerifySchema(BaseModel):
     otp: constr(min_length=6, max_length=6)  # OTP must be exactly 6 chars
 
 class PasswordCreateSchema(BaseModel):
+    verification_token: str  # Token returned by /verify-otp
     password: constr(min_length=8)  # Password only
     confirm_password: constr(min_length=8)  # Confirm password
     
@@ -0,0 +1,145 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import User, Resume, VectorMeta
+from app.utils.auth_handler import decode_access_token
+
+# Verified tokens kept per worker, so repeat requests skip the JWT verification and user lookup
+AUTH_PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", 1024))
+
+# Seconds a cached principal is trusted before the token is verified and the user looked up again;
+# bounds how long resume/vector ids can lag an upload handled by another worker
+AUTH_PRINCIPAL_TTL = int(os.getenv("AUTH_PRINCIPAL_TTL", 60))
+
+
+class Principal:
+    """The authenticated user of a request, with the ids downstream helpers would otherwise look up by email."""
+
+    def __init__(self, user_id: int, email: str, resume_id: Optional[int] = None,
+                 vector_id: Optional[int] = None, vector_folder_path: Optional[str] = None):
+        self.user_id = user_id
+        self.email = email
+        self.resume_id = resume_id
+        self.vector_id = vector_id
+        self.vector_folder_path = vector_folder_path
+
+
+def load_principal(db: Session, user_id: Optional[int] = None, email: Optional[str] = None) -> Optional[Principal]:
+    """
+    The user with their resume and vector meta ids in one query, by id (or by email for older tokens).
+    A token's id must still belong to its email: user ids are reused after a delete, so an id alone
+    could resolve an old token to whoever holds the id now.
+    """
+    query = (
+        db.query(User.user_id, User.email, Resume.res_id, VectorMeta.vector_id, VectorMeta.vector_folder_path)
+        .outerjoin(Resume, Resume.user_id == User.user_id)
+        .outerjoin(VectorMeta, (VectorMeta.user_id == User.user_id) & (VectorMeta.resume_id == Resume.res_id))
+    )
+    if user_id is not None:
+        query = query.filter(User.user_id == user_id)
+    if email is not None:
+        query = query.filter(User.email == email)
+    elif user_id is None:
+        return None
+    row = query.first()
+    if row is None:
+        return None
+    return Principal(row.user_id, row.email, row.res_id, row.vector_id, row.vector_folder_path)
+
+
+class PrincipalCache:
+    """LRU of token -> principal; an entry is valid until the token expires or AUTH_PRINCIPAL_TTL passes."""
+
+    def __init__(self, max_entries: int = AUTH_PRINCIPAL_CACHE_SIZE, ttl: int = AUTH_PRINCIPAL_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (expires_at, principal)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, principal: Principal, token_expires_at: float):
+        with self._lock:
+            self._entries[token] = (min(token_expires_at, time.time() + self.ttl), principal)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        """Drops the user's cached principals, e.g. after their resume/vector ids changed."""
+        with self._lock:
+            for token in [token for token, (_, principal) in self._entries.items() if principal.user_id == user_id]:
+                del self._entries[token]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache: Optional[PrincipalCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_principal_cache() -> PrincipalCache:
+    """Returns the per-worker principal cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PrincipalCache()
+    return _cache
+
+
+_bearer = HTTPBearer()
+
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(_bearer),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """
+    Dependency for secured routes: verifies the bearer JWT once and returns the Principal.
+    FastAPI resolves it once per request however many times it is declared.
+    """
+    token = credentials.credentials
+    cache = get_principal_cache()
+    principal = cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired token.")
+    if "user_id" not in payload and "sub" not in payload:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token or missing user info.")
+
+    # Tokens issued before user_id was embedded only carry the email
+    principal = load_principal(db, user_id=payload.get("user_id"), email=payload.get("sub"))
+    if principal is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token or missing user info.")
+    cache.put(token, principal, payload["exp"])
+    return principal
@@ -1,10 +1,13 @@
 import os
-import json
 from dotenv import load_dotenv
 from langchain_cohere import ChatCohere
 from langchain_core.messages import HumanMessage
 from sqlmodel import Session
-from app.models import VectorMeta, User
+from app.utils.vector_bundle import open_bundle
+from app.utils.resume_cache import get_resume_cache
+from app.utils.llm_cache import cached_invoke, cached_astream
+from app.utils.prompt_builder import compact_jd_sections
+from app.utils.upload_jd_utils import DEFAULT_JD_SECTION_MAP
 
 load_dotenv()
 api_key = os.getenv("COHERE_API_KEY")
@@ -15,35 +18,30 @@ chat = ChatCohere(api_key=api_key, model="command-r-plus-08-2024")
 
 def get_resume_vector_folder(user_email: str, db_session: Session) -> str:
     """
-    Retrieve the absolute path to the user's resume vector folder stored in DB.
+    Retrieve the absolute path to the user's resume vector folder.
+    Served from the per-worker resume cache; the DB is only queried on a miss.
     Raises ValueError if not found.
     """
-    vector_meta = db_session.query(VectorMeta).join(User).filter(User.email == user_email).first()
-    if not vector_meta or not vector_meta.vector_folder_path:
-        raise ValueError(f"Vector folder path not found for user: {user_email}")
-
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # utils folder
-    PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, "..", ".."))  # project root
-    resume_vectors_path = os.path.normpath(os.path.join(PROJECT_ROOT, vector_meta.vector_folder_path))
-    return resume_vectors_path
+    return get_resume_cache().get(user_email, db_session).folder
 
 
 def load_resume_header_json(vector_folder_path: str) -> list:
     """
-    Loads the header.json file from user's resume vector folder.
-    Returns a list from JSON or empty list if cannot load.
+    Loads the header section of the resume in user's vector folder,
+    from the resume cache when it is loaded there, else from the bundle file.
+    Returns a list or empty list if cannot load.
     """
-    header_json_path = os.path.join(vector_folder_path, "header.json")
+    cached_resume = get_resume_cache().get_by_folder(vector_folder_path)
+    if cached_resume is not None:
+        return cached_resume.header()
     try:
-        with open(header_json_path, "r", encoding="utf-8") as f:
-            header_data = json.load(f)
-        return header_data
+        return open_bundle(vector_folder_path).section_content("header", [])
     except Exception as e:
-        print(f"Warning: Could not load header.json from {header_json_path}: {e}")
+        print(f"Warning: Could not load resume header from {vector_folder_path}: {e}")
         return []
 
 
-def drafting_email(
+def build_draft_email_messages(
     jd_sections: str,
     llm_relevance_response: str,
     user_email: str,
@@ -53,10 +51,10 @@ def drafting_email(
     detail_level: str = "Summary",
     closing: str = "Regards",
     candidate_name: str = "Candidate"
-) -> str:
+) -> list:
     """
-    Draft a professional email using JD sections, relevance summary, user's resume metadata,
-    and customization parameters.
+    Builds the LLM messages for a professional email using JD sections, relevance summary,
+    user's resume metadata, and customization parameters.
 
     Args:
         jd_sections: JSON string or dict of JD sections.
@@ -70,7 +68,7 @@ def drafting_email(
         candidate_name: Candidate's name to personalize the email.
 
     Returns:
-        Drafted email string from LLM.
+        List of chat messages for the LLM.
     """
 
     # Get vector folder path from DB for user
@@ -85,9 +83,9 @@ def drafting_email(
     candidate_phone = header_data[2] if len(header_data) > 2 else "N/A"
     links_list = header_data[3:] if len(header_data) > 3 else []
 
-    # Convert JD sections to string if dict
+    # Compact JD context: title and scoring sections only, within the prompt token budget
     if isinstance(jd_sections, dict):
-        jd_sections_str = json.dumps(jd_sections, indent=2)
+        jd_sections_str, _ = compact_jd_sections(jd_sections, DEFAULT_JD_SECTION_MAP.keys())
     else:
         jd_sections_str = jd_sections
 
@@ -115,6 +113,60 @@ Use "{closing}" as the closing line for the email.
 Also include a subject line with the candidate's name and position applied for.
 """
 
-    messages = [HumanMessage(content=prompt)]
-    response = chat.invoke(messages)
-    return response.content
+    return [HumanMessage(content=prompt)]
+
+
+def drafting_email(
+    jd_sections: str,
+    llm_relevance_response: str,
+    user_email: str,
+    db_session: Session,
+    email_length: int = 120,
+    tone: str = "Formal",
+    detail_level: str = "Summary",
+    closing: str = "Regards",
+    candidate_name: str = "Candidate",
+    chat_model=None,
+) -> str:
+    """
+    Draft a professional email using JD sections, relevance summary, user's resume metadata,
+    and customization parameters.
+
+    Args:
+        jd_sections: JSON string or dict of JD sections.
+        llm_relevance_response: AI-generated relevance summary string.
+        user_email: Candidate's email address to locate resume metadata.
+        db_session: SQLModel DB session for querying vector metadata.
+        email_length: Desired word count for the email.
+        tone: Tone/style of the email (e.g., Formal, Friendly).
+        detail_level: Summary or Detailed email style.
+        closing: Custom closing line for the email.
+        candidate_name: Candidate's name to personalize the email.
+        chat_model: LangChain chat model to use instead of the module's ChatCohere client.
+
+    Identical prompts (same JD, summary, candidate and draft parameters) hit the LLM cache.
+
+    Returns:
+        Drafted email string from LLM.
+    """
+    messages = build_draft_email_messages(
+        jd_sections,
+        llm_relevance_response,
+        user_email,
+        db_session,
+        email_length=email_length,
+        tone=tone,
+        detail_level=detail_level,
+        closing=closing,
+        candidate_name=candidate_name,
+    )
+    return cached_invoke(chat_model or chat, messages)
+
+
+async def stream_drafting_email(messages: list, chat_model=None):
+    """
+    Streams a draft for messages from build_draft_email_messages, yielding text
+    fragments as the LLM produces them.
+    """
+    async for text in cached_astream(chat_model or chat, messages):
+        yield text
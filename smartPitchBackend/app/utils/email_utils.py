@@ -1,20 +1,16 @@
 import os
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
+from app.utils.mail_delivery import SMTPConnection, get_mail_delivery
 
 # Loading environment variables from .env file
 load_dotenv()
 
-SMTP_HOST = os.getenv('SMTP_HOST')
-SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
-SMTP_USERNAME = os.getenv('SMTP_USERNAME')
-SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
 EMAIL_FROM = os.getenv('EMAIL_FROM')
 EMAIL_FROM_NAME = os.getenv('EMAIL_FROM_NAME')
 
-def send_otp_email(to_email: str, otp_code: str):
+def build_otp_message(to_email: str, otp_code: str) -> str:
     # Create message container
     msg = MIMEMultipart('alternative')
     msg['Subject'] = 'Your SmartPitch OTP Code'
@@ -34,16 +30,24 @@ def send_otp_email(to_email: str, otp_code: str):
 
     # Attaching HTML content
     msg.attach(MIMEText(html_content, 'html'))
+    return msg.as_string()
 
-    # Connect to SMTP server and send email
+def queue_otp_email(to_email: str, otp_code: str) -> bool:
+    """
+    Hands the OTP email to the background mail senders and returns immediately.
+    False when the outbound queue is full; delivery failures are only logged and counted.
+    """
+    return get_mail_delivery().enqueue(EMAIL_FROM, [to_email], build_otp_message(to_email, otp_code))
+
+def send_otp_email(to_email: str, otp_code: str):
+    """Sends the OTP email synchronously over a fresh connection (scripts; the API uses queue_otp_email)."""
+    connection = SMTPConnection()
     try:
-        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.sendmail(EMAIL_FROM, to_email, msg.as_string())
-        server.quit()
+        connection.send(EMAIL_FROM, [to_email], build_otp_message(to_email, otp_code))
         print(f"OTP email sent to {to_email}")
         return True
     except Exception as e:
         print(f"Failed to send OTP email: {e}")
         return False
+    finally:
+        connection.close()
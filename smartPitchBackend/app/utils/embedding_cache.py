@@ -0,0 +1,145 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Max number of vectors kept in the in-memory LRU tier (per worker process)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 50000))
+
+# SQLite file backing the persistent tier, shared by all workers; empty string disables it
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalizes text and collapses whitespace so trivially different chunks share a key."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Cache key for a chunk: SHA-256 of model name and normalized text."""
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model name, normalized chunk text hash).
+    - memory tier: bounded LRU of float32 vectors
+    - disk tier: SQLite table that survives restarts and is shared across workers
+    """
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_SIZE, db_path: Optional[str] = EMBEDDING_CACHE_PATH):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " model_name TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Inserts into the LRU tier, evicting the least recently used entries. Caller holds the lock."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model_name: str, texts: List[str]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """
+        Looks up every text.
+        Returns ({index: vector} for hits, [indices of misses]).
+        """
+        keys = [cache_key(model_name, text) for text in texts]
+        found: Dict[int, np.ndarray] = {}
+        pending: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for idx, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[idx] = vector
+                    self.memory_hits += 1
+                else:
+                    pending.setdefault(key, []).append(idx)
+
+            if pending and self._conn is not None:
+                pending_keys = list(pending.keys())
+                # Stay below SQLite's bound-parameter limit
+                for start in range(0, len(pending_keys), 500):
+                    batch = pending_keys[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._remember(key, vector)
+                        for idx in pending.pop(key):
+                            found[idx] = vector
+                            self.disk_hits += 1
+
+            missing = sorted(idx for indices in pending.values() for idx in indices)
+            self.misses += len(missing)
+
+        return found, missing
+
+    def put_many(self, model_name: str, texts: List[str], vectors: np.ndarray):
+        """Stores vectors for texts in both tiers."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = cache_key(model_name, text)
+                vector = np.ascontiguousarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, model_name, vector.shape[0], vector.tobytes()))
+
+            if rows and self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model_name, dim, vector) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.max_entries,
+            }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Returns the process-wide embedding cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from typing import Dict, Hashable, List, Optional
+from sentence_transformers import SentenceTransformer
+from app.utils.embedding_cache import get_embedding_cache
+from app.utils.embedding_scheduler import get_embedding_scheduler
+
+# Default embedding model used for resumes and JDs
+DEFAULT_EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Models to load when the app starts (comma separated), empty string disables warm-up
+WARMUP_MODELS = [
+    name.strip()
+    for name in os.getenv("EMBEDDING_WARMUP_MODELS", DEFAULT_EMBEDDING_MODEL).split(",")
+    if name.strip()
+]
+
+# Route encodes through the shared micro-batching scheduler ("0" encodes in the calling thread)
+EMBEDDING_SCHEDULER_ENABLED = os.getenv("EMBEDDING_SCHEDULER", "1") != "0"
+
+# Registry: model_name -> loaded SentenceTransformer (one per worker process)
+_models: Dict[str, SentenceTransformer] = {}
+
+# Registry: model_name -> load statistics
+_model_stats: Dict[str, dict] = {}
+
+# Guards the registry dicts; per-model locks avoid holding the global lock during a load
+_registry_lock = threading.Lock()
+_load_locks: Dict[str, threading.Lock] = {}
+
+
+def _current_rss_bytes() -> int:
+    """
+    Returns resident memory of the current process in bytes.
+    Reads /proc on Linux, falls back to peak RSS from getrusage elsewhere.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux/BSD
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL) -> SentenceTransformer:
+    """
+    Returns the shared SentenceTransformer for model_name, loading it on first use.
+    Loading happens once per worker process and is safe to call from many threads.
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        load_lock = _load_locks.setdefault(model_name, threading.Lock())
+
+    with load_lock:
+        # Another thread may have finished loading while we waited
+        model = _models.get(model_name)
+        if model is not None:
+            return model
+
+        rss_before = _current_rss_bytes()
+        start = time.perf_counter()
+        model = SentenceTransformer(model_name)
+        load_seconds = time.perf_counter() - start
+        rss_after = _current_rss_bytes()
+
+        with _registry_lock:
+            _models[model_name] = model
+            _model_stats[model_name] = {
+                "load_seconds": round(load_seconds, 3),
+                "rss_before_bytes": rss_before,
+                "rss_after_bytes": rss_after,
+                "rss_delta_bytes": rss_after - rss_before,
+                "loaded_at": time.time(),
+            }
+
+        print(
+            f"Loaded embedding model {model_name} in {load_seconds:.2f}s "
+            f"(RSS +{(rss_after - rss_before) / (1024 * 1024):.1f} MiB)"
+        )
+        return model
+
+
+def warm_up_models(model_names: Optional[List[str]] = None) -> Dict[str, dict]:
+    """
+    Loads the given models (or WARMUP_MODELS) into the registry ahead of the first request.
+    Returns the load statistics of the warmed models.
+    """
+    for model_name in model_names if model_names is not None else WARMUP_MODELS:
+        get_embedding_model(model_name)
+    return get_model_stats()
+
+
+def get_model_stats() -> dict:
+    """
+    Returns load time and memory figures for every loaded model, plus current process RSS.
+    """
+    with _registry_lock:
+        models = {name: dict(stats) for name, stats in _model_stats.items()}
+    return {
+        "loaded_models": models,
+        "process_rss_bytes": _current_rss_bytes(),
+    }
+
+
+# Sections that are stored for display/prompting but never searched, so never embedded
+NON_EMBEDDED_SECTIONS = {"header"}
+
+
+def is_embedded_section(section_name: str) -> bool:
+    """Returns True if the section takes part in similarity search and needs embeddings."""
+    return section_name not in NON_EMBEDDED_SECTIONS and not section_name.endswith("_links")
+
+
+def section_texts(content) -> List[str]:
+    """
+    Converts a section's JSON content into the list of texts to embed:
+    - list of {'name', 'points'} dicts -> name + points joined per entry
+    - list of strings -> as is
+    - string -> single item list
+    - anything else -> JSON dump as single item
+    """
+    if isinstance(content, list):
+        if content and isinstance(content[0], dict) and "name" in content[0] and "points" in content[0]:
+            texts = []
+            for entry in content:
+                combined = entry["name"]
+                if entry["points"]:
+                    combined += " " + " ".join(entry["points"])
+                texts.append(combined)
+            return texts
+        return list(content)
+    if isinstance(content, str):
+        return [content]
+    return [json.dumps(content)]
+
+
+def encode_batch(texts: List[str], model_name: str) -> np.ndarray:
+    """
+    Encodes texts with a single model call and returns float32 embeddings in input order.
+    Texts are ordered longest first so that batches hold similar lengths and need less padding.
+    """
+    embedder = get_embedding_model(model_name)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i].split()), reverse=True)
+    sorted_embeddings = embedder.encode([texts[i] for i in order], convert_to_numpy=True)
+
+    embeddings = np.empty_like(sorted_embeddings, dtype=np.float32)
+    embeddings[order] = sorted_embeddings
+    return embeddings
+
+
+def _scheduled_encode(texts: List[str], model_name: str) -> np.ndarray:
+    """Encodes through the shared micro-batching scheduler, or directly when it is disabled."""
+    if not EMBEDDING_SCHEDULER_ENABLED:
+        return encode_batch(texts, model_name)
+    return get_embedding_scheduler(model_name, encode_batch).encode(texts)
+
+
+def encode_texts(texts: List[str], model_name: str = DEFAULT_EMBEDDING_MODEL, use_cache: bool = True) -> np.ndarray:
+    """
+    Returns float32 embeddings for texts in input order.
+    Vectors found in the embedding cache are reused; the remaining unique texts
+    are encoded through the micro-batching scheduler and written back to the cache.
+    """
+    if not texts:
+        dim = get_embedding_model(model_name).get_sentence_embedding_dimension()
+        return np.zeros((0, dim), dtype=np.float32)
+
+    if not use_cache:
+        return _scheduled_encode(texts, model_name)
+
+    cache = get_embedding_cache()
+    found, missing = cache.get_many(model_name, texts)
+
+    if missing:
+        # Same chunk text may repeat inside a document, encode it once
+        unique_texts = list(dict.fromkeys(texts[idx] for idx in missing))
+        new_vectors = _scheduled_encode(unique_texts, model_name)
+        cache.put_many(model_name, unique_texts, new_vectors)
+        by_text = dict(zip(unique_texts, new_vectors))
+        for idx in missing:
+            found[idx] = by_text[texts[idx]]
+
+    return np.vstack([found[idx] for idx in range(len(texts))]).astype(np.float32, copy=False)
+
+
+def encode_sections(sections: Dict[Hashable, List[str]], model_name: str = DEFAULT_EMBEDDING_MODEL) -> Dict[Hashable, np.ndarray]:
+    """
+    Embeds the texts of every section in one batch and splits the result
+    back into a {section_name: (n_texts, dim) matrix} dict.
+    Sections without texts are left out.
+    """
+    names = [name for name, texts in sections.items() if texts]
+    all_texts = [text for name in names for text in sections[name]]
+    all_embeddings = encode_texts(all_texts, model_name)
+
+    result = {}
+    offset = 0
+    for name in names:
+        count = len(sections[name])
+        result[name] = all_embeddings[offset:offset + count]
+        offset += count
+    return result
@@ -0,0 +1,153 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+# Max number of texts merged into one model call
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", 64))
+
+# Max time the first request of a batch waits for others to join (milliseconds)
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", 5))
+
+
+class _EncodeRequest:
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class EmbeddingScheduler:
+    """
+    Dynamic micro-batcher for one embedding model.
+    Concurrent callers submit texts; a dedicated worker thread merges queued
+    requests into batches bounded by max_batch_size texts and max_wait_ms,
+    runs one encode per batch and resolves each caller's future with its rows.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+        max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+        name: str = "embedding-scheduler",
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[_EncodeRequest]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.max_batch_seen = 0
+        self.total_queue_wait = 0.0
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queues texts for encoding and returns a Future resolving to their (n, dim) embeddings."""
+        request = _EncodeRequest(list(texts))
+        self._queue.put(request)
+        return request.future
+
+    def encode(self, texts: List[str], timeout: Optional[float] = None) -> np.ndarray:
+        """Blocking helper: submit and wait for the result."""
+        return self.submit(texts).result(timeout=timeout)
+
+    def _collect_batch(self) -> List[_EncodeRequest]:
+        """Blocks for the first request, then merges followers until the size or time bound is hit."""
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.perf_counter() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            # Drop requests whose caller cancelled while they were queued
+            batch = [request for request in self._collect_batch() if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            all_texts = [text for request in batch for text in request.texts]
+
+            try:
+                embeddings = self.encode_fn(all_texts)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                count = len(request.texts)
+                request.future.set_result(embeddings[offset:offset + count])
+                offset += count
+
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.batched_texts += len(all_texts)
+                self.max_batch_seen = max(self.max_batch_seen, len(all_texts))
+                self.total_queue_wait += sum(started - request.enqueued_at for request in batch)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size_seen": self.max_batch_seen,
+                "avg_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "avg_queue_wait_ms": round(1000 * self.total_queue_wait / self.requests, 3) if self.requests else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+# Registry: model_name -> scheduler (one worker thread per model per process)
+_schedulers: Dict[str, EmbeddingScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+# Worker threads don't survive fork, so a forked child must start its own schedulers
+os.register_at_fork(after_in_child=_schedulers.clear)
+
+
+def get_embedding_scheduler(model_name: str, encode_fn: Callable[[List[str], str], np.ndarray]) -> EmbeddingScheduler:
+    """
+    Returns the scheduler for model_name, starting it on first use.
+    encode_fn(texts, model_name) performs the actual model call.
+    """
+    scheduler = _schedulers.get(model_name)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.get(model_name)
+            if scheduler is None:
+                scheduler = EmbeddingScheduler(
+                    lambda texts: encode_fn(texts, model_name),
+                    name=f"embedding-scheduler[{model_name}]",
+                )
+                _schedulers[model_name] = scheduler
+    return scheduler
+
+
+def get_scheduler_stats() -> dict:
+    """Queue depth and batch size metrics for every running scheduler."""
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    return {name: scheduler.stats() for name, scheduler in schedulers.items()}
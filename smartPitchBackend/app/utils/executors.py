@@ -0,0 +1,159 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+# Process pool for CPU-bound pure-Python work (PDF parsing, recruiter corpus scans); 0 runs it on the I/O threads.
+# Embedding never goes here: it stays on the API process's shared model and micro-batching scheduler (run_io).
+EXECUTOR_CPU_WORKERS = int(os.getenv("EXECUTOR_CPU_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Thread pool for blocking I/O and GIL-releasing work (file writes, SQLAlchemy, LLM calls, embedding, numpy search)
+EXECUTOR_IO_WORKERS = int(os.getenv("EXECUTOR_IO_WORKERS", 16))
+
+# Max tasks running or queued per pool; further callers wait (and count as queue wait) before submitting
+EXECUTOR_CPU_MAX_PENDING = int(os.getenv("EXECUTOR_CPU_MAX_PENDING", 4 * max(EXECUTOR_CPU_WORKERS, 1)))
+EXECUTOR_IO_MAX_PENDING = int(os.getenv("EXECUTOR_IO_MAX_PENDING", 4 * EXECUTOR_IO_WORKERS))
+
+# Worker processes are spawned, not forked: the parent already runs threads (embedding scheduler, torch)
+EXECUTOR_START_METHOD = os.getenv("EXECUTOR_START_METHOD", "spawn")
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict):
+    """Runs fn in the worker and reports when it started (wall clock, comparable across processes)."""
+    started = time.time()
+    return started, fn(*args, **kwargs)
+
+
+class BoundedExecutor:
+    """
+    A thread or process pool behind an asyncio semaphore, so at most max_pending tasks
+    are submitted at once. Records queue wait (call until the task starts running in
+    a worker) and run time.
+    """
+
+    def __init__(self, name: str, factory: Callable, max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        self._factory = factory
+        self._executor = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Runs fn(*args, **kwargs) in the pool and awaits its result."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+
+        enqueued = time.time()
+        self.waiting += 1
+        async with self._semaphore:
+            self.waiting -= 1
+            self.submitted += 1
+            self.in_flight += 1
+            try:
+                started, result = await loop.run_in_executor(
+                    self._get_executor(), functools.partial(_timed_call, fn, args, kwargs)
+                )
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM): drop the pool so the next call starts a fresh one
+                with self._lock:
+                    self._executor = None
+                self.failed += 1
+                raise
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+        finished = time.time()
+        wait = max(started - enqueued, 0.0)
+        with self._lock:
+            self.completed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.total_run += max(finished - started, 0.0)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed
+            return {
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": completed,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "avg_queue_wait_ms": round(1000 * self.total_wait / completed, 2) if completed else 0.0,
+                "max_queue_wait_ms": round(1000 * self.max_wait, 2),
+                "avg_run_ms": round(1000 * self.total_run / completed, 2) if completed else 0.0,
+            }
+
+
+_io_executor = BoundedExecutor(
+    "io",
+    lambda: ThreadPoolExecutor(max_workers=EXECUTOR_IO_WORKERS, thread_name_prefix="io"),
+    EXECUTOR_IO_MAX_PENDING,
+)
+
+_cpu_executor = BoundedExecutor(
+    "cpu",
+    lambda: ProcessPoolExecutor(
+        max_workers=EXECUTOR_CPU_WORKERS,
+        mp_context=multiprocessing.get_context(EXECUTOR_START_METHOD),
+    ),
+    EXECUTOR_CPU_MAX_PENDING,
+) if EXECUTOR_CPU_WORKERS > 0 else _io_executor
+
+
+async def run_cpu(fn: Callable, *args, **kwargs):
+    """
+    Awaits CPU-bound work in the process pool. fn and its arguments must be picklable
+    (module-level functions, plain data); state cached in this process is not visible there,
+    so nothing that encodes text belongs here (each worker would load its own model and batch alone).
+    """
+    return await _cpu_executor.run(fn, *args, **kwargs)
+
+
+async def run_io(fn: Callable, *args, **kwargs):
+    """Awaits blocking I/O (files, DB, network) on the I/O thread pool."""
+    return await _io_executor.run(fn, *args, **kwargs)
+
+
+def get_executor_stats() -> dict:
+    return {
+        "cpu": _cpu_executor.stats() if _cpu_executor is not _io_executor else {"disabled": True},
+        "io": _io_executor.stats(),
+    }
+
+
+def shutdown_executors():
+    _cpu_executor.shutdown()
+    _io_executor.shutdown()
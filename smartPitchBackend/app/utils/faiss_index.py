@@ -0,0 +1,289 @@
+import os
+import uuid
+import fcntl
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import faiss
+from app.utils.vector_bundle import VectorBundle
+from app.utils.vector_quantization import dequantize_embeddings
+from app.utils.search_engine import normalize_rows
+
+# Location of the shared resume chunk index snapshot (+ ".gen", ".<gen>.log" and ".lock" next to it)
+RESUME_INDEX_PATH = os.getenv("RESUME_INDEX_PATH", "./resume_index/resume.faiss")
+
+# Update log size (bytes) past which the writer folds the log into a new snapshot
+RESUME_INDEX_COMPACT_BYTES = int(os.getenv("RESUME_INDEX_COMPACT_BYTES", 64 * 1024 * 1024))
+
+# Vector ids encode the owner and the row in the owner's bundle: (user_id << 32) | bundle_row,
+# so one user's chunks (or one section's rows) form a contiguous id range usable as a search filter.
+_USER_SHIFT = 32
+_ROW_MASK = (1 << _USER_SHIFT) - 1
+
+# Update log record: magic, op, user_id, rows, dim, then rows x dim float32 (normalized)
+_RECORD = struct.Struct("<4sBqII")
+_RECORD_MAGIC = b"SPFL"
+_OP_UPSERT = 1
+_OP_REMOVE = 2
+
+
+def user_id_base(user_id: int) -> int:
+    """First vector id reserved for user_id; stored in VectorMeta.faiss_vector_id."""
+    return int(user_id) << _USER_SHIFT
+
+
+def _user_range(user_id: int) -> faiss.IDSelectorRange:
+    base = user_id_base(user_id)
+    return faiss.IDSelectorRange(base, base + (1 << _USER_SHIFT))
+
+
+def best_rows(scores: np.ndarray, rows: np.ndarray, k: int, user_id: int) -> List[Tuple[float, int, int]]:
+    """Merges search_rows results over all queries: each row's best score, top k rows as (score, user_id, row)."""
+    best: Dict[int, float] = {}
+    for score, row in zip(scores.ravel(), rows.ravel()):
+        if row < 0:
+            continue
+        row = int(row)
+        if score > best.get(row, -np.inf):
+            best[row] = float(score)
+    ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:k]
+    return [(score, int(user_id), row) for row, score in ranked]
+
+
+class ResumeFaissIndex:
+    """
+    Exact inner-product FAISS index over every resume chunk of every user.
+    Vectors are normalized, so scores are cosine similarities; ids are derived from
+    (user_id, bundle row), so no id mapping is kept.
+    Persistence is a snapshot plus an append-only update log: an upload appends one
+    record with the user's rows (O(user), under a short exclusive file lock) and every
+    worker replays only the records it has not applied yet. Once the log passes
+    RESUME_INDEX_COMPACT_BYTES the writer folds it into a new snapshot generation.
+    """
+
+    def __init__(self, index_path: str = RESUME_INDEX_PATH):
+        self.index_path = index_path
+        self.gen_path = index_path + ".gen"
+        self.lock_path = index_path + ".lock"
+        self._lock = threading.RLock()
+        self.index: Optional[faiss.IndexIDMap2] = None
+        self.user_rows: Dict[int, int] = {}
+        self._generation: Optional[int] = None
+        self._log_offset = 0
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+
+    def _log_path(self, generation: int) -> str:
+        return f"{self.index_path}.{generation}.log"
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self.gen_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _file_lock(self, mode: int):
+        lock_file = open(self.lock_path, "a")
+        fcntl.flock(lock_file, mode)
+        return lock_file
+
+    def _load_snapshot(self, generation: int):
+        """Loads the snapshot the log of this generation applies to. Caller holds the locks."""
+        if os.path.exists(self.index_path):
+            self.index = faiss.read_index(self.index_path)
+            ids = faiss.vector_to_array(self.index.id_map) if self.index.ntotal else np.zeros(0, dtype=np.int64)
+            users, counts = np.unique(ids >> _USER_SHIFT, return_counts=True)
+            self.user_rows = {int(user): int(count) for user, count in zip(users, counts)}
+        else:
+            self.index = None
+            self.user_rows = {}
+        self._generation = generation
+        self._log_offset = 0
+
+    def _apply(self, op: int, user_id: int, matrix: Optional[np.ndarray]):
+        """Applies one update to the in-memory index. Caller holds the lock."""
+        if self.index is not None and self.user_rows.pop(user_id, 0):
+            self.index.remove_ids(_user_range(user_id))
+        if op == _OP_UPSERT and matrix is not None and len(matrix):
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(matrix.shape[1]))
+            base = user_id_base(user_id)
+            self.index.add_with_ids(matrix, np.arange(base, base + len(matrix), dtype=np.int64))
+            self.user_rows[user_id] = len(matrix)
+
+    def _sync(self, repair: bool = False):
+        """
+        Catches up with the persisted state: reloads the snapshot when a new generation was
+        written, then replays the log records appended since the last sync. A torn record
+        at the end of the log (a writer died mid-append) is skipped, and cut off when repair
+        is set (only writers, who hold the exclusive lock, repair). Caller holds the locks.
+        """
+        generation = self._read_generation()
+        if generation != self._generation:
+            self._load_snapshot(generation)
+
+        log_path = self._log_path(generation)
+        if not os.path.exists(log_path):
+            return
+        with open(log_path, "r+b" if repair else "rb") as f:
+            f.seek(self._log_offset)
+            while True:
+                start = f.tell()
+                head = f.read(_RECORD.size)
+                if not head:
+                    break
+                torn = len(head) < _RECORD.size
+                if not torn:
+                    magic, op, user_id, rows, dim = _RECORD.unpack(head)
+                    payload = f.read(rows * dim * 4)
+                    torn = magic != _RECORD_MAGIC or len(payload) < rows * dim * 4
+                if torn:
+                    if repair:
+                        f.truncate(start)
+                    break
+                matrix = np.frombuffer(payload, dtype=np.float32).reshape(rows, dim) if rows else None
+                self._apply(op, user_id, matrix)
+                self._log_offset = f.tell()
+
+    def _compact(self):
+        """Writes the current index as the next generation's snapshot and drops the old log. Caller holds the locks."""
+        if self.index is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        suffix = uuid.uuid4().hex
+        tmp_index = os.path.join(directory, f".index.{suffix}.tmp")
+        tmp_gen = os.path.join(directory, f".gen.{suffix}.tmp")
+        old_log = self._log_path(self._generation)
+        generation = self._generation + 1
+        try:
+            faiss.write_index(self.index, tmp_index)
+            with open(tmp_gen, "w", encoding="utf-8") as f:
+                f.write(str(generation))
+            os.replace(tmp_index, self.index_path)
+            # The generation file is replaced last: it marks the snapshot as complete for readers
+            os.replace(tmp_gen, self.gen_path)
+        finally:
+            for path in (tmp_index, tmp_gen):
+                if os.path.exists(path):
+                    os.remove(path)
+        if os.path.exists(old_log):
+            os.remove(old_log)
+        self._generation = generation
+        self._log_offset = 0
+        print(f"Compacted resume index into generation {generation} ({self.index.ntotal} vectors)")
+
+    def _append(self, op: int, user_id: int, matrix: Optional[np.ndarray] = None):
+        """Appends one update to the log and applies it. Only the user's rows are written."""
+        rows, dim = (0, 0) if matrix is None else matrix.shape
+        record = _RECORD.pack(_RECORD_MAGIC, op, int(user_id), rows, dim)
+        if matrix is not None:
+            record += np.ascontiguousarray(matrix, dtype=np.float32).tobytes()
+        with self._lock:
+            lock_file = self._file_lock(fcntl.LOCK_EX)
+            try:
+                self._sync(repair=True)
+                with open(self._log_path(self._generation), "ab") as f:
+                    f.write(record)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._apply(op, int(user_id), matrix)
+                self._log_offset += len(record)
+                if self._log_offset >= RESUME_INDEX_COMPACT_BYTES:
+                    self._compact()
+            finally:
+                lock_file.close()
+
+    def upsert_user(self, user_id: int, bundle: VectorBundle) -> int:
+        """Replaces all of the user's vectors with the rows of their bundle. Returns vectors added."""
+        matrix = dequantize_embeddings(np.asarray(bundle.matrix),
+                                       None if bundle.scales is None else np.asarray(bundle.scales))
+        self._append(_OP_UPSERT, user_id, normalize_rows(matrix) if bundle.rows else None)
+        return bundle.rows
+
+    def remove_user(self, user_id: int) -> int:
+        """Deletes every vector of the user. Returns the number removed."""
+        with self._lock:
+            self._synced()
+            removed = self.user_rows.get(int(user_id), 0)
+        if removed:
+            self._append(_OP_REMOVE, user_id)
+        return removed
+
+    def _synced(self):
+        """Brings this worker up to date with the persisted index under a shared file lock. Caller holds the lock."""
+        lock_file = self._file_lock(fcntl.LOCK_SH)
+        try:
+            self._sync()
+        finally:
+            lock_file.close()
+
+    def user_vectors(self, user_id: int) -> int:
+        """Number of the user's vectors in the index (0 e.g. for users uploaded before it was enabled)."""
+        with self._lock:
+            self._synced()
+            return self.user_rows.get(int(user_id), 0)
+
+    def search_rows(
+        self,
+        queries: np.ndarray,
+        k: int,
+        user_id: int,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per query row, the k best of the user's vectors (restricted to bundle rows
+        row_range=(start, stop) when given). Returns (scores, bundle_rows), each
+        (n_queries, k), best first; missing neighbours have row -1.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        base = user_id_base(user_id)
+        start, stop = row_range if row_range is not None else (0, 1 << _USER_SHIFT)
+        params = faiss.SearchParameters(sel=faiss.IDSelectorRange(base + start, base + stop))
+
+        with self._lock:
+            self._synced()
+            if self.index is None or self.index.ntotal == 0:
+                return (np.full((len(queries), k), -np.inf, dtype=np.float32),
+                        np.full((len(queries), k), -1, dtype=np.int64))
+            scores, ids = self.index.search(queries, k, params=params)
+        return scores, np.where(ids < 0, -1, ids & _ROW_MASK)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        user_id: int,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> List[Tuple[float, int, int]]:
+        """
+        Searches the user's vectors with every query row and keeps each chunk's best score.
+        row_range=(start, stop) restricts the search to those bundle rows (e.g. one section).
+        Returns up to k (score, user_id, bundle_row) tuples, best first.
+        """
+        scores, rows = self.search_rows(queries, k, user_id, row_range)
+        return best_rows(scores, rows, k, user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "vectors": 0 if self.index is None else int(self.index.ntotal),
+                "users": len(self.user_rows),
+                "generation": self._generation,
+                "log_bytes": self._log_offset,
+                "index_path": self.index_path,
+            }
+
+
+_index: Optional[ResumeFaissIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_resume_index() -> ResumeFaissIndex:
+    """Returns the process-wide resume index, loading it from disk on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ResumeFaissIndex()
+    return _index
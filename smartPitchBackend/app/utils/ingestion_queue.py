@@ -0,0 +1,347 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import multiprocessing
+from typing import Callable, List, Optional
+
+# SQLite file holding the durable resume ingestion queue, shared by API and worker processes
+INGESTION_QUEUE_PATH = os.getenv("INGESTION_QUEUE_PATH", "./ingestion_jobs.db")
+
+# Worker processes started with the API; 0 leaves the queue to `python -m app.ingestion_worker`
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", 2))
+
+# Back-pressure: uploads are refused while this many jobs are queued or running
+INGESTION_MAX_PENDING = int(os.getenv("INGESTION_MAX_PENDING", 100))
+
+# Attempts per job before it is marked failed, and the base of the exponential retry backoff (seconds)
+INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", 3))
+INGESTION_RETRY_BACKOFF = float(os.getenv("INGESTION_RETRY_BACKOFF", 5))
+
+# A running job whose worker stops renewing it for this long is handed to another worker
+INGESTION_LEASE_SECONDS = int(os.getenv("INGESTION_LEASE_SECONDS", 300))
+
+# Idle workers poll the queue this often (seconds)
+INGESTION_POLL_INTERVAL = float(os.getenv("INGESTION_POLL_INTERVAL", 1.0))
+
+# The API checks its worker processes this often and respawns dead ones (seconds)
+INGESTION_MONITOR_INTERVAL = float(os.getenv("INGESTION_MONITOR_INTERVAL", 5.0))
+
+# Pipeline stages, in order, reported by the status endpoint
+INGESTION_STAGES = ["save", "parse", "embed", "record", "index"]
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised by enqueue when INGESTION_MAX_PENDING jobs are already waiting or running."""
+
+
+def discard_staged_upload(payload: dict):
+    """Deletes the job's staged upload (payload["staged_path"]) once no attempt will read it again."""
+    staged_path = payload.get("staged_path")
+    if staged_path and os.path.exists(staged_path):
+        try:
+            os.remove(staged_path)
+        except OSError as e:
+            print(f"Could not remove staged upload {staged_path}: {e}")
+
+
+class IngestionQueue:
+    """
+    Durable job queue in SQLite. Jobs are claimed atomically with a lease, so several
+    worker processes (or API workers each running a pool) can share one queue; a job
+    whose worker died is reclaimed when its lease expires.
+    """
+
+    def __init__(self, db_path: str = INGESTION_QUEUE_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingestion_jobs ("
+            " id TEXT PRIMARY KEY,"
+            " user_email TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " stage TEXT,"
+            " stages_done INTEGER NOT NULL DEFAULT 0,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " error TEXT,"
+            " result TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " not_before REAL NOT NULL,"
+            " lease_until REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status, not_before)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; isolation_level=None so transactions are explicit."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, user_email: str, payload: dict, max_attempts: int = INGESTION_MAX_ATTEMPTS,
+                max_pending: int = INGESTION_MAX_PENDING) -> str:
+        """Adds a job and returns its id. Raises QueueFullError when the queue is at capacity."""
+        conn = self._conn()
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (pending,) = conn.execute(
+                "SELECT COUNT(*) FROM ingestion_jobs WHERE status IN (?, ?)", (STATUS_QUEUED, STATUS_RUNNING)
+            ).fetchone()
+            if pending >= max_pending:
+                raise QueueFullError(f"{pending} ingestion jobs pending, try again later.")
+            conn.execute(
+                "INSERT INTO ingestion_jobs (id, user_email, payload, status, max_attempts, created_at, updated_at, not_before)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_email, json.dumps(payload), STATUS_QUEUED, max_attempts, now, now, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def claim(self, lease_seconds: int = INGESTION_LEASE_SECONDS) -> Optional[dict]:
+        """
+        Takes the oldest runnable job: queued and due, or running with an expired lease and
+        attempts left. Expired jobs without attempts left (their worker crashed or hung on
+        every attempt) are marked failed instead of being leased again.
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            exhausted = conn.execute(
+                "SELECT id, attempts, payload FROM ingestion_jobs"
+                " WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                (STATUS_RUNNING, now),
+            ).fetchall()
+            for job in exhausted:
+                conn.execute(
+                    "UPDATE ingestion_jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                    (STATUS_FAILED, f"Lease expired on attempt {job['attempts']} (worker died or hung)", now, job["id"]),
+                )
+            row = conn.execute(
+                "SELECT * FROM ingestion_jobs"
+                " WHERE (status = ? AND not_before <= ?) OR (status = ? AND lease_until < ? AND attempts < max_attempts)"
+                " ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED, now, STATUS_RUNNING, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE ingestion_jobs SET status = ?, attempts = attempts + 1, lease_until = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (STATUS_RUNNING, now + lease_seconds, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        for job in exhausted:
+            print(f"Ingestion job {job['id']} failed: lease expired on its last attempt")
+            discard_staged_upload(json.loads(job["payload"]))
+        if row is None:
+            return None
+        job = dict(row)
+        job["attempts"] += 1
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def set_stage(self, job_id: str, stage: str, lease_seconds: int = INGESTION_LEASE_SECONDS):
+        """Records the stage a running job entered and renews its lease."""
+        now = time.time()
+        self._conn().execute(
+            "UPDATE ingestion_jobs SET stage = ?, stages_done = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+            (stage, INGESTION_STAGES.index(stage), now + lease_seconds, now, job_id),
+        )
+
+    def complete(self, job_id: str, result: dict):
+        now = time.time()
+        self._conn().execute(
+            "UPDATE ingestion_jobs SET status = ?, stage = NULL, stages_done = ?, result = ?, error = NULL,"
+            " lease_until = NULL, updated_at = ? WHERE id = ?",
+            (STATUS_SUCCEEDED, len(INGESTION_STAGES), json.dumps(result, default=str), now, job_id),
+        )
+
+    def fail(self, job: dict, error: str, backoff: float = INGESTION_RETRY_BACKOFF) -> bool:
+        """
+        Requeues the job with exponential backoff, or marks it failed when out of attempts
+        (and deletes its staged upload, nothing will read it again). True if retried.
+        """
+        now = time.time()
+        retry = job["attempts"] < job["max_attempts"]
+        self._conn().execute(
+            "UPDATE ingestion_jobs SET status = ?, error = ?, lease_until = NULL, not_before = ?, updated_at = ?"
+            " WHERE id = ?",
+            (
+                STATUS_QUEUED if retry else STATUS_FAILED,
+                error,
+                now + backoff * (2 ** (job["attempts"] - 1)) if retry else now,
+                now,
+                job["id"],
+            ),
+        )
+        if not retry:
+            discard_staged_upload(job["payload"])
+        return retry
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def stats(self) -> dict:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM ingestion_jobs GROUP BY status").fetchall()
+        counts = {status: count for status, count in rows}
+        return {
+            "jobs": counts,
+            "pending": counts.get(STATUS_QUEUED, 0) + counts.get(STATUS_RUNNING, 0),
+            "max_pending": INGESTION_MAX_PENDING,
+            "workers": INGESTION_WORKERS,
+            **get_worker_stats(),
+        }
+
+
+def describe_job(job: dict) -> dict:
+    """Status view of a job for clients."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "stages": INGESTION_STAGES,
+        "stages_done": job["stages_done"],
+        "progress": round(job["stages_done"] / len(INGESTION_STAGES), 2),
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "error": job["error"],
+        "result": job["result"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+_queue: Optional[IngestionQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_ingestion_queue() -> IngestionQueue:
+    """Returns the process-wide handle on the ingestion queue."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = IngestionQueue()
+    return _queue
+
+
+def run_worker(handler: Callable[[dict, Callable[[str], None]], dict], stop_event=None,
+               poll_interval: float = INGESTION_POLL_INTERVAL):
+    """
+    Worker loop: claims jobs and runs handler(payload, set_stage) until stop_event is set.
+    The handler's return value is stored as the job result; an exception retries the job.
+    """
+    queue = get_ingestion_queue()
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        try:
+            result = handler(job["payload"], lambda stage: queue.set_stage(job["id"], stage))
+        except Exception as e:
+            retried = queue.fail(job, f"{type(e).__name__}: {e}")
+            print(f"Ingestion job {job['id']} failed (attempt {job['attempts']}): {e}"
+                  f"{', retrying' if retried else ''}")
+            continue
+        queue.complete(job["id"], result)
+        print(f"Ingestion job {job['id']} done")
+
+
+def _worker_main(stop_event):
+    from app.utils.upload_utils import ingest_resume_job
+    run_worker(ingest_resume_job, stop_event)
+
+
+_processes: List[multiprocessing.Process] = []
+_processes_lock = threading.Lock()
+_stop_event = None
+_monitor: Optional[threading.Thread] = None
+_worker_restarts = 0
+
+
+def _spawn_worker(context, idx: int) -> multiprocessing.Process:
+    process = context.Process(target=_worker_main, args=(_stop_event,), name=f"ingestion-{idx}", daemon=True)
+    process.start()
+    return process
+
+
+def _monitor_workers(context):
+    """Respawns worker processes that died (crash, OOM kill) until the workers are stopped."""
+    global _worker_restarts
+    while not _stop_event.wait(INGESTION_MONITOR_INTERVAL):
+        with _processes_lock:
+            for idx, process in enumerate(_processes):
+                if process.is_alive() or _stop_event.is_set():
+                    continue
+                print(f"Ingestion worker {process.name} exited with code {process.exitcode}, restarting")
+                _processes[idx] = _spawn_worker(context, idx)
+                _worker_restarts += 1
+
+
+def get_worker_stats() -> dict:
+    """Worker processes of this API process: how many are alive and how often they were respawned."""
+    with _processes_lock:
+        return {
+            "workers_alive": sum(1 for process in _processes if process.is_alive()),
+            "worker_restarts": _worker_restarts,
+        }
+
+
+def start_ingestion_workers(count: int = INGESTION_WORKERS):
+    """Spawns the ingestion worker processes and their monitor (idempotent per API process)."""
+    global _stop_event, _monitor
+    if _processes or count <= 0:
+        return
+    context = multiprocessing.get_context("spawn")
+    _stop_event = context.Event()
+    with _processes_lock:
+        for idx in range(count):
+            _processes.append(_spawn_worker(context, idx))
+    _monitor = threading.Thread(target=_monitor_workers, args=(context,), name="ingestion-monitor", daemon=True)
+    _monitor.start()
+    print(f"Started {count} ingestion workers")
+
+
+def stop_ingestion_workers(timeout: float = 10.0):
+    global _monitor
+    if _stop_event is not None:
+        _stop_event.set()
+    if _monitor is not None:
+        _monitor.join(timeout)
+        _monitor = None
+    with _processes_lock:
+        for process in _processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        _processes.clear()
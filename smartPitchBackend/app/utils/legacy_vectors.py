@@ -0,0 +1,50 @@
+import os
+import glob
+import json
+from typing import Optional
+import numpy as np
+from app.utils.vector_bundle import write_bundle, bundle_path, open_bundle
+from app.utils.lexical_index import write_lexical_index
+from app.utils.search_engine import normalize_rows
+
+# Model every pre-bundle folder was embedded with (it was hard-coded before the model registry)
+LEGACY_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def has_legacy_vectors(folder: str) -> bool:
+    """True for a pre-bundle vector folder: one <section>.json (+ <section>.npy) per section, no bundle."""
+    return not os.path.exists(bundle_path(folder)) and bool(glob.glob(os.path.join(folder, "*.json")))
+
+
+def migrate_legacy_folder(folder: str) -> Optional[str]:
+    """
+    Builds the bundle of a pre-bundle vector folder in place from its section .json and .npy
+    files, so users who uploaded before bundles existed keep working without re-uploading.
+    The stored vectors are reused as is (normalized); sections that are not embedded any more
+    (header) and sections whose row count does not match their chunks keep their content only.
+    The old files are left untouched.
+    Returns the bundle path, or None when the folder holds no legacy sections.
+    """
+    from app.utils.embedding_model import is_embedded_section, section_texts
+
+    sections = {}
+    embeddings = {}
+    for json_path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+        section_name = os.path.splitext(os.path.basename(json_path))[0]
+        with open(json_path, "r", encoding="utf-8") as f:
+            sections[section_name] = json.load(f)
+
+        npy_path = os.path.join(folder, f"{section_name}.npy")
+        if is_embedded_section(section_name) and os.path.exists(npy_path):
+            matrix = np.atleast_2d(np.load(npy_path)).astype(np.float32)
+            if len(matrix) != len(section_texts(sections[section_name])):
+                print(f"Skipping embeddings of {npy_path}: {len(matrix)} rows for a different number of chunks")
+            elif len(matrix):
+                embeddings[section_name] = normalize_rows(matrix)
+
+    if not sections:
+        return None
+    path = write_bundle(bundle_path(folder), sections, embeddings, LEGACY_EMBEDDING_MODEL, normalized=True)
+    write_lexical_index(folder, open_bundle(folder))
+    print(f"Migrated legacy vector folder {folder} into {path} ({len(embeddings)} embedded sections)")
+    return path
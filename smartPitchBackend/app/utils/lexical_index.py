@@ -0,0 +1,186 @@
+import os
+import re
+import math
+import uuid
+import hashlib
+from collections import Counter
+from typing import Dict, List, Optional
+import numpy as np
+from app.utils.vector_bundle import VectorBundle
+from app.utils.embedding_model import section_texts
+
+# Per-user BM25 index stored next to the vector bundle
+LEXICAL_FILENAME = "resume.bm25.npz"
+
+# BM25 parameters
+BM25_K1 = float(os.getenv("BM25_K1", 1.2))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+# Keeps skill tokens such as "c++", "c#", "node.js", "ci/cd" in one piece
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./-]*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms of a text; trailing punctuation is stripped ("python." -> "python")."""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        token = token.rstrip("./-")
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def bundle_chunk_texts(bundle: VectorBundle) -> List[str]:
+    """Texts of the bundle's embedded chunks, one per matrix row, in row order."""
+    texts = []
+    for name, meta in bundle.sections.items():
+        if meta["row_count"]:
+            texts.extend(section_texts(bundle.section_content(name))[:meta["row_count"]])
+    return texts
+
+
+def _texts_hash(texts: List[str]) -> str:
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over one resume's chunks (documents = bundle rows).
+    Postings are stored as flat arrays: the postings of term t are
+    doc_ids[term_offsets[t]:term_offsets[t + 1]] with their precomputed BM25 weights,
+    so scoring a query is a few slice-and-add operations.
+    """
+
+    def __init__(self, terms: List[str], term_offsets: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, rows: int, source_hash: str):
+        self.term_ids: Dict[str, int] = {term: idx for idx, term in enumerate(terms)}
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.rows = rows
+        self.source_hash = source_hash
+
+    @property
+    def nbytes(self) -> int:
+        return (self.term_offsets.nbytes + self.doc_ids.nbytes + self.weights.nbytes
+                + sum(len(term) + 64 for term in self.term_ids))
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = BM25_K1, b: float = BM25_B) -> "LexicalIndex":
+        """Builds the index from chunk texts (row i of the bundle = texts[i])."""
+        doc_terms = [Counter(tokenize(text)) for text in texts]
+        doc_len = np.array([sum(counts.values()) for counts in doc_terms], dtype=np.float32)
+        avg_len = float(doc_len.mean()) if len(texts) and doc_len.mean() > 0 else 1.0
+
+        postings: Dict[str, List[tuple]] = {}
+        for doc_id, counts in enumerate(doc_terms):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        terms = sorted(postings)
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids = []
+        weights = []
+        n_docs = len(texts)
+        for idx, term in enumerate(terms):
+            term_postings = postings[term]
+            idf = math.log(1.0 + (n_docs - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+            for doc_id, tf in term_postings:
+                norm = k1 * (1.0 - b + b * doc_len[doc_id] / avg_len)
+                doc_ids.append(doc_id)
+                weights.append(idf * tf * (k1 + 1.0) / (tf + norm))
+            term_offsets[idx + 1] = len(doc_ids)
+
+        return cls(
+            terms,
+            term_offsets,
+            np.array(doc_ids, dtype=np.int32),
+            np.array(weights, dtype=np.float32),
+            n_docs,
+            _texts_hash(texts),
+        )
+
+    def score_matrix(self, queries: List[str], normalize: bool = True) -> np.ndarray:
+        """
+        (n_queries, rows) BM25 scores of every query text against every chunk.
+        normalize=True divides each query row by its best score, giving [0, 1] values
+        that can be fused with cosine similarities.
+        """
+        scores = np.zeros((len(queries), self.rows), dtype=np.float32)
+        for q, query in enumerate(queries):
+            for term in set(tokenize(query)):
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    continue
+                start, stop = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+                scores[q, self.doc_ids[start:stop]] += self.weights[start:stop]
+        if normalize and scores.size:
+            peaks = scores.max(axis=1, keepdims=True)
+            peaks[peaks == 0] = 1.0
+            scores /= peaks
+        return scores
+
+    def save(self, path: str) -> str:
+        """Writes the index next to its destination and renames it into place."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+        terms = sorted(self.term_ids, key=self.term_ids.get)
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    terms=np.array(terms, dtype=str),
+                    term_offsets=self.term_offsets,
+                    doc_ids=self.doc_ids,
+                    weights=self.weights,
+                    rows=np.array(self.rows),
+                    source_hash=np.array(self.source_hash),
+                )
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["terms"].tolist(),
+                data["term_offsets"],
+                data["doc_ids"],
+                data["weights"],
+                int(data["rows"]),
+                str(data["source_hash"]),
+            )
+
+
+def lexical_path(folder: str) -> str:
+    return os.path.join(folder, LEXICAL_FILENAME)
+
+
+def write_lexical_index(folder: str, bundle: VectorBundle) -> str:
+    """Rebuilds the user's BM25 index from their bundle; a re-upload only rewrites this user's file."""
+    return LexicalIndex.build(bundle_chunk_texts(bundle)).save(lexical_path(folder))
+
+
+def load_lexical_index(folder: str, bundle: VectorBundle) -> Optional[LexicalIndex]:
+    """
+    Loads the user's BM25 index, rebuilding it in memory when the file is missing
+    (resumes uploaded before the index existed) or was written for another bundle.
+    """
+    texts = bundle_chunk_texts(bundle)
+    if not texts:
+        return None
+    try:
+        index = LexicalIndex.load(lexical_path(folder))
+        if index.rows == len(texts) and index.source_hash == _texts_hash(texts):
+            return index
+    except (FileNotFoundError, ValueError, KeyError, OSError):
+        pass
+    return LexicalIndex.build(texts)
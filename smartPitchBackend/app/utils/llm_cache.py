@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Tuple
+
+# LLM_CACHE=0 sends every prompt upstream
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+
+# Max number of responses kept in the in-memory LRU tier (per worker process)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 1000))
+
+# Seconds a response stays valid in either tier
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 3600))
+
+# SQLite file backing the shared tier across workers; empty string disables it
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+
+# Seconds a coalesced caller waits for the identical in-flight call before going upstream itself
+LLM_CACHE_WAIT_TIMEOUT = float(os.getenv("LLM_CACHE_WAIT_TIMEOUT", 120))
+
+
+def llm_cache_key(chat_model, messages: list) -> str:
+    """SHA-256 of the model class, its parameters (model name, temperature, max tokens...) and the rendered messages."""
+    params = getattr(chat_model, "_identifying_params", None) or {}
+    payload = {
+        "model_class": type(chat_model).__name__,
+        "params": params,
+        "messages": [[message.type, message.content] for message in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier cache of LLM responses keyed by llm_cache_key, with a TTL.
+    - memory tier: bounded LRU of (stored_at, text)
+    - disk tier: SQLite table shared by all workers
+    Identical prompts in flight at the same time are single-flighted: the first caller
+    goes upstream, the others wait for its result.
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE, ttl: int = LLM_CACHE_TTL,
+                 db_path: Optional[str] = LLM_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                " key TEXT PRIMARY KEY,"
+                " stored_at REAL NOT NULL,"
+                " response TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_stored_at ON llm_responses (stored_at)")
+            self._conn.commit()
+
+    def _remember(self, key: str, stored_at: float, text: str):
+        """Inserts into the LRU tier, evicting the least recently used entries. Caller holds the lock."""
+        self._memory[key] = (stored_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for key, or None if missing or expired."""
+        oldest = time.time() - self.ttl
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] >= oldest:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT stored_at, response FROM llm_responses WHERE key = ? AND stored_at >= ?",
+                        (key, oldest),
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"LLM cache read failed: {e}")
+                    row = None
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[1]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str):
+        """Stores a response in both tiers and drops expired rows from the disk tier."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, text)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, stored_at, response) VALUES (?, ?, ?)",
+                    (key, now, text),
+                )
+                self._conn.execute("DELETE FROM llm_responses WHERE stored_at < ?", (now - self.ttl,))
+                self._conn.commit()
+
+    def begin(self, key: str) -> Tuple[bool, Future]:
+        """
+        Registers a call for key. Returns (True, future) to the caller that must go upstream
+        and then call finish, (False, future) to callers that should wait on the future.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return False, future
+            future = Future()
+            self._in_flight[key] = future
+            return True, future
+
+    def finish(self, key: str, future: Future, text: Optional[str] = None, error: Optional[BaseException] = None):
+        """
+        Publishes the upstream result to waiting callers and caches it on success.
+        A failed cache write (e.g. "database is locked") is only logged: waiters are always released.
+        """
+        try:
+            if error is None:
+                self.put(key, text)
+        except Exception as e:
+            print(f"LLM cache write failed: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            if error is None:
+                future.set_result(text)
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "in_flight": len(self._in_flight),
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+            }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Returns the process-wide LLM response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
+
+
+def cached_invoke(chat_model, messages: list) -> str:
+    """chat_model.invoke(messages).content through the cache, single-flighting identical prompts."""
+    if not LLM_CACHE_ENABLED:
+        return chat_model.invoke(messages).content
+
+    cache = get_llm_cache()
+    key = llm_cache_key(chat_model, messages)
+    text = cache.get(key)
+    if text is not None:
+        return text
+
+    leader, future = cache.begin(key)
+    if not leader:
+        try:
+            return future.result(timeout=LLM_CACHE_WAIT_TIMEOUT)
+        except FutureTimeoutError:
+            print("LLM cache: in-flight call timed out, calling the LLM directly")
+            return chat_model.invoke(messages).content
+    try:
+        text = chat_model.invoke(messages).content
+    except BaseException as e:
+        cache.finish(key, future, error=e)
+        raise
+    cache.finish(key, future, text)
+    return text
+
+
+async def cached_astream(chat_model, messages: List):
+    """
+    Streams chat_model.astream(messages) text fragments through the cache: a cached or
+    coalesced response is yielded as one fragment, a fresh one is cached once it completed.
+    """
+    if not LLM_CACHE_ENABLED:
+        async for chunk in chat_model.astream(messages):
+            if chunk.content:
+                yield chunk.content
+        return
+
+    cache = get_llm_cache()
+    key = llm_cache_key(chat_model, messages)
+    text = cache.get(key)
+    if text is not None:
+        yield text
+        return
+
+    leader, future = cache.begin(key)
+    if not leader:
+        try:
+            text = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), LLM_CACHE_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            print("LLM cache: in-flight call timed out, streaming from the LLM directly")
+            async for chunk in chat_model.astream(messages):
+                if chunk.content:
+                    yield chunk.content
+            return
+        yield text
+        return
+
+    parts = []
+    try:
+        async for chunk in chat_model.astream(messages):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+    except BaseException as e:
+        # Also covers the client disconnecting mid-stream: waiters must not hang
+        cache.finish(key, future, error=e if isinstance(e, Exception) else RuntimeError("LLM stream aborted"))
+        raise
+    cache.finish(key, future, "".join(parts))
@@ -0,0 +1,224 @@
+import os
+import time
+import queue
+import smtplib
+import threading
+from collections import deque
+from typing import List, Optional
+from dotenv import load_dotenv
+
+# Loading environment variables from .env file
+load_dotenv()
+
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
+SMTP_USERNAME = os.getenv('SMTP_USERNAME')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
+
+# SMTP_STARTTLS=0 talks plain SMTP (local stand-in server, relays on localhost)
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') != '0'
+
+# Socket timeout of SMTP connections (seconds)
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', 10))
+
+# Sender threads, each keeping one SMTP connection open: the size of the connection pool
+MAIL_POOL_SIZE = int(os.getenv('MAIL_POOL_SIZE', 2))
+
+# Outbound queue bound; enqueue is refused beyond it so a stalled server cannot grow memory
+MAIL_QUEUE_SIZE = int(os.getenv('MAIL_QUEUE_SIZE', 1000))
+
+# Send attempts per message, and the base of the backoff between them (seconds)
+MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', 3))
+MAIL_RETRY_BACKOFF = float(os.getenv('MAIL_RETRY_BACKOFF', 1.0))
+
+# A connection idle this long is closed (servers drop idle clients anyway); reopened on the next message
+MAIL_IDLE_TIMEOUT = float(os.getenv('MAIL_IDLE_TIMEOUT', 60))
+
+
+class SMTPConnection:
+    """
+    One SMTP session that is kept open between messages. It connects (STARTTLS, login)
+    on first use and reconnects once when the server dropped the session in between.
+    """
+
+    def __init__(self, host: str = None, port: int = None, username: str = None, password: str = None,
+                 starttls: bool = None, timeout: float = SMTP_TIMEOUT):
+        self.host = SMTP_HOST if host is None else host
+        self.port = SMTP_PORT if port is None else port
+        self.username = SMTP_USERNAME if username is None else username
+        self.password = SMTP_PASSWORD if password is None else password
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self.timeout = timeout
+        self.server: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+        self.connects = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except BaseException:
+            server.close()
+            raise
+        self.server = server
+        self.connects += 1
+
+    def send(self, from_addr: str, to_addrs: List[str], message: str):
+        """Sends over the open session; a session the server closed is reopened and the send retried once."""
+        if self.server is None:
+            self._connect()
+        try:
+            self.server.sendmail(from_addr, to_addrs, message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self.close()
+            self._connect()
+            self.server.sendmail(from_addr, to_addrs, message)
+        self.last_used = time.time()
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+
+class MailDelivery:
+    """
+    Bounded outbound mail queue drained by MAIL_POOL_SIZE sender threads, each with a
+    persistent SMTPConnection. enqueue() only puts the message on the queue, so request
+    handlers never wait on SMTP. Failed sends are retried with backoff, then dropped and counted.
+    """
+
+    def __init__(self, pool_size: int = MAIL_POOL_SIZE, queue_size: int = MAIL_QUEUE_SIZE,
+                 max_attempts: int = MAIL_MAX_ATTEMPTS, connection_factory=SMTPConnection):
+        self.pool_size = pool_size
+        self.max_attempts = max_attempts
+        self.connection_factory = connection_factory
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._connections: List[SMTPConnection] = []
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.enqueued = 0
+        self.rejected = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        """Starts the sender threads (idempotent)."""
+        with self._lock:
+            if self._threads:
+                return
+            for idx in range(self.pool_size):
+                connection = self.connection_factory()
+                thread = threading.Thread(target=self._run, args=(connection,), name=f"mail-sender-{idx}", daemon=True)
+                self._connections.append(connection)
+                self._threads.append(thread)
+                thread.start()
+
+    def enqueue(self, from_addr: str, to_addrs: List[str], message: str) -> bool:
+        """Queues a message for delivery. False when the queue is full."""
+        self.start()
+        try:
+            self._queue.put_nowait((from_addr, to_addrs, message, time.time()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _deliver(self, connection: SMTPConnection, from_addr: str, to_addrs: List[str], message: str) -> bool:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                connection.send(from_addr, to_addrs, message)
+                return True
+            except Exception as e:
+                connection.close()
+                print(f"Mail to {', '.join(to_addrs)} failed (attempt {attempt}/{self.max_attempts}): {e}")
+                if attempt < self.max_attempts:
+                    with self._lock:
+                        self.retried += 1
+                    time.sleep(MAIL_RETRY_BACKOFF * (2 ** (attempt - 1)))
+        return False
+
+    def _run(self, connection: SMTPConnection):
+        while True:
+            try:
+                item = self._queue.get(timeout=MAIL_IDLE_TIMEOUT)
+            except queue.Empty:
+                connection.close()
+                continue
+            if item is None:
+                self._queue.task_done()
+                connection.close()
+                return
+            from_addr, to_addrs, message, enqueued_at = item
+            delivered = self._deliver(connection, from_addr, to_addrs, message)
+            with self._lock:
+                if delivered:
+                    self.sent += 1
+                    self._latencies.append(time.time() - enqueued_at)
+                else:
+                    self.failed += 1
+            self._queue.task_done()
+
+    def join(self):
+        """Blocks until every queued message was sent or given up on."""
+        self._queue.join()
+
+    def stop(self, timeout: float = 10.0):
+        """Lets the senders drain the queue, then closes their connections."""
+        with self._lock:
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+        with self._lock:
+            self._threads.clear()
+            self._connections.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "pool_size": self.pool_size,
+                "queue_depth": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "connects": sum(connection.connects for connection in self._connections),
+                "delivery_ms_avg": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+                "delivery_ms_p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else 0.0,
+            }
+
+
+_delivery: Optional[MailDelivery] = None
+_delivery_lock = threading.Lock()
+
+
+def get_mail_delivery() -> MailDelivery:
+    """Returns the per-worker mail delivery queue (senders start on first use)."""
+    global _delivery
+    if _delivery is None:
+        with _delivery_lock:
+            if _delivery is None:
+                _delivery = MailDelivery()
+    return _delivery
+
+
+def stop_mail_delivery():
+    if _delivery is not None:
+        _delivery.stop()
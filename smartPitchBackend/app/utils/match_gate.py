@@ -0,0 +1,131 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+# MATCH_GATE=0 always calls the LLM
+MATCH_GATE_ENABLED = os.getenv("MATCH_GATE", "1") != "0"
+
+# JDs whose match score (mean best similarity per JD point) is below this skip the LLM summary
+MATCH_GATE_THRESHOLD = float(os.getenv("MATCH_GATE_THRESHOLD", 0.25))
+
+# A JD point counts as covered by the resume at or above this similarity
+MATCH_GATE_COVERED_SCORE = float(os.getenv("MATCH_GATE_COVERED_SCORE", 0.4))
+
+# Number of missing requirements / weak matches listed in the templated summary
+MATCH_GATE_LIST_SIZE = int(os.getenv("MATCH_GATE_LIST_SIZE", 5))
+
+DECISION_LLM = "llm"
+DECISION_LOW_MATCH = "skipped_low_match"
+DECISION_NO_MATCHES = "skipped_no_matches"
+
+
+class MatchGate:
+    """
+    Decides from the vectorized match score whether a JD is worth an LLM summary,
+    and counts the decisions for the skip-rate metric. A JD without searched points
+    (no headings, or only headings outside the section map) has no meaningful score
+    and always goes to the LLM.
+    """
+
+    def __init__(self, threshold: float = MATCH_GATE_THRESHOLD, enabled: bool = MATCH_GATE_ENABLED):
+        self.threshold = threshold
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.decisions: Dict[str, int] = {DECISION_LLM: 0, DECISION_LOW_MATCH: 0, DECISION_NO_MATCHES: 0}
+        self.unscored = 0
+
+    def decide(self, match_score: float, relevance_results: dict, jd_point_scores: List[dict]) -> str:
+        """jd_point_scores: the searched JD points (empty when the JD has none of the searched sections)."""
+        unscored = not jd_point_scores
+        if not self.enabled or unscored:
+            decision = DECISION_LLM
+        elif not any(matches for per_section in relevance_results.values() for matches in per_section.values()):
+            decision = DECISION_NO_MATCHES
+        elif match_score < self.threshold:
+            decision = DECISION_LOW_MATCH
+        else:
+            decision = DECISION_LLM
+        with self._lock:
+            self.decisions[decision] += 1
+            if unscored:
+                self.unscored += 1
+        return decision
+
+    def describe(self, decision: str, match_score: float) -> dict:
+        """The gate block returned to clients."""
+        return {
+            "decision": decision,
+            "match_score": match_score,
+            "threshold": self.threshold,
+            "llm_skipped": decision != DECISION_LLM,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(self.decisions.values())
+            skipped = total - self.decisions[DECISION_LLM]
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "decisions": dict(self.decisions),
+                "unscored": self.unscored,
+                "skip_rate": round(skipped / total, 4) if total else 0.0,
+            }
+
+
+def templated_summary(
+    match_score: float,
+    jd_point_scores: List[dict],
+    relevance_results: dict,
+    decision: str,
+    list_size: int = MATCH_GATE_LIST_SIZE,
+    covered_score: float = MATCH_GATE_COVERED_SCORE,
+) -> str:
+    """
+    Deterministic summary used instead of the LLM for low matches: the JD requirements
+    least covered by the resume and the resume's best (still weak) matches.
+    """
+    lines = []
+    if decision == DECISION_NO_MATCHES:
+        lines.append("None of the resume sections this job is matched against were found in your resume, "
+                     "so it looks like a poor fit for your current profile.")
+    else:
+        lines.append(f"This job looks like a weak fit for your current profile (match score {match_score:.2f}).")
+
+    missing = sorted(
+        (point for point in jd_point_scores if point["score"] < covered_score),
+        key=lambda point: point["score"],
+    )[:list_size]
+    if missing:
+        lines.append("")
+        lines.append("Requirements with little or no support in your resume:")
+        lines.extend(f"- {point['point']}" for point in missing)
+
+    weak_matches = {}
+    for per_section in relevance_results.values():
+        for resume_section, matches in per_section.items():
+            for match in matches:
+                text = match["chunk"]["name"] if isinstance(match["chunk"], dict) else str(match["chunk"])
+                if match["score"] > weak_matches.get(text, (float("-inf"), ""))[0]:
+                    weak_matches[text] = (match["score"], resume_section)
+    top_matches = sorted(weak_matches.items(), key=lambda item: item[1][0], reverse=True)[:list_size]
+    if top_matches:
+        lines.append("")
+        lines.append("Closest matches from your resume:")
+        lines.extend(f"- {text} ({section}, {score:.2f})" for text, (score, section) in top_matches)
+
+    return "\n".join(lines)
+
+
+_gate: Optional[MatchGate] = None
+_gate_lock = threading.Lock()
+
+
+def get_match_gate() -> MatchGate:
+    """Returns the per-worker match gate."""
+    global _gate
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                _gate = MatchGate()
+    return _gate
@@ -1,55 +1,311 @@
+import os
 import time
-
-# Cache dictionary to store OTP data by email:
-# Each entry: email -> dict with keys "otp", "attempts", "blocked_until", "timestamp", "otp_verified"
-otp_cache = {}
+import heapq
+import sqlite3
+import secrets
+import threading
+from typing import Dict, List, Optional, Tuple
 
 # Constants
 MAX_ATTEMPTS = 3
 BLOCK_DURATION = 3600  # seconds (1 hour)
 OTP_EXPIRY = 300       # seconds (5 minutes)
 
+# Seconds a verification token from /verify-otp stays valid for /set-password
+OTP_TOKEN_EXPIRY = int(os.getenv("OTP_TOKEN_EXPIRY", 900))
+
+# OTP store backend: "sqlite" is shared by all uvicorn workers, "memory" only works with a single worker
+OTP_STORE = os.getenv("OTP_STORE", "sqlite")
+
+# SQLite file of the shared OTP store
+OTP_STORE_PATH = os.getenv("OTP_STORE_PATH", "./otp_store.db")
+
+
+def _expires_at(record: dict) -> float:
+    """A record can be dropped once its OTP, block and verification token are all over."""
+    return max(record["timestamp"] + OTP_EXPIRY, record["blocked_until"], record["token_expires_at"])
+
+
+class MemoryOTPStore:
+    """
+    In-process OTP store: email -> record, plus token -> email for verified records.
+    Records are evicted in expiry order from a heap. Single worker only.
+    Each record: "otp", "attempts", "blocked_until", "timestamp", "token", "token_expires_at".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: Dict[str, dict] = {}
+        self._tokens: Dict[str, str] = {}
+        self._expiry: List[Tuple[float, str]] = []
+
+    def _evict(self, now: float):
+        # Heap entries of records that were replaced since are stale: only drop a record when its
+        # current expiry has passed
+        while self._expiry and self._expiry[0][0] <= now:
+            _, email = heapq.heappop(self._expiry)
+            record = self._records.get(email)
+            if record is not None and _expires_at(record) <= now:
+                del self._records[email]
+                if record["token"]:
+                    self._tokens.pop(record["token"], None)
+
+    def _schedule(self, email: str, record: dict):
+        heapq.heappush(self._expiry, (_expires_at(record), email))
+
+    def store_otp(self, email: str, otp: str):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            previous = self._records.get(email)
+            if previous is not None and previous["token"]:
+                self._tokens.pop(previous["token"], None)
+            record = {
+                "otp": otp,
+                "attempts": 0,
+                "blocked_until": 0,
+                "timestamp": now,
+                "token": None,
+                "token_expires_at": 0,
+            }
+            self._records[email] = record
+            self._schedule(email, record)
+
+    def is_blocked(self, email: str) -> bool:
+        with self._lock:
+            record = self._records.get(email)
+            return record is not None and time.time() < record["blocked_until"]
+
+    def verify_otp(self, email: str, submitted_otp: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            record = self._records.get(email)
+            if not record or not record["otp"] or now - record["timestamp"] > OTP_EXPIRY:
+                return None
+            if now < record["blocked_until"]:
+                return None
+            if not secrets.compare_digest(submitted_otp, record["otp"]):
+                record["attempts"] += 1
+                if record["attempts"] >= MAX_ATTEMPTS:
+                    record["blocked_until"] = now + BLOCK_DURATION
+                    self._schedule(email, record)
+                return None
+            # An OTP verifies once; the token stands in for it until the password is set
+            token = secrets.token_urlsafe(32)
+            record["otp"] = None
+            record["token"] = token
+            record["token_expires_at"] = now + OTP_TOKEN_EXPIRY
+            self._tokens[token] = email
+            self._schedule(email, record)
+            return token
+
+    def consume_token(self, token: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            email = self._tokens.pop(token, None)
+            if email is None:
+                return None
+            record = self._records.get(email)
+            if record is None or record["token"] != token or now > record["token_expires_at"]:
+                return None
+            record["token"] = None
+            record["token_expires_at"] = 0
+            return email
+
+    def is_otp_verified(self, email: str) -> bool:
+        with self._lock:
+            record = self._records.get(email)
+            return bool(record and record["token"] and time.time() <= record["token_expires_at"])
+
+    def clear_otp_verified(self, email: str):
+        with self._lock:
+            record = self._records.get(email)
+            if record is not None and record["token"]:
+                self._tokens.pop(record["token"], None)
+                record["token"] = None
+                record["token_expires_at"] = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "records": len(self._records), "verified": len(self._tokens)}
+
+
+class SQLiteOTPStore:
+    """
+    OTP store in a SQLite file shared by all workers. Attempt counting and token use run
+    in IMMEDIATE transactions, so concurrent requests for one email cannot both succeed.
+    Expired rows are deleted through the expires_at index; tokens are looked up by index.
+    """
+
+    def __init__(self, db_path: str = OTP_STORE_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS otp_codes ("
+            " email TEXT PRIMARY KEY,"
+            " otp TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " blocked_until REAL NOT NULL DEFAULT 0,"
+            " timestamp REAL NOT NULL,"
+            " token TEXT,"
+            " token_expires_at REAL NOT NULL DEFAULT 0,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_otp_codes_expires_at ON otp_codes (expires_at)")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_otp_codes_token ON otp_codes (token)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; isolation_level=None so transactions are explicit."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn, *args):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def _save(self, conn: sqlite3.Connection, email: str, record: dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO otp_codes"
+            " (email, otp, attempts, blocked_until, timestamp, token, token_expires_at, expires_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (email, record["otp"], record["attempts"], record["blocked_until"], record["timestamp"],
+             record["token"], record["token_expires_at"], _expires_at(record)),
+        )
+
+    def _load(self, conn: sqlite3.Connection, email: str) -> Optional[dict]:
+        row = conn.execute("SELECT * FROM otp_codes WHERE email = ?", (email,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def store_otp(self, email: str, otp: str):
+        def store(conn, now):
+            conn.execute("DELETE FROM otp_codes WHERE expires_at <= ?", (now,))
+            self._save(conn, email, {
+                "otp": otp,
+                "attempts": 0,
+                "blocked_until": 0,
+                "timestamp": now,
+                "token": None,
+                "token_expires_at": 0,
+            })
+        self._transaction(store, time.time())
+
+    def is_blocked(self, email: str) -> bool:
+        row = self._conn().execute("SELECT blocked_until FROM otp_codes WHERE email = ?", (email,)).fetchone()
+        return row is not None and time.time() < row["blocked_until"]
+
+    def verify_otp(self, email: str, submitted_otp: str) -> Optional[str]:
+        def verify(conn, now):
+            record = self._load(conn, email)
+            if not record or not record["otp"] or now - record["timestamp"] > OTP_EXPIRY:
+                return None
+            if now < record["blocked_until"]:
+                return None
+            if not secrets.compare_digest(submitted_otp, record["otp"]):
+                record["attempts"] += 1
+                if record["attempts"] >= MAX_ATTEMPTS:
+                    record["blocked_until"] = now + BLOCK_DURATION
+                self._save(conn, email, record)
+                return None
+            token = secrets.token_urlsafe(32)
+            record["otp"] = None
+            record["token"] = token
+            record["token_expires_at"] = now + OTP_TOKEN_EXPIRY
+            self._save(conn, email, record)
+            return token
+        return self._transaction(verify, time.time())
+
+    def consume_token(self, token: str) -> Optional[str]:
+        def consume(conn, now):
+            row = conn.execute("SELECT * FROM otp_codes WHERE token = ?", (token,)).fetchone()
+            if row is None:
+                return None
+            record = dict(row)
+            if now > record["token_expires_at"]:
+                return None
+            record["token"] = None
+            record["token_expires_at"] = 0
+            self._save(conn, record["email"], record)
+            return record["email"]
+        return self._transaction(consume, time.time())
+
+    def is_otp_verified(self, email: str) -> bool:
+        row = self._conn().execute(
+            "SELECT token, token_expires_at FROM otp_codes WHERE email = ?", (email,)
+        ).fetchone()
+        return bool(row and row["token"] and time.time() <= row["token_expires_at"])
+
+    def clear_otp_verified(self, email: str):
+        def clear(conn):
+            record = self._load(conn, email)
+            if record is not None and record["token"]:
+                record["token"] = None
+                record["token_expires_at"] = 0
+                self._save(conn, email, record)
+        self._transaction(clear)
+
+    def stats(self) -> dict:
+        records, verified = self._conn().execute(
+            "SELECT COUNT(*), COUNT(token) FROM otp_codes"
+        ).fetchone()
+        return {"backend": "sqlite", "records": records, "verified": verified}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store():
+    """Returns the OTP store selected by OTP_STORE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if OTP_STORE == "memory":
+                    _store = MemoryOTPStore()
+                elif OTP_STORE == "sqlite":
+                    _store = SQLiteOTPStore()
+                else:
+                    raise ValueError(f"Unknown OTP_STORE '{OTP_STORE}', expected 'sqlite' or 'memory'.")
+    return _store
+
+
 def store_otp(email: str, otp: str):
     """Stores OTP and reset attempts and block info"""
-    otp_cache[email] = {
-        "otp": otp,
-        "attempts": 0,
-        "blocked_until": 0,
-        "timestamp": time.time(),
-        "otp_verified": False   # Added verified flag
-    }
+    get_otp_store().store_otp(email, otp)
 
 def is_blocked(email: str) -> bool:
     """Returns True if user is blocked from OTP verification"""
-    blocked_until = otp_cache.get(email, {}).get("blocked_until", 0)
-    return time.time() < blocked_until
-
-def verify_otp(email: str, submitted_otp: str) -> bool:
-    """Checks OTP validity and manages attempt counts and blocking"""
-    record = otp_cache.get(email)
-    # If no otp for email or expired
-    if not record or (time.time() - record['timestamp'] > OTP_EXPIRY):
-        return False
-    # Check if blocked
-    if is_blocked(email):
-        return False
-    # Check OTP match
-    if submitted_otp == record["otp"]:
-        record["otp_verified"] = True   # Mark as verified on success
-        return True
-    else:
-        # Increment attempts
-        record["attempts"] += 1
-        # Block if max attempts reached
-        if record["attempts"] >= MAX_ATTEMPTS:
-            record["blocked_until"] = time.time() + BLOCK_DURATION
-        return False
+    return get_otp_store().is_blocked(email)
+
+def verify_otp(email: str, submitted_otp: str) -> Optional[str]:
+    """
+    Checks OTP validity and manages attempt counts and blocking.
+    Returns a verification token for /set-password on success, None otherwise.
+    """
+    return get_otp_store().verify_otp(email, submitted_otp)
+
+def consume_verification_token(token: str) -> Optional[str]:
+    """Returns the email a verification token was issued for and invalidates it (None if unknown or expired)"""
+    return get_otp_store().consume_token(token)
 
 def is_otp_verified(email: str) -> bool:
     """Check if this email is marked as OTP verified"""
-    return otp_cache.get(email, {}).get("otp_verified", False)
+    return get_otp_store().is_otp_verified(email)
 
 def clear_otp_verified(email: str):
     """Remove the verified status (called after account creation or expiry)"""
-    if email in otp_cache and "otp_verified" in otp_cache[email]:
-        otp_cache[email]["otp_verified"] = False
+    get_otp_store().clear_otp_verified(email)
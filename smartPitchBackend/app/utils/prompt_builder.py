@@ -0,0 +1,159 @@
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Token budget for the JD + resume context put into one LLM prompt
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 1200))
+
+# Share of the budget reserved for JD points; what they leave unused goes to resume chunks
+PROMPT_JD_SHARE = float(os.getenv("PROMPT_JD_SHARE", 0.4))
+
+# Non-scoring JD sections still worth a line: they name the position (the email subject needs it)
+JD_TITLE_SECTIONS = ("job_title", "position")
+
+# JD sections that are boilerplate for both prompts (extract_jd_sections keys); every other section is content
+JD_BOILERPLATE_SECTIONS = (
+    "what_we_offer", "about_the_company", "company_description", "compensation", "salary", "perks",
+    "benefits", "location", "work_location", "how_to_apply", "application_process", "contact_information",
+)
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate token count: words and punctuation marks, plus ~15% for words the
+    tokenizer splits. Good enough for budgeting without a model-specific tokenizer.
+    """
+    pieces = len(_TOKEN_PATTERN.findall(text))
+    return (pieces * 115 + 99) // 100
+
+
+def chunk_text(chunk) -> str:
+    """One-line text of a resume chunk ({'name', 'points'} entries become "name: point; point")."""
+    if isinstance(chunk, dict) and "name" in chunk:
+        points = chunk.get("points") or []
+        return f"{chunk['name']}: {'; '.join(points)}" if points else str(chunk["name"])
+    return " ".join(str(chunk).split())
+
+
+def _points(content) -> List[str]:
+    if isinstance(content, list):
+        return [" ".join(str(point).split()) for point in content if str(point).strip()]
+    if content:
+        return [" ".join(str(content).split())]
+    return []
+
+
+class _Budget:
+    def __init__(self, tokens: int):
+        self.left = tokens
+
+    def take(self, line: str) -> bool:
+        cost = estimate_tokens(line) + 1
+        if cost > self.left:
+            return False
+        self.left -= cost
+        return True
+
+    def trim(self, line: str) -> str:
+        """The longest word prefix of line that fits the remaining budget (taken), or ""."""
+        words = line.split()
+        keep = int(len(words) * self.left / (estimate_tokens(line) + 1))
+        while keep > 0 and not self.take(" ".join(words[:keep])):
+            keep -= 1
+        return " ".join(words[:keep])
+
+
+def compact_jd_sections(
+    jd_sections: Dict[str, object],
+    scoring_sections: Iterable[str],
+    budget: Optional[int] = None,
+    section_order: Optional[List[str]] = None,
+    refs: Optional[Dict[str, List[str]]] = None,
+) -> Tuple[str, int]:
+    """
+    JD context as compact lines, "section: point | point [-> C1,C3]".
+    Title lines come first, then the scoring sections in section_order (default: JD order),
+    then the remaining content sections (e.g. "requirements", or "full_text" of a JD without
+    headings) in JD order. Known boilerplate (benefits, about the company, ...) is dropped.
+    Points are added in that order until the token budget is used.
+    Returns (text, tokens used).
+    """
+    budget = _Budget(PROMPT_TOKEN_BUDGET if budget is None else budget)
+    scoring = set(scoring_sections)
+    order = section_order or list(jd_sections)
+    names = [name for name in JD_TITLE_SECTIONS if name in jd_sections]
+    names += [name for name in order if name in scoring and name in jd_sections and name not in names]
+    names += [name for name in jd_sections if name not in names and name not in JD_BOILERPLATE_SECTIONS]
+
+    start = budget.left
+    lines = []
+    for name in names:
+        suffix = f" -> {','.join(refs[name])}" if refs and refs.get(name) else ""
+        kept = []
+        for point in _points(jd_sections[name]):
+            if not budget.take(point):
+                # A long point (e.g. an unstructured full_text paragraph) is cut to the budget left
+                point = budget.trim(point)
+                if point:
+                    kept.append(point)
+                budget.left = 0
+                break
+            kept.append(point)
+        if kept:
+            lines.append(f"{name}: {' | '.join(kept)}{suffix}")
+        if budget.left <= 0:
+            break
+    return "\n".join(lines), start - budget.left
+
+
+def build_relevance_context(
+    relevance_results: Dict[str, Dict[str, List[dict]]],
+    jd_sections: Dict[str, object],
+    budget: int = PROMPT_TOKEN_BUDGET,
+    jd_share: float = PROMPT_JD_SHARE,
+) -> Tuple[str, str]:
+    """
+    Compact (resume_context, jd_context) for the relevance prompt.
+    - every distinct resume chunk is listed once as "[C1] (score) section: text", ranked by its
+      best score over all JD sections; JD lines refer to chunks by id instead of repeating them
+    - only JD sections that were matched are included, best matched first
+    - JD points and chunks are added in rank order until the token budget is used
+    """
+    chunk_ids: Dict[str, str] = {}
+    chunks: Dict[str, dict] = {}
+    section_refs: Dict[str, List[str]] = {}
+    section_best: Dict[str, float] = {}
+
+    for jd_section, per_resume_section in relevance_results.items():
+        for resume_section, matches in per_resume_section.items():
+            for match in matches:
+                text = chunk_text(match["chunk"])
+                chunk_id = chunk_ids.setdefault(text, f"C{len(chunk_ids) + 1}")
+                entry = chunks.setdefault(chunk_id, {"text": text, "section": resume_section, "score": match["score"]})
+                entry["score"] = max(entry["score"], match["score"])
+                section_refs.setdefault(jd_section, []).append(chunk_id)
+                section_best[jd_section] = max(section_best.get(jd_section, float("-inf")), match["score"])
+
+    # Resume chunks first: the best ones are what the summary is about
+    ranked_chunks = sorted(chunks.items(), key=lambda item: item[1]["score"], reverse=True)
+    resume_budget = _Budget(budget - int(budget * jd_share))
+    kept_ids = set()
+    resume_lines = []
+    for chunk_id, entry in ranked_chunks:
+        line = f"[{chunk_id}] ({entry['score']:.2f}) {entry['section']}: {entry['text']}"
+        if not resume_budget.take(line):
+            continue
+        kept_ids.add(chunk_id)
+        resume_lines.append(line)
+
+    refs = {
+        name: [chunk_id for chunk_id in dict.fromkeys(ids) if chunk_id in kept_ids]
+        for name, ids in section_refs.items()
+    }
+    section_order = sorted(section_best, key=section_best.get, reverse=True)
+    jd_text, _ = compact_jd_sections(
+        jd_sections, section_best.keys(), int(budget * jd_share) + resume_budget.left, section_order, refs
+    )
+    return "\n".join(resume_lines), jd_text
@@ -0,0 +1,181 @@
+import os
+import heapq
+import asyncio
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import VectorMeta, User
+from app.utils.vector_bundle import VectorBundle, bundle_path
+from app.utils.resume_cache import resolve_vector_folder
+from app.utils.search_engine import similarity_matrix
+from app.utils.executors import run_cpu
+from app.utils.upload_jd_utils import DEFAULT_JD_SECTION_MAP, stack_jd_embeddings, jd_match_score
+
+# Resume rows scored per matmul block; bounds memory to ~block_rows * dim * 4 bytes per process
+RECRUITER_BLOCK_ROWS = int(os.getenv("RECRUITER_BLOCK_ROWS", 32768))
+
+# Shards of the corpus scored in parallel on the shared CPU pool (run_cpu); 1 scores it in one task
+RECRUITER_SHARDS = int(os.getenv("RECRUITER_SHARDS", 1))
+
+# (user_id, email, absolute vector folder)
+Candidate = Tuple[int, str, str]
+
+
+def iter_candidates(db_session: Session, shard: int = 0, shards: int = 1, batch_size: int = 1000):
+    """
+    Streams every user with stored resume vectors without loading all rows at once.
+    With shards > 1 only the users whose id falls in this shard (user_id % shards).
+    """
+    query = (
+        db_session.query(VectorMeta.user_id, User.email, VectorMeta.vector_folder_path)
+        .join(User)
+        .filter(VectorMeta.vector_folder_path.isnot(None))
+    )
+    if shards > 1:
+        query = query.filter(VectorMeta.user_id % shards == shard)
+    for user_id, email, folder in query.yield_per(batch_size):
+        yield user_id, email, resolve_vector_folder(folder)
+
+
+def _float32_rows(bundle: VectorBundle) -> np.ndarray:
+    """Normalized float32 rows of a bundle (int8 scales applied)."""
+    rows, scales = bundle.normalized_matrix()
+    rows = np.asarray(rows).astype(np.float32)
+    if scales is not None:
+        rows *= np.asarray(scales, dtype=np.float32)[:, None]
+    return rows
+
+
+def section_contributions(
+    bundle: VectorBundle,
+    similarities: np.ndarray,
+    jd_row_ranges: Dict[str, Tuple[int, int]],
+    jd_section_map: Dict[str, List[str]],
+) -> Dict[str, float]:
+    """
+    Which resume sections drove the score: for every resume section, the mean best
+    similarity of the JD points it is matched against.
+    """
+    per_section: Dict[str, List[np.ndarray]] = {}
+    for jd_section, (jd_start, jd_stop) in jd_row_ranges.items():
+        for resume_section in jd_section_map.get(jd_section, []):
+            if not bundle.has_embeddings(resume_section):
+                continue
+            meta = bundle.sections[resume_section]
+            block = similarities[jd_start:jd_stop, meta["row_start"]:meta["row_start"] + meta["row_count"]]
+            per_section.setdefault(resume_section, []).append(block.max(axis=1))
+    scores = {name: round(float(np.concatenate(values).mean()), 4) for name, values in per_section.items()}
+    return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+
+def score_candidates(
+    jd_matrix: np.ndarray,
+    jd_row_ranges: Dict[str, Tuple[int, int]],
+    jd_section_map: Dict[str, List[str]],
+    candidates: Iterable[Candidate],
+    top_n: int,
+    block_rows: int = RECRUITER_BLOCK_ROWS,
+) -> List[Tuple[float, int, str, Dict[str, float]]]:
+    """
+    Scores candidates in blocks as they stream in: memory-mapped resume rows are stacked
+    until block_rows rows, scored with one matmul against the JD matrix, and only a top_n
+    heap survives between blocks. Only bundle headers (row ranges) are parsed, never the
+    section content.
+    Returns (score, user_id, email, section_scores) tuples, best first.
+    """
+    heap: List[tuple] = []
+    block: List[Tuple[Candidate, VectorBundle]] = []
+    block_size = 0
+
+    def flush():
+        if not block:
+            return
+        matrix = np.vstack([_float32_rows(bundle) for _, bundle in block])
+        similarities = similarity_matrix(jd_matrix, matrix)
+        offset = 0
+        for (user_id, email, folder), bundle in block:
+            user_similarities = similarities[:, offset:offset + bundle.rows]
+            offset += bundle.rows
+            score = jd_match_score(bundle, user_similarities, jd_row_ranges, jd_section_map)
+            entry = (score, user_id, email, folder)
+            # Copy the slice so a kept candidate does not pin the whole block's similarities
+            if len(heap) < top_n:
+                heapq.heappush(heap, (entry, bundle, user_similarities.copy()))
+            elif score > heap[0][0][0]:
+                heapq.heapreplace(heap, (entry, bundle, user_similarities.copy()))
+        block.clear()
+
+    for candidate in candidates:
+        folder = candidate[2]
+        try:
+            bundle = VectorBundle(bundle_path(folder))
+        except (FileNotFoundError, ValueError):
+            continue
+        if not bundle.rows:
+            continue
+        block.append((candidate, bundle))
+        block_size += bundle.rows
+        if block_size >= block_rows:
+            flush()
+            block_size = 0
+    flush()
+
+    ranked = sorted(heap, key=lambda item: item[0][0], reverse=True)
+    return [
+        (score, user_id, email, section_contributions(bundle, sims, jd_row_ranges, jd_section_map))
+        for (score, user_id, email, _), bundle, sims in ranked
+    ]
+
+
+def rank_shard(
+    jd_matrix: np.ndarray,
+    jd_row_ranges: Dict[str, Tuple[int, int]],
+    jd_section_map: Dict[str, List[str]],
+    top_n: int,
+    shard: int = 0,
+    shards: int = 1,
+) -> List[Tuple[float, int, str, Dict[str, float]]]:
+    """One shard of the corpus scan, run in a CPU pool worker with a session of its own."""
+    db = SessionLocal()
+    try:
+        return score_candidates(jd_matrix, jd_row_ranges, jd_section_map, iter_candidates(db, shard, shards), top_n)
+    finally:
+        db.close()
+
+
+async def rank_resumes(
+    jd_sections: Dict[str, List[str]],
+    jd_embeddings: Dict[str, np.ndarray],
+    top_n: int = 10,
+    jd_section_map: Optional[Dict[str, List[str]]] = None,
+    shards: int = RECRUITER_SHARDS,
+) -> List[dict]:
+    """
+    Reverse search: ranks every stored resume against one JD.
+    The corpus is split into shards scored in parallel on the shared CPU pool, each
+    shard keeps its own top_n and the shards are merged. Returns the top_n candidates
+    with their score and the resume sections that drove it; resume text is not returned.
+    """
+    if jd_section_map is None:
+        jd_section_map = DEFAULT_JD_SECTION_MAP
+
+    jd_matrix, jd_row_ranges = stack_jd_embeddings(jd_sections, jd_embeddings, jd_section_map)
+    if jd_matrix is None or top_n <= 0:
+        return []
+
+    shards = max(shards, 1)
+    shard_results = await asyncio.gather(*(
+        run_cpu(rank_shard, jd_matrix, jd_row_ranges, jd_section_map, top_n, shard, shards)
+        for shard in range(shards)
+    ))
+    top = sorted((row for rows in shard_results for row in rows), key=lambda row: row[0], reverse=True)[:top_n]
+    return [
+        {
+            "user_id": user_id,
+            "email": email,
+            "match_score": round(score, 4),
+            "section_scores": section_scores,
+        }
+        for score, user_id, email, section_scores in top
+    ]
@@ -0,0 +1,205 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.models import VectorMeta, User
+from app.utils.vector_bundle import VectorBundle, bundle_path
+from app.utils.lexical_index import load_lexical_index
+from app.utils.legacy_vectors import has_legacy_vectors, migrate_legacy_folder
+
+# Upper bound on memory held by the per-worker resume cache
+RESUME_CACHE_MAX_BYTES = int(os.getenv("RESUME_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Vector folder paths in VectorMeta are relative to the backend root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+
+def resolve_vector_folder(relative_path: str) -> str:
+    return os.path.normpath(os.path.join(PROJECT_ROOT, relative_path))
+
+
+def _bundle_version(folder: str) -> Optional[Tuple[int, int, int]]:
+    """Identity of the bundle currently on disk; changes whenever a new bundle is renamed into place."""
+    try:
+        st = os.stat(bundle_path(folder))
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class CachedResume:
+    """
+    A user's resume held in memory: the bundle (sections and row ranges), its
+    normalized embedding matrix copied out of the memory map and its BM25 index.
+    """
+
+    def __init__(self, user_email: str, user_id: int, folder: str, version: tuple, bundle: VectorBundle):
+        self.user_email = user_email
+        self.user_id = user_id
+        self.folder = folder
+        self.version = version
+        self.bundle = bundle
+        matrix, scales = bundle.normalized_matrix()
+        self.matrix = np.array(matrix)
+        self.scales = None if scales is None else np.array(scales)
+        self.lexical = load_lexical_index(folder, bundle)
+        # Resident size: the matrices plus a rough estimate for the parsed section content
+        self.nbytes = (
+            self.matrix.nbytes
+            + (0 if self.scales is None else self.scales.nbytes)
+            + (0 if self.lexical is None else self.lexical.nbytes)
+            + bundle.header["matrix_offset"]
+        )
+        # The matrix now lives in RAM; drop the memory maps so the file can be replaced freely
+        bundle.matrix = self.matrix
+        bundle.scales = self.scales
+        bundle.normalized = True
+
+    def header(self) -> list:
+        return self.bundle.section_content("header", [])
+
+
+def _vector_folder(user_email: str, db_session: Session, user_id: Optional[int] = None) -> Tuple[int, str]:
+    """
+    (user_id, absolute vector folder) from VectorMeta; by user_id when known, else joined on the email.
+    A pre-bundle folder is migrated to a bundle on the way.
+    """
+    if user_id is not None:
+        vector_meta = db_session.query(VectorMeta).filter(VectorMeta.user_id == user_id).first()
+    else:
+        vector_meta = db_session.query(VectorMeta).join(User).filter(User.email == user_email).first()
+    if not vector_meta or not vector_meta.vector_folder_path:
+        raise ValueError(f"Vector folder path not found for user: {user_email}")
+    folder = resolve_vector_folder(vector_meta.vector_folder_path)
+    # Users who uploaded before bundles existed: build their bundle from the per-section files once
+    if has_legacy_vectors(folder):
+        try:
+            migrate_legacy_folder(folder)
+        except Exception as e:
+            print(f"Could not migrate legacy vector folder {folder}: {e}")
+    return vector_meta.user_id, folder
+
+
+class ResumeVectorCache:
+    """
+    LRU cache of loaded resumes keyed by user email, bounded by total bytes.
+    An entry is only served while its version matches the bundle on disk, so uploads
+    handled by other workers are picked up; same-worker uploads invalidate explicitly.
+    """
+
+    def __init__(self, max_bytes: int = RESUME_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResume]" = OrderedDict()
+        self._folder_to_email: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _evict(self, user_email: str):
+        """Drops one entry. Caller holds the lock."""
+        entry = self._entries.pop(user_email, None)
+        if entry is not None:
+            self.total_bytes -= entry.nbytes
+            self._folder_to_email.pop(entry.folder, None)
+
+    def _store(self, entry: CachedResume):
+        with self._lock:
+            self._evict(entry.user_email)
+            if entry.nbytes > self.max_bytes:
+                return
+            self._entries[entry.user_email] = entry
+            self._folder_to_email[entry.folder] = entry.user_email
+            self.total_bytes += entry.nbytes
+            while self.total_bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _lookup(self, user_email: str) -> Optional[CachedResume]:
+        with self._lock:
+            entry = self._entries.get(user_email)
+        if entry is None:
+            return None
+        if _bundle_version(entry.folder) != entry.version:
+            self.invalidate(user_email)
+            return None
+        with self._lock:
+            if user_email in self._entries:
+                self._entries.move_to_end(user_email)
+        return entry
+
+    def get(self, user_email: str, db_session: Session, user_id: Optional[int] = None) -> CachedResume:
+        """
+        Returns the user's cached resume, loading it (one VectorMeta query + bundle read) on a miss.
+        With user_id (from the auth principal) the miss skips the join on User.email.
+        Raises ValueError if the user has no stored resume vectors.
+        """
+        entry = self._lookup(user_email)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        with self._lock:
+            self.misses += 1
+
+        owner_id, folder = _vector_folder(user_email, db_session, user_id)
+        version = _bundle_version(folder)
+        if version is None:
+            raise ValueError(f"Vector bundle not found for user: {user_email}")
+
+        entry = CachedResume(user_email, owner_id, folder, version, VectorBundle(bundle_path(folder)))
+        self._store(entry)
+        return entry
+
+    def locate(self, user_email: str, db_session: Session, user_id: Optional[int] = None) -> Tuple[int, str]:
+        """
+        (user_id, vector folder) of the user's resume without loading its matrix, for callers
+        that only need the bundle header and content (the FAISS backend reads rows from the index).
+        Raises ValueError if the user has no stored resume vectors.
+        """
+        entry = self._lookup(user_email)
+        if entry is not None:
+            return entry.user_id, entry.folder
+        return _vector_folder(user_email, db_session, user_id)
+
+    def get_by_folder(self, folder: str) -> Optional[CachedResume]:
+        """Cached entry for a vector folder, if that resume is currently cached and up to date."""
+        with self._lock:
+            user_email = self._folder_to_email.get(os.path.normpath(folder))
+        return None if user_email is None else self._lookup(user_email)
+
+    def invalidate(self, user_email: str):
+        with self._lock:
+            if user_email in self._entries:
+                self.invalidations += 1
+            self._evict(user_email)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache: Optional[ResumeVectorCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_resume_cache() -> ResumeVectorCache:
+    """Returns the per-worker resume vector cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResumeVectorCache()
+    return _cache
@@ -0,0 +1,106 @@
+import os
+from typing import List, Optional, Tuple
+import numpy as np
+
+# "matrix" scores all JD chunks against the user's bundle with one matmul, "faiss" queries the shared index
+RELEVANCE_BACKEND = os.getenv("RELEVANCE_BACKEND", "matrix").lower()
+
+# How JD-chunk similarities are combined per resume chunk: "max" or "mean"
+RELEVANCE_AGGREGATE = os.getenv("RELEVANCE_AGGREGATE", "max").lower()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalizes rows (float32) so inner products are cosine similarities."""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def similarity_matrix(queries: np.ndarray, stored: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    (n_queries, n_stored) cosine similarities with one matmul.
+    queries must be normalized float32; stored rows are pre-normalized vectors in
+    float32/float16, or int8 with per-row scales applied to the product.
+    """
+    scores = queries @ np.asarray(stored).astype(np.float32, copy=False).T
+    if scales is not None:
+        scores *= np.asarray(scales, dtype=np.float32)[None, :]
+    return scores
+
+
+def aggregate_scores(similarities: np.ndarray, method: str = RELEVANCE_AGGREGATE) -> np.ndarray:
+    """Collapses a (n_queries, n_stored) matrix to one score per stored row."""
+    if similarities.shape[0] == 0:
+        return np.zeros(similarities.shape[1], dtype=np.float32)
+    if method == "mean":
+        return similarities.mean(axis=0)
+    if method == "max":
+        return similarities.max(axis=0)
+    raise ValueError(f"Unknown aggregate method: {method}")
+
+
+def top_k(scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """Indices and scores of the k best rows, best first, using argpartition instead of a full sort."""
+    n = scores.shape[0]
+    if n == 0 or k <= 0:
+        return []
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(int(idx), float(scores[idx])) for idx in ordered]
+
+
+def search_matrix(
+    queries: np.ndarray,
+    stored: np.ndarray,
+    k: int,
+    scales: Optional[np.ndarray] = None,
+    method: str = RELEVANCE_AGGREGATE,
+) -> List[Tuple[int, float]]:
+    """
+    Scores every query row against every stored row in one matmul, aggregates per
+    stored row and returns the top k as (row_index, score), best first.
+    """
+    similarities = similarity_matrix(normalize_rows(queries), stored, scales)
+    return top_k(aggregate_scores(similarities, method), k)
+
+
+# How lexical (BM25) and dense scores are fused: "weighted", "rrf" or "none" (dense only)
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "weighted").lower()
+
+# Share of the normalized BM25 score in the weighted fusion
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", 0.3))
+
+# Rank constant of reciprocal rank fusion
+RRF_K = int(os.getenv("RRF_K", 60))
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """0-based rank of every row, best first."""
+    ranks = np.empty(scores.shape[0], dtype=np.int64)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(scores.shape[0])
+    return ranks
+
+
+def fuse_scores(
+    dense: np.ndarray,
+    lexical: Optional[np.ndarray],
+    method: str = HYBRID_FUSION,
+    weight: float = HYBRID_LEXICAL_WEIGHT,
+    rrf_k: int = RRF_K,
+) -> np.ndarray:
+    """
+    Combines per-row dense (cosine) and lexical (normalized BM25, [0, 1]) scores.
+    "weighted": (1 - weight) * dense + weight * lexical
+    "rrf": 1 / (rrf_k + dense_rank) + 1 / (rrf_k + lexical_rank), ranks starting at 1
+    """
+    if lexical is None or method == "none":
+        return dense
+    if method == "weighted":
+        return (1.0 - weight) * dense + weight * lexical
+    if method == "rrf":
+        return (1.0 / (rrf_k + 1 + _ranks(dense)) + 1.0 / (rrf_k + 1 + _ranks(lexical))).astype(np.float32)
+    raise ValueError(f"Unknown fusion method: {method}")
@@ -0,0 +1,152 @@
+# Minimal local SMTP server for development and benchmarks (stdlib only, no TLS or AUTH).
+# Point the API at it with SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=0 and no SMTP_USERNAME.
+# Run from smartPitchBackend/: python -m app.utils.smtp_standin
+import os
+import time
+import socket
+import threading
+import socketserver
+from typing import List, Set, Tuple
+
+# Simulated cost of opening a session (TCP + TLS + AUTH round trips of a real provider), in seconds
+SMTP_STANDIN_CONNECT_DELAY = float(os.getenv("SMTP_STANDIN_CONNECT_DELAY", 0))
+
+# Simulated per-message processing time on the server, in seconds
+SMTP_STANDIN_MESSAGE_DELAY = float(os.getenv("SMTP_STANDIN_MESSAGE_DELAY", 0))
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def setup(self):
+        super().setup()
+        self.server.track(self.connection)
+
+    def finish(self):
+        self.server.untrack(self.connection)
+        super().finish()
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        server: "LocalSMTPServer" = self.server
+        if server.connect_delay:
+            time.sleep(server.connect_delay)
+        server.count("connections")
+        self.reply("220 localhost SmartPitch SMTP stand-in")
+        sender, recipients = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line)
+                if server.message_delay:
+                    time.sleep(server.message_delay)
+                server.store(sender, recipients, b"".join(lines))
+                sender, recipients = None, []
+                self.reply("250 OK: queued")
+            elif verb == "RSET":
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Threaded stand-in SMTP server that keeps the received messages in memory."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 connect_delay: float = SMTP_STANDIN_CONNECT_DELAY,
+                 message_delay: float = SMTP_STANDIN_MESSAGE_DELAY, keep_messages: bool = True):
+        super().__init__((host, port), _SMTPHandler)
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.keep_messages = keep_messages
+        self.messages: List[Tuple[str, List[str], bytes]] = []
+        self.counters = {"connections": 0, "messages": 0}
+        self._sessions: Set[socket.socket] = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def track(self, connection: socket.socket):
+        with self._lock:
+            self._sessions.add(connection)
+
+    def untrack(self, connection: socket.socket):
+        with self._lock:
+            self._sessions.discard(connection)
+
+    def drop_sessions(self) -> int:
+        """Closes every open client session from the server side (what an idle timeout or restart does)."""
+        with self._lock:
+            sessions = list(self._sessions)
+        for connection in sessions:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return len(sessions)
+
+    def store(self, sender: str, recipients: List[str], data: bytes):
+        with self._lock:
+            self.counters["messages"] += 1
+            if self.keep_messages:
+                self.messages.append((sender, recipients, data))
+
+    def start(self) -> "LocalSMTPServer":
+        """Serves in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="smtp-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    server = LocalSMTPServer(port=int(os.getenv("SMTP_STANDIN_PORT", 1025)), keep_messages=False)
+    print(f"SMTP stand-in listening on 127.0.0.1:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
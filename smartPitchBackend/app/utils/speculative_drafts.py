@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import Dict, Optional, Tuple
+from app.database import SessionLocal
+from app.utils.executors import run_io
+from app.utils.draft_email_utils import drafting_email
+
+# SPECULATIVE_DRAFTS=0 never pre-generates drafts
+SPECULATIVE_DRAFTS_ENABLED = os.getenv("SPECULATIVE_DRAFTS", "1") != "0"
+
+# Seconds a speculative draft waits to be claimed before it is dropped
+SPECULATIVE_DRAFT_TTL = int(os.getenv("SPECULATIVE_DRAFT_TTL", 600))
+
+# Max speculative drafts held per worker; the oldest is cancelled beyond this
+SPECULATIVE_MAX_DRAFTS = int(os.getenv("SPECULATIVE_MAX_DRAFTS", 100))
+
+# Name the web client sends in draft requests (the resume header name takes precedence in the prompt)
+SPECULATIVE_DRAFT_CANDIDATE_NAME = os.getenv("SPECULATIVE_DRAFT_CANDIDATE_NAME", "Candidate Name")
+
+# Parameters of the draft that is pre-generated: the draft-email defaults
+DEFAULT_DRAFT_PARAMS = {
+    "email_length": 120,
+    "tone": "Formal",
+    "detail_level": "Summary",
+    "closing": "Regards",
+}
+
+
+def draft_key(user_email: str, jd_sections: dict, llm_relevance_summary: str, params: dict) -> str:
+    """Key of a draft: user, JD (hash of its sections), relevance summary and draft parameters."""
+    payload = {
+        "user": user_email,
+        "jd": hashlib.sha256(json.dumps(jd_sections, sort_keys=True).encode("utf-8")).hexdigest(),
+        "summary": hashlib.sha256(llm_relevance_summary.encode("utf-8")).hexdigest(),
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _draft_with_own_session(**draft_params) -> str:
+    """drafting_email with a session of its own: the request that triggered the speculation is long gone."""
+    db = SessionLocal()
+    try:
+        return drafting_email(db_session=db, **draft_params)
+    finally:
+        db.close()
+
+
+class SpeculativeDrafts:
+    """
+    Pre-generates the default email draft after a JD was matched, so the draft request
+    that usually follows can take the finished (or in-progress) result.
+    Cancellation policy:
+    - a user has at most one speculative draft: matching a new JD cancels the previous one
+    - unclaimed drafts expire after SPECULATIVE_DRAFT_TTL seconds
+    - at most SPECULATIVE_MAX_DRAFTS per worker, the oldest is cancelled first
+    A draft is claimed once; cancelling only stops drafts still waiting for an I/O thread,
+    an LLM call already sent completes and still lands in the LLM cache.
+    """
+
+    def __init__(self, ttl: int = SPECULATIVE_DRAFT_TTL, max_drafts: int = SPECULATIVE_MAX_DRAFTS):
+        self.ttl = ttl
+        self.max_drafts = max_drafts
+        self._drafts: Dict[str, Tuple[float, str, asyncio.Task]] = {}
+        self._by_user: Dict[str, str] = {}
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.failed = 0
+
+    def _drop(self, key: str, reason: Optional[str] = None):
+        entry = self._drafts.pop(key, None)
+        if entry is None:
+            return
+        _, user_email, task = entry
+        if self._by_user.get(user_email) == key:
+            del self._by_user[user_email]
+        if reason and not task.done():
+            task.cancel()
+        if reason == "cancelled":
+            self.cancelled += 1
+        elif reason == "expired":
+            self.expired += 1
+
+    def _expire(self):
+        oldest = time.time() - self.ttl
+        for key in [key for key, (started, _, _) in self._drafts.items() if started < oldest]:
+            self._drop(key, "expired")
+
+    def start(self, user_email: str, jd_sections: dict, llm_relevance_summary: str):
+        """Starts the default draft in the background. Must be called from the event loop."""
+        if not SPECULATIVE_DRAFTS_ENABLED:
+            return
+        self._expire()
+        params = {**DEFAULT_DRAFT_PARAMS, "candidate_name": SPECULATIVE_DRAFT_CANDIDATE_NAME}
+        key = draft_key(user_email, jd_sections, llm_relevance_summary, params)
+        if key in self._drafts:
+            return
+
+        # One speculation per user: the previous JD's draft is no longer the likely next request
+        previous = self._by_user.get(user_email)
+        if previous is not None:
+            self._drop(previous, "cancelled")
+        while len(self._drafts) >= self.max_drafts:
+            self._drop(next(iter(self._drafts)), "cancelled")
+
+        task = asyncio.get_running_loop().create_task(run_io(
+            _draft_with_own_session,
+            jd_sections=jd_sections,
+            llm_relevance_response=llm_relevance_summary,
+            user_email=user_email,
+            **params,
+        ))
+        # Retrieve the outcome so failed or cancelled speculations are not reported as unhandled
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._drafts[key] = (time.time(), user_email, task)
+        self._by_user[user_email] = key
+        self.started += 1
+
+    async def take(self, user_email: str, jd_sections: dict, llm_relevance_summary: str,
+                   params: dict) -> Optional[str]:
+        """
+        The speculative draft matching the request, awaiting it if still running.
+        params: email_length, tone, detail_level, closing and candidate_name of the request.
+        None (a miss) when there is none or it failed; the caller then drafts normally.
+        """
+        self._expire()
+        key = draft_key(user_email, jd_sections, llm_relevance_summary, params)
+        entry = self._drafts.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._drop(key)
+        try:
+            draft = await entry[2]
+        except (asyncio.CancelledError, Exception) as e:
+            if not isinstance(e, asyncio.CancelledError):
+                print(f"Speculative draft failed for {user_email}: {e}")
+            self.failed += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return draft
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": SPECULATIVE_DRAFTS_ENABLED,
+            "pending": len(self._drafts),
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "cancelled": self.cancelled,
+            "expired": self.expired,
+            "failed": self.failed,
+        }
+
+
+_drafts: Optional[SpeculativeDrafts] = None
+
+
+def get_speculative_drafts() -> SpeculativeDrafts:
+    """Returns the per-worker speculative draft registry (only used from the event loop)."""
+    global _drafts
+    if _drafts is None:
+        _drafts = SpeculativeDrafts()
+    return _drafts
@@ -0,0 +1,22 @@
+import json
+from fastapi import Request
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Keeps proxies from buffering the stream
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def accepts(request: Request, media_type: str) -> bool:
+    """True when the client asked for media_type in its Accept header (streaming is opt-in)."""
+    return media_type in request.headers.get("accept", "")
+
+
+def ndjson_line(payload: dict) -> str:
+    return json.dumps(payload) + "\n"
+
+
+def sse_event(event: str, payload: dict) -> str:
+    """One server-sent event; data is JSON so newlines in the text cannot break the framing."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
@@ -1,53 +1,109 @@
 import os
-import tempfile
-import shutil
 import fitz  # PyMuPDF for PDF
 import re
 import json
+import time
+import hashlib
+import threading
+import unicodedata
 import numpy as np
-import glob
-from sentence_transformers import SentenceTransformer
+from app.utils.embedding_model import DEFAULT_EMBEDDING_MODEL, encode_sections, section_texts
+from app.utils.resume_cache import PROJECT_ROOT, get_resume_cache
+from app.utils.faiss_index import best_rows, get_resume_index
+from app.utils.vector_bundle import VectorBundle, open_bundle, write_bundle, shard_dir
+from app.utils.executors import run_cpu
+from app.utils.llm_cache import cached_invoke, cached_astream
+from app.utils.prompt_builder import build_relevance_context
+from app.utils.search_engine import (
+    RELEVANCE_BACKEND,
+    RELEVANCE_AGGREGATE,
+    HYBRID_FUSION,
+    aggregate_scores,
+    fuse_scores,
+    normalize_rows,
+    similarity_matrix,
+    top_k as top_k_rows,
+)
 import os
 import json
 import numpy as np
 from sqlmodel import Session
-from app.models import VectorMeta, User
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from numpy.linalg import norm
 from dotenv import load_dotenv
 from langchain_cohere import ChatCohere
 from langchain_core.messages import HumanMessage
 
 
+# Default mapping of JD sections to the resume sections they are matched against.
+# Only these JD sections are embedded and searched.
+DEFAULT_JD_SECTION_MAP = {
+    "required_qualifications": ["skills", "education", "experience"],
+    "preferred_qualification": ["skills", "education", "experience"],
+    "role": ["skills", "education", "experience"],
+    "key_responsibilities": ["skills", "projects", "experience"],
+    "professional_technical_skills": ["skills", "education", "experience"],
+    "nice_to_have": ["skills", "projects", "experience"],
+    "desired_skills": ["skills", "projects", "experience"],
+    "responsibilities": ["skills", "projects", "experience"],
+    "duties": ["skills", "projects", "experience"],
+    "what_you_ll_do": ["skills", "projects", "experience"],
+}
+
+# Shared parsed-and-embedded JD artifacts, one folder per normalized JD text hash (default under the backend root)
+JD_VECTORS_DIR = os.path.abspath(os.getenv("JD_VECTORS_DIR") or os.path.join(PROJECT_ROOT, "jd_vectors"))
+JD_BUNDLE_FILENAME = "jd.bundle"
+
+# JD artifacts not used for this many seconds are deleted (0 keeps them regardless of age)
+JD_VECTORS_TTL = int(os.getenv("JD_VECTORS_TTL", 30 * 24 * 3600))
+
+# Upper bound on the size of JD_VECTORS_DIR; the least recently used artifacts go first (0: no bound)
+JD_VECTORS_MAX_BYTES = int(os.getenv("JD_VECTORS_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Minimum seconds between two retention sweeps of one worker (a sweep lists every stored JD)
+JD_VECTORS_SWEEP_INTERVAL = int(os.getenv("JD_VECTORS_SWEEP_INTERVAL", 600))
+
 
 def load_jd(file=None, text=None):
     """
     Extract JD text either from a pasted string or an uploaded PDF file.
-    Returns (jd_text, file_type, temp_path)
+    The PDF is parsed straight from the upload bytes, nothing is written to disk.
+    Returns (jd_text, file_type)
     file_type: "text" or "pdf"
-    temp_path: the temporary file's path if created, otherwise None (to allow cleanup)
     """
     if text:
-        return text, "text", None
+        return text, "text"
 
     if file:
-        suffix = os.path.splitext(file.filename)[-1].lower()
-        if suffix != ".pdf":
-            raise ValueError("Only .pdf files are supported for JD upload.")
-        temp_fd, temp_path = tempfile.mkstemp(suffix=suffix)    #Create a temporary file to save the uploaded PDF file
-        with os.fdopen(temp_fd, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        try:
-            doc = fitz.open(temp_path)
-            jd_text = "\n".join(page.get_text() for page in doc)
-        except Exception as e:
-            os.remove(temp_path)
-            raise e
-        return jd_text, "pdf", temp_path
+        check_jd_file(file)
+        return jd_text_from_pdf(file.file.read()), "pdf"
 
     raise ValueError("No file or JD text provided.")
 
 
+async def load_jd_async(file=None, text=None):
+    """load_jd for async handlers: the PDF is parsed in the process pool."""
+    if text:
+        return text, "text"
+
+    if file:
+        check_jd_file(file)
+        return await run_cpu(jd_text_from_pdf, await file.read()), "pdf"
+
+    raise ValueError("No file or JD text provided.")
+
+
+def check_jd_file(file):
+    suffix = os.path.splitext(file.filename)[-1].lower()
+    if suffix != ".pdf":
+        raise ValueError("Only .pdf files are supported for JD upload.")
+
+
+def jd_text_from_pdf(data: bytes) -> str:
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return "\n".join(page.get_text() for page in doc)
+
+
 def split_section_content(text: str) -> list:
     """
     Split the section content into list of meaningful points,
@@ -126,97 +182,176 @@ def extract_jd_sections(jd_text: str) -> dict:
     return sections
 
 
-def create_jd_json_files(jd_sections: dict) -> dict:
+def create_jd_section_embeddings(jd_sections: dict,
+                                 model_name: str = DEFAULT_EMBEDDING_MODEL,
+                                 sections: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
     """
-    Given jd_sections dictionary {section_name: list_of_points}, create 
-    temporary JSON files for each section.
-
-    Returns a dictionary mapping section_name to JSON file path.
+    Create vector embeddings for JD sections in memory.
+    All sections are embedded in one batch.
+    
+    Args:
+        jd_sections: {section_name: list_of_points} from extract_jd_sections
+        model_name: SentenceTransformer model name
+        sections: JD sections to embed; defaults to the sections searched by relevance_search
+    
+    Returns:
+        Dict of {section_name: (n_points, dim) embedding matrix}
     """
+    if sections is None:
+        sections = list(DEFAULT_JD_SECTION_MAP.keys())
 
-    temp_dir = tempfile.mkdtemp(prefix="jd_json_")
+    # Collect texts of the searched sections; the rest (company blurb, benefits...) is never matched
+    section_texts_map = {}
+    for section_name, content in jd_sections.items():
+        if section_name not in sections:
+            continue
 
-    file_paths = {}
+        texts_to_embed = section_texts(content)
+        if not texts_to_embed:
+            print(f"No content to embed for section {section_name}, skipping.")
+            continue
+        section_texts_map[section_name] = texts_to_embed
 
-    for section, content in jd_sections.items():
-        file_path = os.path.join(temp_dir, f"{section}.json")
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(content, f, ensure_ascii=False, indent=2)
-        file_paths[section] = file_path
+    # Generate embeddings for all sections with a single encode call
+    return encode_sections(section_texts_map, model_name)
 
-    return file_paths
 
-def create_jd_section_embeddings(jd_json_dir: str, 
-                                 model_name: str = "sentence-transformers/all-MiniLM-L6-v2") -> str:
+def normalize_jd_text(jd_text: str) -> str:
     """
-    Create vector embeddings for each section JSON file in jd_json_dir.
-    Save embeddings as .npy files in the same directory.
-    
-    Args:
-        jd_json_dir: path to directory where sectionwise JD JSON files are located
-        model_name: SentenceTransformer model name
-    
-    Returns:
-        The directory path where the embeddings were saved.
+    Canonical JD text: NFKC, whitespace collapsed within lines, blank lines dropped.
+    Line breaks are kept because section detection relies on them.
     """
-    if not os.path.exists(jd_json_dir):
-        raise FileNotFoundError(f"JD JSON directory {jd_json_dir} does not exist.")
+    lines = (re.sub(r"\s+", " ", line).strip() for line in unicodedata.normalize("NFKC", jd_text).splitlines())
+    return "\n".join(line for line in lines if line)
 
-    embedder = SentenceTransformer(model_name)
 
-    # Clean out old .npy embedding files if any
-    existing_npy_files = glob.glob(os.path.join(jd_json_dir, "*.npy"))
-    for npy_file in existing_npy_files:
-        try:
-            os.remove(npy_file)
-        except Exception as e:
-            print(f"Warning: Unable to remove old embedding file {npy_file}: {e}")
-
-    # Find all section json files
-    json_files = glob.glob(os.path.join(jd_json_dir, "*.json"))
-    for json_file in json_files:
-        section_name = os.path.splitext(os.path.basename(json_file))[0]
-
-        with open(json_file, "r", encoding="utf-8") as jf:
-            content = json.load(jf)
-
-        # Prepare texts for embedding based on content structure
-        texts_to_embed = []
-        if isinstance(content, list):
-            # check if list of dict with 'name' and 'points'
-            if content and isinstance(content[0], dict) and "name" in content[0] and "points" in content[0]:
-                for entry in content:
-                    combined = entry["name"]
-                    if entry["points"]:
-                        combined += " " + " ".join(entry["points"])
-                    texts_to_embed.append(combined)
-            else:
-                # list of strings
-                texts_to_embed = content
-        elif isinstance(content, str):
-            texts_to_embed = [content]
+def jd_content_hash(jd_text: str) -> str:
+    """SHA-256 of the normalized JD text; the same posting pasted by many users maps to one artifact."""
+    return hashlib.sha256(normalize_jd_text(jd_text).encode("utf-8")).hexdigest()
+
+
+def jd_artifact_path(jd_hash: str) -> str:
+    return os.path.join(shard_dir(JD_VECTORS_DIR, jd_hash), JD_BUNDLE_FILENAME)
+
+
+def load_jd_artifact(jd_hash: str, model_name: str = DEFAULT_EMBEDDING_MODEL):
+    """
+    Stored (jd_sections, jd_embeddings) of a JD, or None if missing or embedded with another model.
+    A reused artifact's mtime is refreshed: it is the last-use time retention evicts by.
+    """
+    path = jd_artifact_path(jd_hash)
+    try:
+        bundle = VectorBundle(path)
+    except (FileNotFoundError, ValueError):
+        return None
+    if bundle.model_name != model_name:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    jd_embeddings = {
+        name: np.array(bundle.section_matrix(name), dtype=np.float32)
+        for name in bundle.section_names
+        if bundle.has_embeddings(name)
+    }
+    return bundle.to_sections_dict(), jd_embeddings
+
+
+def prepare_jds(jd_texts: List[str], model_name: str = DEFAULT_EMBEDDING_MODEL) -> List[tuple]:
+    """
+    Parses and embeds JDs, reusing the shared artifact of any JD seen before.
+    New JDs are embedded together in one batch and stored for the next request.
+    Returns one (jd_sections, jd_embeddings, jd_hash, reused) tuple per JD, in input order.
+    """
+    prepared = [None] * len(jd_texts)
+    missing = {}
+    for idx, jd_text in enumerate(jd_texts):
+        jd_hash = jd_content_hash(jd_text)
+        artifact = load_jd_artifact(jd_hash, model_name)
+        if artifact is not None:
+            prepared[idx] = (*artifact, jd_hash, True)
         else:
-            # fallback: serialize and embed as string
-            texts_to_embed = [json.dumps(content)]
+            missing.setdefault(jd_hash, []).append(idx)
 
-        if not texts_to_embed:
-            print(f"No content to embed for section {section_name}, skipping.")
-            continue
+    if missing:
+        hashes = list(missing)
+        # Parse the normalized text so every copy of a posting yields the same sections
+        sections_list = [extract_jd_sections(normalize_jd_text(jd_texts[missing[h][0]])) for h in hashes]
+        embeddings_list = create_jd_batch_embeddings(sections_list, model_name)
+        for jd_hash, jd_sections, jd_embeddings in zip(hashes, sections_list, embeddings_list):
+            write_bundle(jd_artifact_path(jd_hash), jd_sections, jd_embeddings, model_name, mode="float32")
+            for idx in missing[jd_hash]:
+                prepared[idx] = (jd_sections, jd_embeddings, jd_hash, False)
+        maybe_evict_jd_artifacts()
+    return prepared
 
-        # Generate embeddings numpy array
-        embeddings = embedder.encode(texts_to_embed, convert_to_numpy=True)
 
-        # Save embedding as .npy file named by section
-        npy_path = os.path.join(jd_json_dir, f"{section_name}.npy")
-        try:
-            np.save(npy_path, embeddings)
-            print(f"Saved JD embeddings for section {section_name} at {npy_path}")
-        except Exception as e:
-            print(f"Error saving embeddings for section {section_name}: {e}")
+def prepare_jd(jd_text: str, model_name: str = DEFAULT_EMBEDDING_MODEL) -> tuple:
+    """Single JD version of prepare_jds: (jd_sections, jd_embeddings, jd_hash, reused)."""
+    return prepare_jds([jd_text], model_name)[0]
 
-    print(f"All JD section embeddings created in {jd_json_dir}")
-    return jd_json_dir
 
+def evict_jd_artifacts(ttl: int = JD_VECTORS_TTL, max_bytes: int = JD_VECTORS_MAX_BYTES) -> dict:
+    """
+    Retention of the shared JD artifacts: deletes those unused for ttl seconds, then the
+    least recently used until JD_VECTORS_DIR holds at most max_bytes. Last use is the
+    bundle's mtime (written on creation, refreshed by load_jd_artifact). An artifact deleted
+    while a request reads it is only re-embedded by the next request for that JD.
+    """
+    artifacts = []
+    for root, _, files in os.walk(JD_VECTORS_DIR):
+        if JD_BUNDLE_FILENAME in files:
+            path = os.path.join(root, JD_BUNDLE_FILENAME)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            artifacts.append((st.st_mtime, st.st_size, path))
+    artifacts.sort()
+
+    total_bytes = sum(size for _, size, _ in artifacts)
+    oldest = time.time() - ttl
+    removed = 0
+    removed_bytes = 0
+    for mtime, size, path in artifacts:
+        expired = ttl and mtime < oldest
+        over_budget = max_bytes and total_bytes - removed_bytes > max_bytes
+        if not expired and not over_budget:
+            break
+        try:
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+        removed += 1
+        removed_bytes += size
+
+    kept = len(artifacts) - removed
+    if removed:
+        print(f"JD artifacts: evicted {removed} ({removed_bytes} bytes), kept {kept}")
+    return {"removed": removed, "removed_bytes": removed_bytes, "kept": kept,
+            "kept_bytes": total_bytes - removed_bytes}
+
+
+_last_jd_sweep = 0.0
+_jd_sweep_lock = threading.Lock()
+
+
+def maybe_evict_jd_artifacts():
+    """evict_jd_artifacts at most once per JD_VECTORS_SWEEP_INTERVAL per worker, after new artifacts were written."""
+    global _last_jd_sweep
+    if not JD_VECTORS_TTL and not JD_VECTORS_MAX_BYTES:
+        return
+    with _jd_sweep_lock:
+        now = time.time()
+        if now - _last_jd_sweep < JD_VECTORS_SWEEP_INTERVAL:
+            return
+        _last_jd_sweep = now
+    try:
+        evict_jd_artifacts()
+    except Exception as e:
+        print(f"JD artifact retention failed: {e}")
 
 
 def cosine_similarity(v1: np.ndarray, v2: np.ndarray) -> float:
@@ -225,42 +360,183 @@ def cosine_similarity(v1: np.ndarray, v2: np.ndarray) -> float:
     return np.dot(v1, v2) / (norm(v1) * norm(v2))
 
 
-def relevance_search(
+def stack_jd_embeddings(
+    jd_sections: Dict[str, List[str]],
+    jd_embeddings: Dict[str, np.ndarray],
+    jd_section_map: Dict[str, List[str]],
+) -> Tuple[Optional[np.ndarray], Dict[str, Tuple[int, int]]]:
+    """
+    Stacks the embeddings of the searched JD sections into one normalized matrix.
+    Returns (matrix or None if nothing is searched, {jd_section: (row_start, row_stop)}).
+    """
+    searched = [name for name in jd_section_map if name in jd_sections and name in jd_embeddings]
+    row_ranges = {}
+    offset = 0
+    for name in searched:
+        row_ranges[name] = (offset, offset + len(jd_embeddings[name]))
+        offset += len(jd_embeddings[name])
+    if not searched:
+        return None, row_ranges
+    return normalize_rows(np.vstack([jd_embeddings[name] for name in searched])), row_ranges
+
+
+def stack_jd_texts(jd_sections: Dict[str, List[str]], jd_row_ranges: Dict[str, Tuple[int, int]]) -> List[str]:
+    """JD point texts in the row order of stack_jd_embeddings (the BM25 queries)."""
+    return [text for name in jd_row_ranges for text in section_texts(jd_sections[name])]
+
+
+def lexical_similarities(cached_resume, jd_texts: List[str], fusion: str = HYBRID_FUSION) -> Optional[np.ndarray]:
+    """(JD points x resume chunks) normalized BM25 scores, or None when fusion is off or there is no index."""
+    if fusion == "none" or cached_resume.lexical is None:
+        return None
+    return cached_resume.lexical.score_matrix(jd_texts)
+
+
+def _resume_chunk(resume_chunks, idx: int):
+    """Defensive chunk extraction considering content structure; None if idx is out of range."""
+    if isinstance(resume_chunks, list):
+        return resume_chunks[idx] if idx < len(resume_chunks) else None
+    if isinstance(resume_chunks, str):
+        return resume_chunks
+    # fallback case: stringifying content
+    return str(resume_chunks)
+
+
+def _section_rows(resume_bundle, resume_section: str) -> Tuple[int, int]:
+    meta = resume_bundle.sections[resume_section]
+    return meta["row_start"], meta["row_start"] + meta["row_count"]
+
+
+def match_from_similarities(
+    resume_bundle,
+    similarities: np.ndarray,
+    jd_row_ranges: Dict[str, Tuple[int, int]],
+    jd_section_map: Dict[str, List[str]],
+    top_k: int = 3,
+    aggregate: str = RELEVANCE_AGGREGATE,
+    lexical: Optional[np.ndarray] = None,
+    fusion: str = HYBRID_FUSION,
+) -> Dict[str, Dict[str, List[dict]]]:
+    """
+    Turns a (JD chunks x resume chunks) similarity matrix into relevance results:
+    for each JD section / mapped resume section block, aggregate per resume chunk and take the top-k.
+    lexical: optional BM25 matrix of the same shape, fused with the dense scores per resume chunk.
+    """
+    results = {}
+    for jd_section, mapped_resume_sections in jd_section_map.items():
+        if jd_section not in jd_row_ranges:
+            continue
+        jd_start, jd_stop = jd_row_ranges[jd_section]
+
+        # Accumulate resume relevant chunks per resume section
+        relevant_resume_chunks = {}
+        for resume_section in mapped_resume_sections:
+            if not resume_bundle.has_embeddings(resume_section):
+                continue
+
+            row_start, row_stop = _section_rows(resume_bundle, resume_section)
+            block = similarities[jd_start:jd_stop, row_start:row_stop]
+            scores = aggregate_scores(block, aggregate)
+            if lexical is not None:
+                lexical_block = lexical[jd_start:jd_stop, row_start:row_stop]
+                scores = fuse_scores(scores, aggregate_scores(lexical_block, aggregate), fusion)
+            top_matches = top_k_rows(scores, top_k)
+
+            resume_chunks = resume_bundle.section_content(resume_section)
+            matched_chunks = []
+            for idx, score in top_matches:
+                chunk = _resume_chunk(resume_chunks, idx)
+                if chunk is not None:
+                    matched_chunks.append({"chunk": chunk, "score": round(score, 4)})
+            relevant_resume_chunks[resume_section] = matched_chunks
+
+        if relevant_resume_chunks:
+            results[jd_section] = relevant_resume_chunks
+    return results
+
+
+def jd_point_scores(
+    resume_bundle,
+    similarities: np.ndarray,
+    jd_row_ranges: Dict[str, Tuple[int, int]],
+    jd_section_map: Dict[str, List[str]],
+) -> np.ndarray:
+    """
+    Best similarity of every searched JD point (rows in jd_row_ranges order) against the
+    resume sections mapped to its JD section; 0 when none of them has embeddings.
+    """
+    best_per_point = []
+    for jd_section, (jd_start, jd_stop) in jd_row_ranges.items():
+        resume_rows = [
+            np.arange(*_section_rows(resume_bundle, name))
+            for name in jd_section_map.get(jd_section, [])
+            if resume_bundle.has_embeddings(name)
+        ]
+        if not resume_rows:
+            best_per_point.append(np.zeros(jd_stop - jd_start, dtype=np.float32))
+            continue
+        block = similarities[jd_start:jd_stop][:, np.concatenate(resume_rows)]
+        best_per_point.append(block.max(axis=1))
+    if not best_per_point:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(best_per_point)
+
+
+def jd_match_score(
+    resume_bundle,
+    similarities: np.ndarray,
+    jd_row_ranges: Dict[str, Tuple[int, int]],
+    jd_section_map: Dict[str, List[str]],
+) -> float:
+    """
+    Overall match of one JD: every searched JD point takes its best similarity against
+    the resume sections mapped to its JD section, and the score is the mean over points
+    (how well the requirements are covered, negative similarities count as 0).
+    """
+    best_per_point = jd_point_scores(resume_bundle, similarities, jd_row_ranges, jd_section_map)
+    if not best_per_point.size:
+        return 0.0
+    return float(np.clip(best_per_point, 0.0, None).mean())
+
+
+def scored_relevance_search(
     user_email: str,
-    jd_json_dir: str,
-    jd_embedding_dir: str,
+    jd_sections: Dict[str, List[str]],
+    jd_embeddings: Dict[str, np.ndarray],
     db_session: Session,
     jd_section_map: Optional[Dict[str, List[str]]] = None,
     resume_section_titles: Optional[List[str]] = None,
-) -> Dict[str, Dict[str, List[str]]]:
+    top_k: int = 3,
+    aggregate: str = RELEVANCE_AGGREGATE,
+    fusion: str = HYBRID_FUSION,
+    user_id: Optional[int] = None,
+) -> dict:
     """
-    Perform hybrid similarity search between JD embeddings and Resume embeddings.
+    Perform hybrid similarity search between JD embeddings and Resume embeddings:
+    dense cosine scores fused with BM25 scores of the JD points against the resume's
+    inverted index, so exact skill terms are not outranked by vague semantic neighbours.
     Args:
-        user_email: The user's email to find resume vector folder path.
-        jd_json_dir: Folder path with JD section JSON chunk files.
-        jd_embedding_dir: Folder path with JD section .npy embedding files.
-        db_session: SQLAlchemy session to query VectorMeta.
+        user_email: The user's email to find resume vector bundle.
+        jd_sections: JD sections {section_name: list_of_points}.
+        jd_embeddings: JD section embeddings from create_jd_section_embeddings.
+        db_session: SQLAlchemy session to query VectorMeta on a resume cache miss.
         jd_section_map: Mapping from JD sections to list of resume sections.
         resume_section_titles: List of all expected resume section titles.
+        top_k: Number of resume chunks returned per resume section.
+        aggregate: How the similarities of all JD chunks combine per resume chunk ("max" or "mean").
+        fusion: How BM25 and dense scores are fused ("weighted", "rrf" or "none"); the faiss backend is dense only.
+        user_id: The user's id when known (from the auth principal), so a cache miss skips the email join.
 
     Returns:
-        Dict of {jd_section: {resume_section: [relevant chunks]}}
+        {
+            "relevance_results": {jd_section: {resume_section: [{"chunk": ..., "score": ...}]}}, best match first,
+            "match_score": jd_match_score of the JD (dense similarity),
+            "jd_point_scores": [{"section", "point", "score"}] best similarity of every searched JD point,
+        }
     """
 
     if jd_section_map is None:
-        jd_section_map = {
-            "required_qualifications": ["skills", "education", "experience"],
-            "preferred_qualification": ["skills", "education", "experience"],
-            "role": ["skills", "education", "experience"],
-            "key_responsibilities": ["skills", "projects", "experience"],
-            "professional_technical_skills": ["skills", "education", "experience"],
-            "nice_to_have": ["skills", "projects", "experience"],
-            "desired_skills": ["skills", "projects", "experience"],
-            "responsibilities": ["skills", "projects", "experience"],
-            "duties": ["skills", "projects", "experience"],
-            "what_you_ll_do": ["skills", "projects", "experience"],
-            
-        }
+        jd_section_map = DEFAULT_JD_SECTION_MAP
 
     if resume_section_titles is None:
         resume_section_titles = [
@@ -268,81 +544,227 @@ def relevance_search(
             "skills", "projects", "certifications", "contact", "links", "profile"
         ]
 
-    # Get user's vector folder relative path from DB
-    vector_meta = db_session.query(VectorMeta).join(User).filter(User.email == user_email).first()
+    jd_matrix, jd_row_ranges = stack_jd_embeddings(jd_sections, jd_embeddings, jd_section_map)
+    if jd_matrix is None:
+        return {"relevance_results": {}, "match_score": 0.0, "jd_point_scores": []}
+    jd_texts = stack_jd_texts(jd_sections, jd_row_ranges)
+
+    if RELEVANCE_BACKEND == "faiss":
+        scored = faiss_relevance_search(user_email, db_session, jd_matrix, jd_row_ranges, jd_texts,
+                                        jd_section_map, top_k, user_id)
+        if scored is not None:
+            return scored
+
+    # User's resume sections and normalized matrix from the per-worker cache (DB + disk only on a miss)
+    cached_resume = get_resume_cache().get(user_email, db_session, user_id=user_id)
+    resume_bundle = cached_resume.bundle
+
+    # Every searched JD chunk x every resume chunk in one matmul over the pre-normalized bundle
+    similarities = similarity_matrix(jd_matrix, cached_resume.matrix, cached_resume.scales)
+
+    # Per-point coverage feeds the overall score and the low-match summary
+    scored = score_jd_points(resume_bundle, similarities, jd_texts, jd_row_ranges, jd_section_map)
+    lexical = lexical_similarities(cached_resume, jd_texts, fusion)
+    scored["relevance_results"] = match_from_similarities(
+        resume_bundle, similarities, jd_row_ranges, jd_section_map, top_k, aggregate, lexical, fusion
+    )
+    return scored
 
-    if not vector_meta or not vector_meta.vector_folder_path:
-        raise ValueError(f"Vector folder path not found for user: {user_email}")
 
-    # Compose absolute resume vectors folder path based on current location
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # utils folder
-    PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, "..", ".."))  # adjust to root
-    resume_vectors_path = os.path.normpath(os.path.join(PROJECT_ROOT, vector_meta.vector_folder_path))
+def faiss_relevance_search(
+    user_email: str,
+    db_session: Session,
+    jd_matrix: np.ndarray,
+    jd_row_ranges: Dict[str, Tuple[int, int]],
+    jd_texts: List[str],
+    jd_section_map: Dict[str, List[str]],
+    top_k: int,
+    user_id: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    scored_relevance_search on the shared FAISS index instead of the resume matrix: only the
+    bundle header and section content are read, the matches and every JD point's best
+    similarity come from k-NN searches restricted to the user's rows of each mapped section.
+    A user missing from the index, or whose indexed row count no longer matches the bundle
+    (uploaded while the backend was disabled), is indexed from their bundle first; None when
+    that fails, so the caller falls back to the dense path.
+    """
+    resume_user_id, folder = get_resume_cache().locate(user_email, db_session, user_id=user_id)
+    try:
+        resume_bundle = open_bundle(folder)
+    except FileNotFoundError:
+        raise ValueError(f"Vector bundle not found for user: {user_email}")
+
+    index = get_resume_index()
+    if index.user_vectors(resume_user_id) != resume_bundle.rows:
+        try:
+            added = index.upsert_user(resume_user_id, resume_bundle)
+            print(f"Backfilled {added} resume chunks of user {resume_user_id} into the resume index")
+        except Exception as e:
+            print(f"Resume index backfill failed for user {resume_user_id}, using dense search: {e}")
+            return None
 
     results = {}
+    best_per_point = []
+    for jd_section, (jd_start, jd_stop) in jd_row_ranges.items():
+        queries = jd_matrix[jd_start:jd_stop]
+        point_best = np.full(jd_stop - jd_start, -np.inf, dtype=np.float32)
+        relevant_resume_chunks = {}
+        for resume_section in jd_section_map.get(jd_section, []):
+            if not resume_bundle.has_embeddings(resume_section):
+                continue
 
-    for jd_section, mapped_resume_sections in jd_section_map.items():
-        # Load JD section embedding
-        jd_embedding_path = os.path.join(jd_embedding_dir, f"{jd_section}.npy")
-        jd_json_path = os.path.join(jd_json_dir, f"{jd_section}.json")
+            # Every JD chunk against this user's rows of this section in the shared index
+            row_start, row_stop = _section_rows(resume_bundle, resume_section)
+            scores, rows = index.search_rows(queries, top_k, resume_user_id, (row_start, row_stop))
+            point_best = np.maximum(point_best, np.where(rows[:, 0] >= 0, scores[:, 0], -np.inf))
 
-        if not os.path.exists(jd_embedding_path) or not os.path.exists(jd_json_path):
-            continue
+            resume_chunks = resume_bundle.section_content(resume_section)
+            matched_chunks = []
+            for score, _, row in best_rows(scores, rows, top_k, resume_user_id):
+                chunk = _resume_chunk(resume_chunks, row - row_start)
+                if chunk is not None:
+                    matched_chunks.append({"chunk": chunk, "score": round(score, 4)})
+            relevant_resume_chunks[resume_section] = matched_chunks
 
-        jd_embedding = np.load(jd_embedding_path)
-        with open(jd_json_path, "r", encoding="utf-8") as f:
-            jd_chunks = json.load(f)
+        # Points without any searchable resume section score 0, as in jd_point_scores
+        best_per_point.append(np.where(np.isfinite(point_best), point_best, 0.0))
+        if relevant_resume_chunks:
+            results[jd_section] = relevant_resume_chunks
 
-        # Accumulate resume relevant chunks per resume section
-        relevant_resume_chunks = {}
+    scored = summarize_point_scores(np.concatenate(best_per_point), jd_texts, jd_row_ranges)
+    scored["relevance_results"] = results
+    return scored
+
+
+def score_jd_points(
+    resume_bundle,
+    similarities: np.ndarray,
+    jd_texts: List[str],
+    jd_row_ranges: Dict[str, Tuple[int, int]],
+    jd_section_map: Dict[str, List[str]],
+) -> dict:
+    """{"match_score", "jd_point_scores"} of one JD from its similarity matrix (see jd_match_score)."""
+    point_scores = jd_point_scores(resume_bundle, similarities, jd_row_ranges, jd_section_map)
+    return summarize_point_scores(point_scores, jd_texts, jd_row_ranges)
+
+
+def summarize_point_scores(
+    point_scores: np.ndarray,
+    jd_texts: List[str],
+    jd_row_ranges: Dict[str, Tuple[int, int]],
+) -> dict:
+    """{"match_score", "jd_point_scores"} from the best similarity of every searched JD point."""
+    point_sections = [name for name, (start, stop) in jd_row_ranges.items() for _ in range(stop - start)]
+    return {
+        "match_score": round(float(np.clip(point_scores, 0.0, None).mean()) if point_scores.size else 0.0, 4),
+        "jd_point_scores": [
+            {"section": section, "point": text, "score": round(float(score), 4)}
+            for section, text, score in zip(point_sections, jd_texts, point_scores)
+        ],
+    }
 
-        for resume_section in mapped_resume_sections:
-            resume_npy_path = os.path.join(resume_vectors_path, f"{resume_section}.npy")
-            resume_json_path = os.path.join(resume_vectors_path, f"{resume_section}.json")
 
-            if not os.path.exists(resume_npy_path) or not os.path.exists(resume_json_path):
-                continue
+def relevance_search(
+    user_email: str,
+    jd_sections: Dict[str, List[str]],
+    jd_embeddings: Dict[str, np.ndarray],
+    db_session: Session,
+    jd_section_map: Optional[Dict[str, List[str]]] = None,
+    resume_section_titles: Optional[List[str]] = None,
+    top_k: int = 3,
+    aggregate: str = RELEVANCE_AGGREGATE,
+    fusion: str = HYBRID_FUSION,
+) -> Dict[str, Dict[str, List[dict]]]:
+    """
+    scored_relevance_search without the scores:
+    {jd_section: {resume_section: [{"chunk": ..., "score": ...}]}}, best match first.
+    """
+    return scored_relevance_search(
+        user_email, jd_sections, jd_embeddings, db_session,
+        jd_section_map, resume_section_titles, top_k, aggregate, fusion,
+    )["relevance_results"]
 
-            # Load resume embeddings and chunks
-            resume_embeddings = np.load(resume_npy_path)
-            with open(resume_json_path, "r", encoding="utf-8") as f:
-                resume_chunks = json.load(f)
 
-            # Ensure JD embedding and resume embeddings shapes
-            if len(jd_embedding.shape) == 1:
-                jd_embedding = jd_embedding.reshape(1, -1)
-            if len(resume_embeddings.shape) == 1:
-                resume_embeddings = resume_embeddings.reshape(1, -1)
+def create_jd_batch_embeddings(
+    jd_sections_list: List[Dict[str, List[str]]],
+    model_name: str = DEFAULT_EMBEDDING_MODEL,
+    sections: Optional[List[str]] = None,
+) -> List[Dict[str, np.ndarray]]:
+    """
+    Embeds the searched sections of many JDs with one encode call.
+    Returns one {section_name: matrix} dict per JD, in input order.
+    """
+    if sections is None:
+        sections = list(DEFAULT_JD_SECTION_MAP.keys())
 
-            # Compute cosine similarity from JD section vector vs all resume section vectors
-            similar_scores = []
-            for idx, r_vec in enumerate(resume_embeddings):
-                score = cosine_similarity(jd_embedding[0], r_vec)
-                similar_scores.append((score, idx))
+    keyed_texts = {}
+    for jd_idx, jd_sections in enumerate(jd_sections_list):
+        for section_name, content in jd_sections.items():
+            if section_name in sections:
+                keyed_texts[(jd_idx, section_name)] = section_texts(content)
 
-            # Sort by score descending and take top-k (e.g., top 3 or more)
-            top_k = 3
-            top_matches = sorted(similar_scores, key=lambda x: x[0], reverse=True)[:top_k]
+    # encode_sections only needs hashable keys, so all JDs share a single batch
+    keyed_embeddings = encode_sections(keyed_texts, model_name)
 
-            # Extract corresponding resume chunks text for top matches
-            matched_chunks = []
-            for score, idx in top_matches:
-                # Defensive chunk extraction considering content structure
-                if isinstance(resume_chunks, list):
-                    if idx < len(resume_chunks):
-                        matched_chunks.append(resume_chunks[idx])
-                elif isinstance(resume_chunks, str):
-                    matched_chunks.append(resume_chunks)
-                else:
-                    # fallback case: stringifying content
-                    matched_chunks.append(str(resume_chunks))
+    per_jd = [{} for _ in jd_sections_list]
+    for (jd_idx, section_name), matrix in keyed_embeddings.items():
+        per_jd[jd_idx][section_name] = matrix
+    return per_jd
 
-            relevant_resume_chunks[resume_section] = matched_chunks
 
-        if relevant_resume_chunks:
-            results[jd_section] = relevant_resume_chunks
+def batch_relevance_search(
+    user_email: str,
+    jd_sections_list: List[Dict[str, List[str]]],
+    jd_embeddings_list: List[Dict[str, np.ndarray]],
+    db_session: Session,
+    jd_section_map: Optional[Dict[str, List[str]]] = None,
+    top_k: int = 3,
+    aggregate: str = RELEVANCE_AGGREGATE,
+    fusion: str = HYBRID_FUSION,
+    user_id: Optional[int] = None,
+) -> List[dict]:
+    """
+    Scores many JDs against the user's resume with a single matmul over all JD chunks.
+    Returns one {"match_score", "jd_point_scores", "relevance_results"} dict per JD, in input order.
+    """
+    if jd_section_map is None:
+        jd_section_map = DEFAULT_JD_SECTION_MAP
 
-    return results
+    cached_resume = get_resume_cache().get(user_email, db_session, user_id=user_id)
+
+    stacked = [
+        stack_jd_embeddings(jd_sections, jd_embeddings, jd_section_map)
+        for jd_sections, jd_embeddings in zip(jd_sections_list, jd_embeddings_list)
+    ]
+    jd_texts_list = [
+        stack_jd_texts(jd_sections, jd_row_ranges) if matrix is not None else []
+        for jd_sections, (matrix, jd_row_ranges) in zip(jd_sections_list, stacked)
+    ]
+    matrices = [matrix for matrix, _ in stacked if matrix is not None]
+    if matrices:
+        all_similarities = similarity_matrix(np.vstack(matrices), cached_resume.matrix, cached_resume.scales)
+        all_lexical = lexical_similarities(
+            cached_resume, [text for jd_texts in jd_texts_list for text in jd_texts], fusion
+        )
+
+    scored = []
+    offset = 0
+    for (matrix, jd_row_ranges), jd_texts in zip(stacked, jd_texts_list):
+        if matrix is None:
+            scored.append({"match_score": 0.0, "jd_point_scores": [], "relevance_results": {}})
+            continue
+        similarities = all_similarities[offset:offset + len(matrix)]
+        lexical = None if all_lexical is None else all_lexical[offset:offset + len(matrix)]
+        offset += len(matrix)
+        scored.append({
+            **score_jd_points(cached_resume.bundle, similarities, jd_texts, jd_row_ranges, jd_section_map),
+            "relevance_results": match_from_similarities(
+                cached_resume.bundle, similarities, jd_row_ranges, jd_section_map, top_k, aggregate,
+                lexical, fusion,
+            ),
+        })
+    return scored
 
 #LLM INTEGRATION:
 load_dotenv() 
@@ -351,27 +773,22 @@ api_key = os.getenv("COHERE_API_KEY")
 # Initialize ChatCohere LLM with your API key and model
 chat = ChatCohere(api_key=api_key, model="command-r-plus-08-2024", temperature=0.7, max_tokens=512)
 
-def job_relevance(resume_chunks: str, jd_sections: str) -> str:
+def job_relevance_messages(relevance_results: dict, jd_sections: dict) -> list:
     """
-    Use Cohere Chat model to generate relevance summary from resume chunks and job description sections.
-
-    Args:
-        resume_chunks (str): Extracted relevant chunks from candidate resume.
-        jd_sections (str): Extracted sections from job description.
-
-    Returns:
-        str: Generated relevance and fit summary from the LLM.
+    Chat messages asking for the relevance summary of the matched resume chunks against
+    the JD, with both rendered by the token-budgeted prompt builder.
     """
-    messages = [
+    resume_context, jd_context = build_relevance_context(relevance_results, jd_sections)
+    return [
         HumanMessage(
             content=f"""
             You are a smart AI assistant. You are given these relevant resume chunks extracted based on the job description provided.
 
-            Relevant Resume Chunks:
-            {resume_chunks}
+            Relevant Resume Chunks ([id] (similarity) section: text):
+            {resume_context}
 
-            Job Description Sections:
-            {jd_sections}
+            Job Description Sections (section: points -> ids of the matching resume chunks):
+            {jd_context}
 
             Based on these, generate a response telling how relevant this job is to the candidate based on their profile.
             Mention the relevant skills, experience, projects, and overall fit for the role.
@@ -379,5 +796,23 @@ def job_relevance(resume_chunks: str, jd_sections: str) -> str:
         )
     ]
 
-    response = chat.invoke(messages)
-    return response.content
\ No newline at end of file
+
+def job_relevance(relevance_results: dict, jd_sections: dict, chat_model=None) -> str:
+    """
+    Use Cohere Chat model to generate relevance summary from resume chunks and job description sections.
+
+    Args:
+        relevance_results (dict): Matched resume chunks per JD section, from relevance_search.
+        jd_sections (dict): Extracted sections from job description.
+        chat_model: LangChain chat model to use instead of the module's ChatCohere client.
+
+    Returns:
+        str: Generated relevance and fit summary from the LLM (cached per prompt and model parameters).
+    """
+    return cached_invoke(chat_model or chat, job_relevance_messages(relevance_results, jd_sections))
+
+
+async def stream_job_relevance(relevance_results: dict, jd_sections: dict, chat_model=None):
+    """Streaming job_relevance: yields summary text fragments as the LLM produces them."""
+    async for text in cached_astream(chat_model or chat, job_relevance_messages(relevance_results, jd_sections)):
+        yield text
\ No newline at end of file
@@ -1,18 +1,31 @@
 import fitz  # PyMuPDF
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import os
 import shutil
 from sqlalchemy.orm import Session
 from app.models import Resume, VectorMeta, User
+from app.database import SessionLocal
 import datetime
 import uuid
+import hashlib
 from fastapi import UploadFile
 import fitz
 import re
 import json
 from typing import Dict, List
 import glob
+from app.utils.vector_bundle import write_bundle, bundle_path, shard_dir, open_bundle
+from app.utils.faiss_index import get_resume_index, user_id_base
+from app.utils.search_engine import RELEVANCE_BACKEND, normalize_rows
+from app.utils.vector_quantization import dequantize_embeddings
+from app.utils.resume_cache import get_resume_cache, resolve_vector_folder
+from app.utils.lexical_index import write_lexical_index
+from app.utils.embedding_model import (
+    DEFAULT_EMBEDDING_MODEL,
+    encode_sections,
+    is_embedded_section,
+    section_texts,
+)
 
 # Get base directory relative to this file's location
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -25,6 +38,36 @@ RESUME_UPLOAD_DIR = os.getenv("RESUME_UPLOAD_DIR", os.path.join(BASE_DIR, "..",
 RESUME_VECTORS_DIR = os.path.abspath(RESUME_VECTORS_DIR)
 RESUME_UPLOAD_DIR = os.path.abspath(RESUME_UPLOAD_DIR)
 
+def upload_content_hash(file: UploadFile) -> str:
+    """SHA-256 of the uploaded bytes, read in chunks; the upload is rewound for saving afterwards."""
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.file.read(1024 * 1024), b""):
+        digest.update(block)
+    file.file.seek(0)
+    return digest.hexdigest()
+
+
+def find_duplicate_resume(db: Session, user_id: int, content_hash: str):
+    """
+    The user's stored resume, vector meta and bundle when the upload is byte-identical
+    to the previous one and its vectors are still on disk; otherwise None.
+    """
+    resume = db.query(Resume).filter(Resume.user_id == user_id, Resume.content_hash == content_hash).first()
+    if not resume:
+        return None
+    vector_meta = db.query(VectorMeta).filter(
+        VectorMeta.user_id == resume.user_id,
+        VectorMeta.resume_id == resume.res_id,
+    ).first()
+    if not vector_meta or not vector_meta.vector_folder_path:
+        return None
+    try:
+        bundle = open_bundle(resolve_vector_folder(vector_meta.vector_folder_path))
+    except (FileNotFoundError, ValueError):
+        return None
+    return resume, vector_meta, bundle
+
+
 def save_resume_file(user_identifier: str, file: UploadFile) -> str:
     """
     Saves the uploaded PDF file to the resume_uploads folder with the user_identifier as filename.
@@ -42,6 +85,81 @@ def save_resume_file(user_identifier: str, file: UploadFile) -> str:
 
 
 
+def stage_resume_upload(file: UploadFile) -> str:
+    """
+    Saves an upload for background ingestion under RESUME_UPLOAD_DIR/pending with a unique name,
+    so a newer upload by the same user cannot overwrite a file a queued job still needs.
+    """
+    pending_dir = os.path.join(RESUME_UPLOAD_DIR, "pending")
+    os.makedirs(pending_dir, exist_ok=True)
+    staged_path = os.path.join(pending_dir, f"{uuid.uuid4().hex}.pdf")
+    with open(staged_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    return staged_path
+
+
+def resume_upload_response(user_email: str, file_path: str, sections_dict: dict, vector_folder: str,
+                           resume: Resume, vector_meta: VectorMeta, content_hash: str, embedding_stats: dict) -> dict:
+    """Result of a resume upload, shared by the synchronous endpoint and ingestion jobs."""
+    return {
+        "user_email": user_email,
+        "resume_file_path": str(file_path),
+        "extracted_sections": sections_dict,
+        "vector_folder": vector_folder,
+        "vector_bundle": bundle_path(vector_folder),
+        "resume_id": resume.res_id,
+        "vector_meta_id": vector_meta.vector_id,
+        "faiss_vector_id": vector_meta.faiss_vector_id,
+        "content_hash": content_hash,
+        "deduplicated": False,
+        "chunks_reused": embedding_stats["reused"],
+        "chunks_embedded": embedding_stats["embedded"],
+    }
+
+
+def ingest_resume_job(payload: dict, set_stage) -> dict:
+    """
+    Resume pipeline of a background ingestion job, run in an ingestion worker process.
+    payload: {"user_email", "user_id", "filename", "staged_path", "content_hash"}
+    set_stage(name) reports progress through the INGESTION_STAGES.
+    Safe to retry: the staged upload is removed once the job succeeded (the queue removes it
+    when the job fails for good).
+    """
+    user_email = payload["user_email"]
+
+    set_stage("save")
+    os.makedirs(RESUME_UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(RESUME_UPLOAD_DIR, f"{user_email}.pdf")
+    shutil.copyfile(payload["staged_path"], file_path)
+
+    set_stage("parse")
+    sections_dict = extract_text_from_pdf(file_path)
+    structured_sections = structure_resume_sections(sections_dict)
+
+    set_stage("embed")
+    vector_folder, embedding_stats = create_section_embeddings(user_email, structured_sections)
+
+    set_stage("record")
+    db = SessionLocal()
+    try:
+        resume = update_resume_record(db, user_email, payload["filename"], file_path, payload["content_hash"],
+                                      user_id=payload.get("user_id"))
+
+        set_stage("index")
+        faiss_vector_id = index_resume_vectors(resume.user_id, vector_folder)
+        vector_meta = update_vector_meta_record(
+            db, user_email, resume.res_id, faiss_vector_id=faiss_vector_id, vector_folder_path=vector_folder,
+            user_id=resume.user_id,
+        )
+        result = resume_upload_response(user_email, file_path, sections_dict, vector_folder,
+                                        resume, vector_meta, payload["content_hash"], embedding_stats)
+    finally:
+        db.close()
+
+    os.remove(payload["staged_path"])
+    return result
+
+
 def extract_text_from_pdf(pdf_path: str) -> Dict[str, List[str]]:
     """
     Extract text and links from resume PDF:
@@ -214,112 +332,153 @@ def merge_empty_points_sequential(sections_list):
     return merged
 
 
-def save_json_sectionwise(user_id, extracted_dict, base_dir="resume_vectors"):
-    user_dir = os.path.join(base_dir, str(user_id))
-    if os.path.exists(user_dir):
-        shutil.rmtree(user_dir)
-    os.makedirs(user_dir, exist_ok=True)
-
+def structure_resume_sections(extracted_dict: dict) -> dict:
+    """
+    Formats the extracted sections for storage: projects, certifications and
+    experience become lists of {'name', 'points'} entries, others are kept as is.
+    """
+    sections = {}
     for section, content in extracted_dict.items():
         if section in {"projects", "certifications", "experience"} and isinstance(content, list):
             formatted = format_structured_bullets(content)
             cleaned = merge_empty_points_sequential(formatted)
-            section_data = cleaned
+            sections[section] = cleaned
         else:
-            section_data = content
+            sections[section] = content
+    return sections
 
-        json_path = os.path.join(user_dir, f"{section}.json")
-        with open(json_path, "w", encoding="utf-8") as jf:
-            json.dump(section_data, jf, ensure_ascii=False, indent=2)
 
-    return user_dir
+def user_vector_dir(user_id, base_dir="resume_vectors") -> str:
+    """Sharded folder holding the user's vector bundle: base_dir/ab/cd/<user_id>."""
+    return shard_dir(base_dir, str(user_id))
 
 
-def create_section_embeddings(user_id, base_dir="resume_vectors", model_name="sentence-transformers/all-MiniLM-L6-v2"):
-    user_dir = os.path.join(base_dir, str(user_id))
-    if not os.path.exists(user_dir):
-        raise FileNotFoundError(f"User directory {user_dir} does not exist.")
-
-    # Load embedding model once
-    embedder = SentenceTransformer(model_name)
-
-    # Delete any existing .npy files in user folder
-    npy_files = glob.glob(os.path.join(user_dir, "*.npy"))
-    for file in npy_files:
-        try:
-            os.remove(file)
-        except Exception as e:
-            print(f"Warning: Failed to remove file {file}: {str(e)}")
-
-    # Find all JSON files to create embeddings for
-    json_files = glob.glob(os.path.join(user_dir, "*.json"))
-
-    for json_path in json_files:
-        section_name = os.path.splitext(os.path.basename(json_path))[0]
-
-        with open(json_path, "r", encoding="utf-8") as f:
-            content = json.load(f)
+def load_stored_chunks(user_dir: str, model_name: str) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Embedding rows of the user's current bundle keyed by section and chunk text,
+    {section: {text: normalized float32 row}}. Empty when there is no bundle or it
+    was embedded with another model.
+    """
+    try:
+        bundle = open_bundle(user_dir)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if bundle.model_name != model_name or not bundle.rows:
+        return {}
+
+    rows, scales = bundle.normalized_matrix()
+    rows = dequantize_embeddings(np.asarray(rows), None if scales is None else np.asarray(scales))
+    stored = {}
+    for name, meta in bundle.sections.items():
+        if not meta["row_count"]:
+            continue
+        texts = section_texts(bundle.section_content(name))[:meta["row_count"]]
+        start = meta["row_start"]
+        stored[name] = {text: rows[start + idx] for idx, text in enumerate(texts)}
+    return stored
 
-        texts_to_embed = []
 
-        # Prepare texts depending on structure
-        if isinstance(content, list):
-            # For list of dicts with 'name' and 'points', combine for embedding
-            if content and isinstance(content[0], dict) and "name" in content[0] and "points" in content[0]:
-                for entry in content:
-                    combined_text = entry["name"]
-                    if entry["points"]:
-                        combined_text += " " + " ".join(entry["points"])
-                    texts_to_embed.append(combined_text)
-            else:
-                # Flat list of strings (skills, header)
-                texts_to_embed = content
-        elif isinstance(content, str):
-            texts_to_embed = [content]
-        else:
-            # If unknown format, convert to string and embed
-            texts_to_embed = [json.dumps(content)]
+def create_section_embeddings(user_id, sections: dict, base_dir="resume_vectors", model_name=DEFAULT_EMBEDDING_MODEL):
+    """
+    Embeds the searchable sections and writes the sections and embeddings into the
+    user's bundle file, replacing the previous one atomically.
+    The new chunks are diffed against the stored bundle section by section, chunk by
+    chunk: unchanged chunks keep their stored vectors (also when they moved to another
+    section), only added or edited chunks are embedded, in one batch.
+    The user's BM25 index over the same chunks is rebuilt next to it.
+    Returns (user_dir, {"reused": n, "embedded": n}).
+    """
+    user_dir = user_vector_dir(user_id, base_dir)
+    stored = load_stored_chunks(user_dir, model_name)
+    stored_anywhere = {text: row for chunks in stored.values() for text, row in chunks.items()}
+
+    # Collect texts of every searchable section, splitting them into reused and new chunks
+    section_texts_map = {}
+    reused_rows = {}
+    new_texts = {}
+    for section_name, content in sections.items():
+        if not is_embedded_section(section_name):
+            continue
 
+        texts_to_embed = section_texts(content)
         if not texts_to_embed:
             print(f"No texts to embed in section {section_name}, skipping.")
             continue
+        section_texts_map[section_name] = texts_to_embed
+
+        same_section = stored.get(section_name, {})
+        for idx, text in enumerate(texts_to_embed):
+            row = same_section.get(text)
+            if row is None:
+                row = stored_anywhere.get(text)
+            if row is None:
+                new_texts.setdefault(section_name, []).append((idx, text))
+            else:
+                reused_rows[(section_name, idx)] = row
 
-        # Generate embeddings
-        embeddings = embedder.encode(texts_to_embed, convert_to_numpy=True)
-
-        # Save embeddings as .npy file
-        npy_path = os.path.join(user_dir, f"{section_name}.npy")
-
-        try:
-            np.save(npy_path, embeddings)
-            print(f"Saved embeddings for section {section_name} at {npy_path}")
-        except Exception as e:
-            print(f"Error saving embeddings for section {section_name}: {str(e)}")
-
-    print(f"All section embeddings created in {user_dir}")
-    return user_dir
+    # Embed only the added or changed chunks, all sections in a single encode call
+    new_embeddings = {}
+    if new_texts:
+        new_embeddings = encode_sections(
+            {name: [text for _, text in items] for name, items in new_texts.items()}, model_name
+        )
+    for name, items in new_texts.items():
+        for (idx, _), row in zip(items, normalize_rows(new_embeddings[name])):
+            reused_rows.setdefault((name, idx), row)
+
+    # Vectors are stored pre-normalized so search is a plain matmul
+    normalized_embeddings = {
+        name: np.vstack([reused_rows[(name, idx)] for idx in range(len(texts))]).astype(np.float32)
+        for name, texts in section_texts_map.items()
+    }
+    path = write_bundle(bundle_path(user_dir), sections, normalized_embeddings, model_name, normalized=True)
+
+    embedded = sum(len(items) for items in new_texts.values())
+    stats = {"reused": sum(len(texts) for texts in section_texts_map.values()) - embedded, "embedded": embedded}
+    print(f"Saved {len(normalized_embeddings)} section embeddings in {path} "
+          f"({stats['reused']} chunks reused, {stats['embedded']} embedded)")
+    print(f"Saved BM25 index in {write_lexical_index(user_dir, open_bundle(user_dir))}")
+    return user_dir, stats
+
+
+def index_resume_vectors(user_id: int, vector_folder: str) -> str:
+    """
+    Replaces the user's chunks in the shared FAISS index with the rows of their bundle
+    (skipped unless RELEVANCE_BACKEND is "faiss": nothing else reads the index).
+    Returns the id base of the user's vectors, stored as VectorMeta.faiss_vector_id.
+    """
+    if RELEVANCE_BACKEND != "faiss":
+        return str(user_id_base(user_id))
+    added = get_resume_index().upsert_user(user_id, open_bundle(vector_folder))
+    print(f"Indexed {added} resume chunks for user {user_id}")
+    return str(user_id_base(user_id))
 
 
-def update_resume_record(db: Session, user_email: str, filename: str, file_path: str) -> Resume:
+def update_resume_record(db: Session, user_email: str, filename: str, file_path: str, content_hash: str = None,
+                         user_id: int = None) -> Resume:
     """
     Adds or updates a resume record for the given user email.
-    Only one resume per user is allowed.
+    Only one resume per user is allowed; user_id, when known, saves the user lookup.
     Returns the Resume object.
     """
-    user = db.query(User).filter(User.email == user_email).first()
-    if not user:
-        raise ValueError("User not found")
+    if user_id is None:
+        user = db.query(User).filter(User.email == user_email).first()
+        if not user:
+            raise ValueError("User not found")
+        user_id = user.user_id
 
-    resume = db.query(Resume).filter(Resume.user_id == user.user_id).first()
+    resume = db.query(Resume).filter(Resume.user_id == user_id).first()
     if resume:
         resume.filename = filename
         resume.file_path = file_path
+        resume.content_hash = content_hash
         resume.uploaded_at = datetime.datetime.utcnow()
     else:
         resume = Resume(
-            user_id=user.user_id,
+            user_id=user_id,
             filename=filename,
             file_path=file_path,
+            content_hash=content_hash,
             uploaded_at=datetime.datetime.utcnow()
         )
         db.add(resume)
@@ -329,18 +488,22 @@ def update_resume_record(db: Session, user_email: str, filename: str, file_path:
     return resume
 
 
-def update_vector_meta_record(db: Session, user_email: str, resume_id: int, faiss_vector_id: str = None, vector_folder_path: str = None) -> VectorMeta:
+def update_vector_meta_record(db: Session, user_email: str, resume_id: int, faiss_vector_id: str = None, vector_folder_path: str = None,
+                              user_id: int = None) -> VectorMeta:
     """
     Adds or updates a vector_meta record for the user and resume.
     Generates a new faiss_vector_id if not provided and creates if not found.
+    user_id, when known, saves the user lookup.
     Returns the VectorMeta object.
     """
-    user = db.query(User).filter(User.email == user_email).first()
-    if not user:
-        raise ValueError("User not found")
+    if user_id is None:
+        user = db.query(User).filter(User.email == user_email).first()
+        if not user:
+            raise ValueError("User not found")
+        user_id = user.user_id
 
     vector_meta = db.query(VectorMeta).filter(
-        VectorMeta.user_id == user.user_id,
+        VectorMeta.user_id == user_id,
         VectorMeta.resume_id == resume_id
     ).first()
 
@@ -354,7 +517,7 @@ def update_vector_meta_record(db: Session, user_email: str, resume_id: int, fais
         if not faiss_vector_id:
             faiss_vector_id = str(uuid.uuid4())
         vector_meta = VectorMeta(
-            user_id=user.user_id,
+            user_id=user_id,
             resume_id=resume_id,
             faiss_vector_id=faiss_vector_id,
             vector_folder_path=vector_folder_path,
@@ -364,5 +527,8 @@ def update_vector_meta_record(db: Session, user_email: str, resume_id: int, fais
 
     db.commit()
     db.refresh(vector_meta)
+
+    # The user's cached resume vectors in this worker are stale now
+    get_resume_cache().invalidate(user_email)
     return vector_meta
 
@@ -0,0 +1,212 @@
+import os
+import json
+import uuid
+import struct
+import hashlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.vector_quantization import quantize_embeddings, dequantize_embeddings, EMBEDDING_STORAGE_DTYPE
+from app.utils.search_engine import normalize_rows
+
+# Single file holding every section of a user's resume (chunks + embedding matrix)
+BUNDLE_FILENAME = "resume.bundle"
+
+# File layout:
+#   8 bytes   magic
+#   8 bytes   little-endian header length
+#   header    UTF-8 JSON (section row ranges, dtype, dim, offsets)
+#   content   UTF-8 JSON {section_name: content}, read only when content is asked for
+#   padding   up to a 64 byte boundary
+#   matrix    rows x dim embeddings in the storage dtype
+#   scales    rows float32 per-row scales (int8 storage only)
+BUNDLE_MAGIC = b"SPBNDL01"
+_ALIGNMENT = 64
+
+
+def shard_dir(base_dir: str, key: str) -> str:
+    """
+    Sharded folder for a user/document key: base_dir/ab/cd/key, where abcd are
+    the first hex digits of sha1(key). Keeps any single directory small.
+    """
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(base_dir, digest[:2], digest[2:4], key)
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def write_bundle(
+    path: str,
+    sections: Dict[str, object],
+    section_embeddings: Dict[str, np.ndarray],
+    model_name: str,
+    mode: str = EMBEDDING_STORAGE_DTYPE,
+    normalized: bool = False,
+) -> str:
+    """
+    Writes all sections and their embeddings into one bundle file.
+    sections: {section_name: section content as stored/returned to clients}
+    section_embeddings: {section_name: (n_chunks, dim) float32}, only for embedded sections
+    normalized: True when the rows are already L2-normalized (lets search skip the norms)
+    The file is written next to its destination and renamed into place, so readers
+    never observe a partially written bundle.
+    """
+    matrices = []
+    section_meta = {}
+    row = 0
+    dim = 0
+    for name, content in sections.items():
+        embeddings = section_embeddings.get(name)
+        count = 0 if embeddings is None else len(embeddings)
+        section_meta[name] = {"row_start": row, "row_count": count}
+        if count:
+            matrices.append(np.asarray(embeddings, dtype=np.float32))
+            dim = embeddings.shape[1]
+            row += count
+
+    matrix = np.vstack(matrices) if matrices else np.zeros((0, dim), dtype=np.float32)
+    data, scales = quantize_embeddings(matrix, mode)
+
+    content_bytes = json.dumps(sections, ensure_ascii=False).encode("utf-8")
+    header = {
+        "version": 2,
+        "model_name": model_name,
+        "dtype": str(data.dtype),
+        "rows": int(row),
+        "dim": int(dim),
+        "normalized": bool(normalized),
+        "sections": section_meta,
+    }
+    # Offsets depend on header size, which depends on the offsets: size the header first
+    header["content_length"] = len(content_bytes)
+    header["matrix_offset"] = 0
+    header["scales_offset"] = None
+    probe = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    matrix_offset = _align(16 + len(probe) + 64 + len(content_bytes))
+    scales_offset = _align(matrix_offset + data.nbytes) if scales is not None else None
+    header["matrix_offset"] = matrix_offset
+    header["scales_offset"] = scales_offset
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(BUNDLE_MAGIC)
+            f.write(struct.pack("<Q", len(header_bytes)))
+            f.write(header_bytes)
+            f.write(content_bytes)
+            f.write(b"\0" * (matrix_offset - f.tell()))
+            f.write(np.ascontiguousarray(data).tobytes())
+            if scales is not None:
+                f.write(b"\0" * (scales_offset - f.tell()))
+                f.write(np.ascontiguousarray(scales, dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+class VectorBundle:
+    """
+    Read-only view of a bundle file. The embedding matrix is memory-mapped and the
+    section content is only read when asked for, so opening a bundle reads the small
+    JSON header (row ranges, offsets). Version 1 bundles keep content in the header.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic = f.read(8)
+            if magic != BUNDLE_MAGIC:
+                raise ValueError(f"Not a vector bundle: {path}")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            self.header = json.loads(f.read(header_len).decode("utf-8"))
+        self._content_offset = 16 + header_len
+        self._content: Optional[Dict[str, object]] = None
+
+        self.model_name: str = self.header["model_name"]
+        self.dim: int = self.header["dim"]
+        self.rows: int = self.header["rows"]
+        self.dtype = np.dtype(self.header["dtype"])
+        self.normalized: bool = self.header.get("normalized", False)
+        self.sections: Dict[str, dict] = self.header["sections"]
+
+        if self.rows:
+            self.matrix = np.memmap(path, dtype=self.dtype, mode="r",
+                                    offset=self.header["matrix_offset"], shape=(self.rows, self.dim))
+        else:
+            self.matrix = np.zeros((0, self.dim), dtype=self.dtype)
+
+        if self.header.get("scales_offset") is not None and self.rows:
+            self.scales = np.memmap(path, dtype=np.float32, mode="r",
+                                    offset=self.header["scales_offset"], shape=(self.rows,))
+        else:
+            self.scales = None
+
+    @property
+    def section_names(self) -> List[str]:
+        return list(self.sections.keys())
+
+    def _load_content(self) -> Dict[str, object]:
+        if self._content is None:
+            if "content_length" in self.header:
+                with open(self.path, "rb") as f:
+                    f.seek(self._content_offset)
+                    self._content = json.loads(f.read(self.header["content_length"]).decode("utf-8"))
+            else:
+                self._content = {name: meta["content"] for name, meta in self.sections.items()}
+        return self._content
+
+    def section_content(self, name: str, default=None):
+        """Section content as it was extracted (list of strings, list of dicts or string)."""
+        if name not in self.sections:
+            return default
+        return self._load_content().get(name, default)
+
+    def has_embeddings(self, name: str) -> bool:
+        meta = self.sections.get(name)
+        return bool(meta and meta["row_count"])
+
+    def section_matrix(self, name: str) -> np.ndarray:
+        """Stored (float32/float16/int8) embedding rows of a section, as a memory-mapped view."""
+        meta = self.sections[name]
+        return self.matrix[meta["row_start"]:meta["row_start"] + meta["row_count"]]
+
+    def section_scales(self, name: str) -> Optional[np.ndarray]:
+        if self.scales is None:
+            return None
+        meta = self.sections[name]
+        return self.scales[meta["row_start"]:meta["row_start"] + meta["row_count"]]
+
+    def normalized_matrix(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        (rows, scales) of the whole matrix ready for search_engine.similarity_matrix:
+        the stored rows as is when they were normalized at write time,
+        otherwise normalized float32 copies.
+        """
+        if self.normalized:
+            return self.matrix, self.scales
+        rows = dequantize_embeddings(np.asarray(self.matrix), None if self.scales is None else np.asarray(self.scales))
+        return normalize_rows(rows), None
+
+    def to_sections_dict(self) -> Dict[str, object]:
+        content = self._load_content()
+        return {name: content.get(name) for name in self.sections}
+
+
+def bundle_path(folder: str) -> str:
+    return os.path.join(folder, BUNDLE_FILENAME)
+
+
+def open_bundle(folder: str) -> VectorBundle:
+    """Opens the bundle inside a user's vector folder. Raises FileNotFoundError if missing."""
+    path = bundle_path(folder)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Vector bundle not found: {path}")
+    return VectorBundle(path)
@@ -0,0 +1,39 @@
+import os
+from typing import Optional, Tuple
+import numpy as np
+
+# Storage mode for saved embeddings: "float32" (default), "float16" or "int8" (per-row scale)
+EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32").lower()
+
+STORAGE_MODES = ("float32", "float16", "int8")
+
+
+def quantize_embeddings(embeddings: np.ndarray, mode: str = EMBEDDING_STORAGE_DTYPE) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Converts float32 embeddings to the storage dtype.
+    Returns (data, scales); scales is a (n,) float32 array for int8 and None otherwise.
+    int8 uses symmetric per-row scaling: row ~= data * scale, scale = max|row| / 127.
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown embedding storage mode: {mode}")
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if mode == "float32":
+        return embeddings, None
+    if mode == "float16":
+        return embeddings.astype(np.float16), None
+
+    if embeddings.ndim == 1:
+        embeddings = embeddings.reshape(1, -1)
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    data = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+    return data, scales.astype(np.float32)
+
+
+def dequantize_embeddings(data: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """Returns float32 embeddings from stored data (and per-row scales for int8)."""
+    if scales is not None:
+        return data.astype(np.float32) * scales.reshape(-1, 1)
+    return data.astype(np.float32, copy=False)
+
@@ -0,0 +1,10 @@
+# Run from smartPitchBackend/: pip install -r requirements.txt -r requirements-dev.txt, then python -m pytest tests
+# Settings are read at import time, so they are fixed here before any app module is imported:
+# no LLM cache on disk, no speculative drafts in the background, CPU work on the I/O threads.
+import os
+
+os.environ.setdefault("COHERE_API_KEY", "test-key")
+os.environ["LLM_CACHE"] = "0"
+os.environ["SPECULATIVE_DRAFTS"] = "0"
+os.environ["EXECUTOR_CPU_WORKERS"] = "0"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
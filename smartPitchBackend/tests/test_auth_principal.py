@@ -0,0 +1,113 @@
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base, get_db
+from app.models import User
+from app.routers import draft_email
+from app.utils import auth_principal, draft_email_utils
+from app.utils.auth_handler import create_access_token
+from app.utils.auth_principal import Principal, PrincipalCache
+
+USER_EMAIL = "candidate@example.com"
+
+
+def principal(user_id: int = 1, email: str = USER_EMAIL) -> Principal:
+    return Principal(user_id=user_id, email=email, resume_id=10, vector_id=20, vector_folder_path="vectors/x")
+
+
+def test_principal_cache_get_put():
+    cache = PrincipalCache(max_entries=10, ttl=60)
+    assert cache.get("token") is None
+    cache.put("token", principal(), time.time() + 3600)
+    assert cache.get("token").email == USER_EMAIL
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_principal_cache_expires_with_token_or_ttl():
+    cache = PrincipalCache(max_entries=10, ttl=60)
+    cache.put("expired-token", principal(), time.time() - 1)
+    assert cache.get("expired-token") is None
+    assert cache.stats()["entries"] == 0
+
+    short_ttl = PrincipalCache(max_entries=10, ttl=0)
+    short_ttl.put("token", principal(), time.time() + 3600)
+    time.sleep(0.01)
+    assert short_ttl.get("token") is None
+
+
+def test_principal_cache_evicts_least_recently_used():
+    cache = PrincipalCache(max_entries=2, ttl=60)
+    expires = time.time() + 3600
+    cache.put("a", principal(1, "a@example.com"), expires)
+    cache.put("b", principal(2, "b@example.com"), expires)
+    assert cache.get("a") is not None
+    cache.put("c", principal(3, "c@example.com"), expires)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_principal_cache_invalidate_user():
+    cache = PrincipalCache(max_entries=10, ttl=60)
+    expires = time.time() + 3600
+    cache.put("laptop", principal(1), expires)
+    cache.put("phone", principal(1), expires)
+    cache.put("other", principal(2, "other@example.com"), expires)
+    cache.invalidate_user(1)
+    assert cache.get("laptop") is None and cache.get("phone") is None
+    assert cache.get("other") is not None
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session.add(User(user_id=1, email=USER_EMAIL, hashed_password="x"))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db_session, monkeypatch):
+    # The real get_current_principal: only the DB session and the LLM are replaced
+    app = FastAPI()
+    app.include_router(draft_email.router, prefix="/upload")
+    app.dependency_overrides[get_db] = lambda: db_session
+    monkeypatch.setattr(auth_principal, "_cache", PrincipalCache())
+    monkeypatch.setattr(draft_email_utils, "get_resume_vector_folder", lambda user_email, db_session: "/tmp/vectors")
+    monkeypatch.setattr(draft_email_utils, "load_resume_header_json", lambda folder: [])
+    monkeypatch.setattr(draft_email_utils, "chat", FakeListChatModel(responses=["Draft"]))
+    return TestClient(app)
+
+
+def draft_request() -> dict:
+    return {"jd_sections": {"job_title": ["Engineer"]}, "llm_relevance_summary": "Fit", "candidate_name": "Ada"}
+
+
+def test_route_resolves_principal_from_bearer_token(client):
+    token = create_access_token({"sub": USER_EMAIL, "user_id": 1})
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(2):
+        response = client.post("/upload/draft-email", json=draft_request(), headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"email_draft": "Draft"}
+    # The second request was served from the principal cache
+    stats = auth_principal.get_principal_cache().stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_route_rejects_bad_tokens(client):
+    response = client.post("/upload/draft-email", json=draft_request(), headers={"Authorization": "Bearer nonsense"})
+    assert response.status_code == 403
+
+    # A token whose user id now belongs to another email (id reused after a delete)
+    token = create_access_token({"sub": "deleted@example.com", "user_id": 1})
+    response = client.post("/upload/draft-email", json=draft_request(), headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
@@ -0,0 +1,88 @@
+import hashlib
+import numpy as np
+import pytest
+from app.utils import upload_utils
+from app.utils.search_engine import normalize_rows
+from app.utils.vector_bundle import open_bundle
+from app.utils.vector_quantization import dequantize_embeddings
+
+MODEL = "test-model"
+
+
+def fake_vector(text: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+    return np.random.default_rng(seed).normal(size=8).astype(np.float32)
+
+
+@pytest.fixture
+def encoded(monkeypatch):
+    """Replaces the embedding model with deterministic vectors and records what was encoded."""
+    calls = []
+
+    def encode_sections(sections, model_name):
+        calls.append({name: list(texts) for name, texts in sections.items()})
+        return {name: np.vstack([fake_vector(text) for text in texts]) for name, texts in sections.items()}
+
+    monkeypatch.setattr(upload_utils, "encode_sections", encode_sections)
+    return calls
+
+
+def resume(skills, experience, project_points):
+    return {
+        "header": ["Ada Lovelace", "ada@example.com"],
+        "skills": skills,
+        "experience": experience,
+        "projects": [{"name": "Engine", "points": project_points}],
+    }
+
+
+def stored_rows(user_dir: str, section: str) -> np.ndarray:
+    bundle = open_bundle(user_dir)
+    scales = bundle.section_scales(section)
+    return dequantize_embeddings(np.asarray(bundle.section_matrix(section)),
+                                 None if scales is None else np.asarray(scales))
+
+
+def test_first_upload_embeds_every_chunk(tmp_path, encoded):
+    _, stats = upload_utils.create_section_embeddings(
+        7, resume(["Python", "Docker"], ["Backend at Acme"], ["Built it"]), str(tmp_path), MODEL
+    )
+    assert stats == {"reused": 0, "embedded": 4}
+    # One encode call for all sections, the header is never embedded
+    assert encoded == [{"skills": ["Python", "Docker"], "experience": ["Backend at Acme"],
+                        "projects": ["Engine Built it"]}]
+
+
+def test_edited_resume_only_embeds_changed_chunks(tmp_path, encoded):
+    upload_utils.create_section_embeddings(
+        7, resume(["Python", "Docker"], ["Backend at Acme"], ["Built it"]), str(tmp_path), MODEL
+    )
+    # "Docker" moved from skills to experience, one skill added, the project edited
+    user_dir, stats = upload_utils.create_section_embeddings(
+        7, resume(["Python", "Rust"], ["Backend at Acme", "Docker"], ["Built it fast"]), str(tmp_path), MODEL
+    )
+    assert stats == {"reused": 3, "embedded": 2}
+    assert encoded[1] == {"skills": ["Rust"], "projects": ["Engine Built it fast"]}
+
+    # Reused rows land at their new positions with their original vectors
+    expected = normalize_rows(np.vstack([fake_vector("Backend at Acme"), fake_vector("Docker")]))
+    assert np.allclose(stored_rows(user_dir, "experience"), expected, atol=1e-2)
+    expected = normalize_rows(np.vstack([fake_vector("Python"), fake_vector("Rust")]))
+    assert np.allclose(stored_rows(user_dir, "skills"), expected, atol=1e-2)
+
+
+def test_unchanged_resume_embeds_nothing(tmp_path, encoded):
+    sections = resume(["Python", "Docker"], ["Backend at Acme"], ["Built it"])
+    upload_utils.create_section_embeddings(7, sections, str(tmp_path), MODEL)
+    _, stats = upload_utils.create_section_embeddings(7, sections, str(tmp_path), MODEL)
+    assert stats == {"reused": 4, "embedded": 0}
+    assert len(encoded) == 1
+
+
+def test_other_model_or_user_reuses_nothing(tmp_path, encoded):
+    sections = resume(["Python", "Docker"], ["Backend at Acme"], ["Built it"])
+    upload_utils.create_section_embeddings(7, sections, str(tmp_path), MODEL)
+    _, stats = upload_utils.create_section_embeddings(7, sections, str(tmp_path), "other-model")
+    assert stats == {"reused": 0, "embedded": 4}
+    _, stats = upload_utils.create_section_embeddings(8, sections, str(tmp_path), MODEL)
+    assert stats == {"reused": 0, "embedded": 4}
@@ -0,0 +1,65 @@
+import numpy as np
+from app.utils.embedding_cache import EmbeddingCache, cache_key
+
+MODEL = "test-model"
+
+
+def vectors(n: int, dim: int = 4) -> np.ndarray:
+    return np.arange(n * dim, dtype=np.float32).reshape(n, dim)
+
+
+def test_miss_then_memory_hit():
+    cache = EmbeddingCache(max_entries=10, db_path=None)
+    found, missing = cache.get_many(MODEL, ["python", "docker"])
+    assert found == {} and missing == [0, 1]
+
+    cache.put_many(MODEL, ["python", "docker"], vectors(2))
+    found, missing = cache.get_many(MODEL, ["docker", "kubernetes", "python"])
+    assert missing == [1]
+    assert np.array_equal(found[0], vectors(2)[1])
+    assert np.array_equal(found[2], vectors(2)[0])
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2 and stats["disk_hits"] == 0 and stats["misses"] == 3
+    assert stats["hit_rate"] == 0.4
+
+
+def test_keys_ignore_whitespace_and_unicode_form_but_not_model():
+    assert cache_key(MODEL, "  Built   a\nservice ") == cache_key(MODEL, "Built a service")
+    assert cache_key(MODEL, "ﬁle") == cache_key(MODEL, "file")
+    assert cache_key(MODEL, "python") != cache_key("other-model", "python")
+
+    cache = EmbeddingCache(max_entries=10, db_path=None)
+    cache.put_many(MODEL, ["Built a service"], vectors(1))
+    found, missing = cache.get_many(MODEL, ["Built  a service"])
+    assert missing == [] and 0 in found
+    _, missing = cache.get_many("other-model", ["Built a service"])
+    assert missing == [0]
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2, db_path=None)
+    cache.put_many(MODEL, ["a", "b"], vectors(2))
+    cache.get_many(MODEL, ["a"])
+    cache.put_many(MODEL, ["c"], vectors(1))
+    _, missing = cache.get_many(MODEL, ["a", "b", "c"])
+    assert missing == [1]
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "embeddings.db")
+    EmbeddingCache(max_entries=10, db_path=db_path).put_many(MODEL, ["python", "docker"], vectors(2))
+
+    # A new process starts with an empty memory tier and reads from the SQLite file
+    restarted = EmbeddingCache(max_entries=10, db_path=db_path)
+    found, missing = restarted.get_many(MODEL, ["python", "docker", "python", "rust"])
+    assert missing == [3]
+    assert np.array_equal(found[0], vectors(2)[0]) and np.array_equal(found[2], vectors(2)[0])
+    assert np.array_equal(found[1], vectors(2)[1])
+    assert found[0].dtype == np.float32
+
+    # Disk hits are promoted into the memory tier
+    restarted.get_many(MODEL, ["docker"])
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 3 and stats["memory_hits"] == 1 and stats["misses"] == 1
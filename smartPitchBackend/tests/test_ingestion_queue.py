@@ -0,0 +1,101 @@
+import time
+import threading
+import pytest
+from app.utils import ingestion_queue
+from app.utils.ingestion_queue import IngestionQueue, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return IngestionQueue(str(tmp_path / "jobs.db"))
+
+
+@pytest.fixture
+def staged(tmp_path):
+    path = tmp_path / "staged.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    return path
+
+
+def expire_lease(queue: IngestionQueue, job_id: str):
+    queue._conn().execute("UPDATE ingestion_jobs SET lease_until = ? WHERE id = ?", (time.time() - 1, job_id))
+
+
+def test_failed_job_is_retried_with_backoff(queue, staged):
+    job_id = queue.enqueue("a@example.com", {"staged_path": str(staged)}, max_attempts=2)
+    job = queue.claim()
+    assert job["id"] == job_id and job["attempts"] == 1
+
+    assert queue.fail(job, "boom", backoff=60)
+    assert queue.get(job_id)["status"] == STATUS_QUEUED
+    # Not due before its backoff
+    assert queue.claim() is None
+    assert staged.exists()
+
+
+def test_last_failure_marks_failed_and_discards_staged_upload(queue, staged):
+    job_id = queue.enqueue("a@example.com", {"staged_path": str(staged)}, max_attempts=1)
+    job = queue.claim()
+    assert not queue.fail(job, "boom")
+    assert queue.get(job_id)["status"] == STATUS_FAILED
+    assert not staged.exists()
+
+
+def test_expired_lease_is_reclaimed_while_attempts_remain(queue, staged):
+    job_id = queue.enqueue("a@example.com", {"staged_path": str(staged)}, max_attempts=2)
+    queue.claim()
+    expire_lease(queue, job_id)
+
+    job = queue.claim()
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert queue.get(job_id)["status"] == STATUS_RUNNING
+
+
+def test_expired_lease_on_last_attempt_fails_the_job(queue, staged):
+    job_id = queue.enqueue("a@example.com", {"staged_path": str(staged)}, max_attempts=1)
+    queue.claim()
+    expire_lease(queue, job_id)
+
+    # A worker that died on the last attempt does not get the job leased forever
+    assert queue.claim() is None
+    job = queue.get(job_id)
+    assert job["status"] == STATUS_FAILED
+    assert "Lease expired" in job["error"]
+    assert not staged.exists()
+
+
+class FakeProcess:
+    def __init__(self, name: str, alive: bool = True):
+        self.name = name
+        self.alive = alive
+        self.exitcode = None if alive else -9
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+
+def test_monitor_respawns_dead_workers(monkeypatch):
+    spawned = []
+
+    def spawn(context, idx):
+        spawned.append(idx)
+        return FakeProcess(f"ingestion-{idx}")
+
+    stop_event = threading.Event()
+    monkeypatch.setattr(ingestion_queue, "_processes", [FakeProcess("ingestion-0"), FakeProcess("ingestion-1", False)])
+    monkeypatch.setattr(ingestion_queue, "_stop_event", stop_event)
+    monkeypatch.setattr(ingestion_queue, "_worker_restarts", 0)
+    monkeypatch.setattr(ingestion_queue, "_spawn_worker", spawn)
+    monkeypatch.setattr(ingestion_queue, "INGESTION_MONITOR_INTERVAL", 0.01)
+    assert ingestion_queue.get_worker_stats() == {"workers_alive": 1, "worker_restarts": 0}
+
+    monitor = threading.Thread(target=ingestion_queue._monitor_workers, args=(None,))
+    monitor.start()
+    deadline = time.time() + 5
+    while not spawned and time.time() < deadline:
+        time.sleep(0.01)
+    stop_event.set()
+    monitor.join(5)
+
+    assert spawned == [1]
+    assert ingestion_queue.get_worker_stats() == {"workers_alive": 2, "worker_restarts": 1}
@@ -0,0 +1,44 @@
+import json
+import numpy as np
+from app.utils.legacy_vectors import LEGACY_EMBEDDING_MODEL, has_legacy_vectors, migrate_legacy_folder
+from app.utils.vector_bundle import open_bundle
+from app.utils.vector_quantization import dequantize_embeddings
+
+
+def write_section(folder, name, content, embeddings=None):
+    (folder / f"{name}.json").write_text(json.dumps(content), encoding="utf-8")
+    if embeddings is not None:
+        np.save(folder / f"{name}.npy", embeddings)
+
+
+def test_migrates_per_section_files_into_a_bundle(tmp_path):
+    rng = np.random.default_rng(0)
+    skills = rng.normal(size=(2, 384)).astype(np.float32)
+    projects = rng.normal(size=(1, 384)).astype(np.float32)
+    write_section(tmp_path, "header", ["Ada Lovelace", "ada@example.com"], rng.normal(size=(2, 384)))
+    write_section(tmp_path, "skills", ["Python", "Docker"], skills)
+    write_section(tmp_path, "projects", [{"name": "Engine", "points": ["Built it"]}], projects)
+    write_section(tmp_path, "education", ["BSc"], rng.normal(size=(3, 384)))  # rows do not match the chunks
+    assert has_legacy_vectors(str(tmp_path))
+
+    assert migrate_legacy_folder(str(tmp_path))
+    assert not has_legacy_vectors(str(tmp_path))
+
+    bundle = open_bundle(str(tmp_path))
+    assert bundle.model_name == LEGACY_EMBEDDING_MODEL
+    assert bundle.section_content("header") == ["Ada Lovelace", "ada@example.com"]
+    assert bundle.section_content("projects") == [{"name": "Engine", "points": ["Built it"]}]
+    assert not bundle.has_embeddings("header")
+    assert not bundle.has_embeddings("education")
+    assert bundle.has_embeddings("skills") and bundle.has_embeddings("projects")
+
+    scales = bundle.section_scales("skills")
+    stored = dequantize_embeddings(np.asarray(bundle.section_matrix("skills")),
+                                   None if scales is None else np.asarray(scales))
+    expected = skills / np.linalg.norm(skills, axis=1, keepdims=True)
+    assert np.allclose(stored, expected, atol=1e-2)
+
+
+def test_empty_folder_is_not_legacy(tmp_path):
+    assert not has_legacy_vectors(str(tmp_path))
+    assert migrate_legacy_folder(str(tmp_path)) is None
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from app.utils.lexical_index import LexicalIndex, load_lexical_index, lexical_path, tokenize, write_lexical_index
+from app.utils.search_engine import fuse_scores
+from app.utils.vector_bundle import bundle_path, open_bundle, write_bundle
+
+CHUNKS = [
+    "Built trading engines in C++ and Python.",
+    "Wrote REST services with Node.js and Express",
+    "Set up CI/CD pipelines; some C and C# tooling",
+]
+
+
+def test_tokenize_keeps_skill_names_whole():
+    assert tokenize("C++, Node.js and C#.") == ["c++", "node.js", "and", "c#"]
+    assert tokenize("CI/CD pipelines.") == ["ci/cd", "pipelines"]
+    # Trailing punctuation is not part of the term
+    assert tokenize("Python. Docker- (AWS)") == ["python", "docker", "aws"]
+
+
+def test_skill_queries_match_only_their_chunk():
+    index = LexicalIndex.build(CHUNKS)
+    scores = index.score_matrix(["c++", "node.js", "c", "golang"])
+    assert scores.shape == (4, len(CHUNKS))
+    assert np.argmax(scores[0]) == 0 and np.count_nonzero(scores[0]) == 1
+    assert np.argmax(scores[1]) == 1 and np.count_nonzero(scores[1]) == 1
+    # "c" does not match "c++" or "c#"
+    assert np.argmax(scores[2]) == 2 and np.count_nonzero(scores[2]) == 1
+    assert not scores[3].any()
+    # Normalized rows peak at 1
+    assert scores[0].max() == pytest.approx(1.0)
+
+
+def test_rarer_terms_weigh_more():
+    index = LexicalIndex.build(["python docker", "python kubernetes", "python terraform"])
+    raw = index.score_matrix(["python", "docker"], normalize=False)
+    assert raw[1, 0] > raw[0, 0] > 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = LexicalIndex.build(CHUNKS)
+    loaded = LexicalIndex.load(index.save(str(tmp_path / "resume.bm25.npz")))
+    assert loaded.rows == index.rows and loaded.source_hash == index.source_hash
+    queries = ["c++ python", "node.js", "ci/cd"]
+    assert np.allclose(loaded.score_matrix(queries), index.score_matrix(queries))
+
+
+def test_stale_index_is_rebuilt_from_the_bundle(tmp_path):
+    folder = str(tmp_path)
+    embeddings = {"skills": np.eye(3, 4, dtype=np.float32)}
+    write_bundle(bundle_path(folder), {"skills": ["C++", "Python", "Go"]}, embeddings, "test-model")
+    write_lexical_index(folder, open_bundle(folder))
+    assert np.argmax(load_lexical_index(folder, open_bundle(folder)).score_matrix(["c++"])[0]) == 0
+
+    # Re-upload with the skills reordered but the old index file left behind
+    write_bundle(bundle_path(folder), {"skills": ["Go", "Python", "C++"]}, embeddings, "test-model")
+    index = load_lexical_index(folder, open_bundle(folder))
+    assert np.argmax(index.score_matrix(["c++"])[0]) == 2
+    assert LexicalIndex.load(lexical_path(folder)).source_hash != index.source_hash
+
+
+def test_fusion_ordering():
+    dense = np.array([0.9, 0.8, 0.1], dtype=np.float32)
+    lexical = np.array([0.0, 1.0, 0.5], dtype=np.float32)
+
+    assert fuse_scores(dense, None, "weighted") is dense
+    assert fuse_scores(dense, lexical, "none") is dense
+
+    # The exact keyword match lifts row 1 above the slightly closer dense match
+    weighted = fuse_scores(dense, lexical, "weighted", weight=0.3)
+    assert np.allclose(weighted, [0.63, 0.86, 0.22])
+    assert list(np.argsort(-weighted)) == [1, 0, 2]
+    assert list(np.argsort(-fuse_scores(dense, lexical, "weighted", weight=0.0))) == [0, 1, 2]
+
+    rrf = fuse_scores(dense, lexical, "rrf", rrf_k=60)
+    assert rrf[1] == pytest.approx(1 / 62 + 1 / 61)
+    assert list(np.argsort(-rrf)) == [1, 0, 2]
+
+    with pytest.raises(ValueError):
+        fuse_scores(dense, lexical, "sum")
@@ -0,0 +1,182 @@
+import json
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langchain_core.language_models.fake_chat_models import FakeListChatModel, GenericFakeChatModel
+from app.database import get_db
+from app.routers import upload_jd, draft_email
+from app.utils import upload_jd_utils, draft_email_utils
+from app.utils.auth_principal import Principal, get_current_principal
+
+USER_EMAIL = "candidate@example.com"
+SUMMARY = "Strong fit: Python and FastAPI match the required skills."
+DRAFT = "Subject: Application\n\nDear hiring team, I am applying for the role.\n\nRegards"
+
+JD_SECTIONS = {
+    "job_title": ["Backend Engineer"],
+    "required_skills": ["Python", "FastAPI"],
+}
+RELEVANCE_RESULTS = {
+    "required_skills": {
+        "skills": [
+            {"chunk": "Python, FastAPI, SQLAlchemy", "score": 0.82},
+            {"chunk": "Docker", "score": 0.41},
+        ],
+    },
+}
+SCORED = {
+    "relevance_results": RELEVANCE_RESULTS,
+    "match_score": 0.78,
+    "jd_point_scores": [{"section": "required_skills", "point": "Python", "score": 0.82}],
+}
+
+
+def streaming_model(text: str) -> GenericFakeChatModel:
+    """Fake chat model streaming text in several chunks (split on whitespace)."""
+    return GenericFakeChatModel(messages=iter([AIMessage(content=text)]))
+
+
+@pytest.fixture
+def resume_header(monkeypatch):
+    # No resume on disk: the vector folder lookup and the header are canned
+    monkeypatch.setattr(draft_email_utils, "get_resume_vector_folder", lambda user_email, db_session: "/tmp/vectors")
+    monkeypatch.setattr(draft_email_utils, "load_resume_header_json",
+                        lambda folder: ["Ada Lovelace", USER_EMAIL, "555-0100", "https://github.com/ada"])
+
+
+@pytest.fixture
+def client(monkeypatch, resume_header):
+    app = FastAPI()
+    app.include_router(upload_jd.router, prefix="/upload")
+    app.include_router(draft_email.router, prefix="/upload")
+    app.dependency_overrides[get_current_principal] = lambda: Principal(user_id=1, email=USER_EMAIL)
+    app.dependency_overrides[get_db] = lambda: None
+
+    # No embedding model: JD preparation and the search are canned
+    monkeypatch.setattr(upload_jd, "prepare_jd", lambda jd_text: (JD_SECTIONS, {}, "jd-hash", False))
+    monkeypatch.setattr(upload_jd, "scored_relevance_search", lambda **kwargs: SCORED)
+    return TestClient(app)
+
+
+def test_job_relevance_uses_given_chat_model():
+    model = FakeListChatModel(responses=[SUMMARY])
+    assert upload_jd_utils.job_relevance(RELEVANCE_RESULTS, JD_SECTIONS, chat_model=model) == SUMMARY
+
+
+def test_job_relevance_prompt_lists_matches_and_jd():
+    messages = upload_jd_utils.job_relevance_messages(RELEVANCE_RESULTS, JD_SECTIONS)
+    assert len(messages) == 1
+    assert "Python, FastAPI, SQLAlchemy" in messages[0].content
+    assert "Backend Engineer" in messages[0].content
+
+
+def test_stream_job_relevance_yields_fragments():
+    async def collect():
+        model = streaming_model(SUMMARY)
+        return [text async for text in upload_jd_utils.stream_job_relevance(RELEVANCE_RESULTS, JD_SECTIONS,
+                                                                              chat_model=model)]
+
+    fragments = asyncio.run(collect())
+    assert len(fragments) > 1
+    assert "".join(fragments) == SUMMARY
+
+
+def test_drafting_email_named_parameters(resume_header):
+    model = FakeListChatModel(responses=[DRAFT])
+    draft = draft_email_utils.drafting_email(
+        JD_SECTIONS,
+        SUMMARY,
+        USER_EMAIL,
+        None,
+        email_length=80,
+        tone="Friendly",
+        closing="Best",
+        chat_model=model,
+    )
+    assert draft == DRAFT
+
+
+def test_upload_jd_json(client, monkeypatch):
+    monkeypatch.setattr(upload_jd_utils, "chat", FakeListChatModel(responses=[SUMMARY]))
+    response = client.post("/upload/jd", data={"jd_text": "Backend Engineer\nRequired skills: Python"})
+    assert response.status_code == 201
+    body = response.json()
+    assert body["llm_relevance_summary"] == SUMMARY
+    assert body["match_gate"]["decision"] == "llm"
+    assert body["relevance_results"] == RELEVANCE_RESULTS
+
+
+def test_upload_jd_ndjson_stream(client, monkeypatch):
+    monkeypatch.setattr(upload_jd_utils, "chat", streaming_model(SUMMARY))
+    response = client.post(
+        "/upload/jd",
+        data={"jd_text": "Backend Engineer\nRequired skills: Python"},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.status_code == 201
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    types = [event["type"] for event in events]
+    assert types[0] == "sections" and types[1] == "matches" and types[-1] == "done"
+    assert types.count("summary") > 1
+    assert events[0]["jd_sections"] == JD_SECTIONS
+    assert events[1]["match_score"] == SCORED["match_score"]
+    streamed = "".join(event["text"] for event in events if event["type"] == "summary")
+    assert streamed == SUMMARY
+    assert events[-1]["llm_relevance_summary"] == SUMMARY
+
+
+def test_upload_jd_ndjson_reports_llm_error(client, monkeypatch):
+    async def failing_stream(relevance_results, jd_sections):
+        yield "Partial"
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(upload_jd, "stream_job_relevance", failing_stream)
+    response = client.post(
+        "/upload/jd",
+        data={"jd_text": "Backend Engineer"},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    assert [event["type"] for event in events] == ["sections", "matches", "summary", "error"]
+    assert events[-1]["detail"] == "LLM unavailable"
+
+
+def parse_sse(text: str) -> list:
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def draft_request() -> dict:
+    return {
+        "jd_sections": JD_SECTIONS,
+        "llm_relevance_summary": SUMMARY,
+        "candidate_name": "Ada Lovelace",
+    }
+
+
+def test_draft_email_json(client, monkeypatch):
+    monkeypatch.setattr(draft_email_utils, "chat", FakeListChatModel(responses=[DRAFT]))
+    response = client.post("/upload/draft-email", json=draft_request())
+    assert response.status_code == 200
+    assert response.json() == {"email_draft": DRAFT}
+
+
+def test_draft_email_sse_stream(client, monkeypatch):
+    monkeypatch.setattr(draft_email_utils, "chat", streaming_model(DRAFT))
+    response = client.post("/upload/draft-email", json=draft_request(), headers={"Accept": "text/event-stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[-1] == "done"
+    assert names.count("token") > 1
+    assert "".join(data["text"] for name, data in events if name == "token") == DRAFT
+    assert events[-1][1]["email_draft"] == DRAFT
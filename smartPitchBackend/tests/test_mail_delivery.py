@@ -0,0 +1,116 @@
+import time
+import threading
+import pytest
+from app.utils import mail_delivery
+from app.utils.mail_delivery import MailDelivery, SMTPConnection, stop_mail_delivery
+from app.utils.smtp_standin import LocalSMTPServer
+
+SENDER = "noreply@smartpitch.local"
+
+
+def message(idx: int) -> str:
+    return f"Subject: Your SmartPitch OTP Code\r\n\r\nYour OTP code is: {idx:06d}\r\n"
+
+
+@pytest.fixture
+def server():
+    server = LocalSMTPServer().start()
+    yield server
+    server.stop()
+
+
+def connection_factory(port: int):
+    return lambda: SMTPConnection(host="127.0.0.1", port=port, username="", password="", starttls=False)
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_enqueue_delivers_over_persistent_sessions(server):
+    delivery = MailDelivery(pool_size=2, queue_size=100, connection_factory=connection_factory(server.port))
+    for idx in range(20):
+        assert delivery.enqueue(SENDER, [f"user{idx}@example.com"], message(idx))
+    delivery.join()
+    stats = delivery.stats()
+    delivery.stop()
+
+    assert stats["enqueued"] == 20 and stats["sent"] == 20 and stats["failed"] == 0
+    assert server.counters["messages"] == 20
+    # Sessions are reused: at most one per sender thread
+    assert server.counters["connections"] <= 2
+    recipients = sorted(recipient for _, recipients, _ in server.messages for recipient in recipients)
+    assert recipients == sorted(f"<user{idx}@example.com>" for idx in range(20))
+    assert b"Your OTP code is: 000007" in b"".join(data for _, _, data in server.messages)
+
+
+def test_reconnects_after_server_drops_session(server):
+    delivery = MailDelivery(pool_size=1, queue_size=10, connection_factory=connection_factory(server.port))
+    assert delivery.enqueue(SENDER, ["first@example.com"], message(1))
+    delivery.join()
+    assert server.drop_sessions() == 1
+    wait_for(lambda: server.drop_sessions() == 0)
+
+    assert delivery.enqueue(SENDER, ["second@example.com"], message(2))
+    delivery.join()
+    stats = delivery.stats()
+    delivery.stop()
+
+    assert stats["sent"] == 2 and stats["failed"] == 0
+    # The dropped session was reopened inside the same attempt, not via a retry
+    assert stats["retried"] == 0
+    assert stats["connects"] == 2
+    assert server.counters["messages"] == 2
+
+
+def test_full_queue_rejects(server):
+    picked_up = threading.Event()
+    release = threading.Event()
+
+    class BlockedConnection(SMTPConnection):
+        def send(self, from_addr, to_addrs, message):
+            picked_up.set()
+            release.wait(5)
+            super().send(from_addr, to_addrs, message)
+
+    delivery = MailDelivery(
+        pool_size=1,
+        queue_size=1,
+        connection_factory=lambda: BlockedConnection(host="127.0.0.1", port=server.port,
+                                                     username="", password="", starttls=False),
+    )
+    # The only sender holds the first message, the second fills the queue, the third is refused
+    assert delivery.enqueue(SENDER, ["a@example.com"], message(1))
+    assert picked_up.wait(5)
+    assert delivery.enqueue(SENDER, ["b@example.com"], message(2))
+    assert not delivery.enqueue(SENDER, ["c@example.com"], message(3))
+
+    release.set()
+    delivery.join()
+    stats = delivery.stats()
+    delivery.stop()
+
+    assert stats["enqueued"] == 2 and stats["rejected"] == 1 and stats["sent"] == 2
+    assert server.counters["messages"] == 2
+
+
+def test_stop_mail_delivery_drains_queue(monkeypatch):
+    server = LocalSMTPServer(message_delay=0.01).start()
+    try:
+        delivery = MailDelivery(pool_size=2, queue_size=100, connection_factory=connection_factory(server.port))
+        monkeypatch.setattr(mail_delivery, "_delivery", delivery)
+        for idx in range(30):
+            assert delivery.enqueue(SENDER, [f"user{idx}@example.com"], message(idx))
+
+        # Shutdown hook: everything queued before it is still sent, then the senders exit
+        stop_mail_delivery()
+
+        assert server.counters["messages"] == 30
+        assert delivery.stats()["sent"] == 30
+        assert delivery.stats()["queue_depth"] == 0
+        assert not delivery._threads
+    finally:
+        server.stop()
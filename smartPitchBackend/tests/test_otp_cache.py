@@ -0,0 +1,108 @@
+import pytest
+from app.utils import otp_cache
+from app.utils.otp_cache import BLOCK_DURATION, MAX_ATTEMPTS, OTP_EXPIRY, OTP_TOKEN_EXPIRY
+
+EMAIL = "candidate@example.com"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(otp_cache, "time", fake)
+    return fake
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        return otp_cache.MemoryOTPStore()
+    return otp_cache.SQLiteOTPStore(str(tmp_path / "otp.db"))
+
+
+def test_correct_otp_returns_a_token_once(store):
+    store.store_otp(EMAIL, "123456")
+    token = store.verify_otp(EMAIL, "123456")
+    assert token and store.is_otp_verified(EMAIL)
+    # The OTP itself cannot be replayed
+    assert store.verify_otp(EMAIL, "123456") is None
+
+
+def test_otp_expires(store, clock):
+    store.store_otp(EMAIL, "123456")
+    clock.advance(OTP_EXPIRY + 1)
+    assert store.verify_otp(EMAIL, "123456") is None
+
+
+def test_wrong_attempts_block_the_email(store, clock):
+    store.store_otp(EMAIL, "123456")
+    for _ in range(MAX_ATTEMPTS - 1):
+        assert store.verify_otp(EMAIL, "000000") is None
+        assert not store.is_blocked(EMAIL)
+    assert store.verify_otp(EMAIL, "000000") is None
+    assert store.is_blocked(EMAIL)
+    # Even the right OTP is refused while blocked
+    assert store.verify_otp(EMAIL, "123456") is None
+
+    clock.advance(BLOCK_DURATION + 1)
+    assert not store.is_blocked(EMAIL)
+    store.store_otp(EMAIL, "654321")
+    assert store.verify_otp(EMAIL, "654321")
+
+
+def test_new_otp_resets_attempts(store):
+    store.store_otp(EMAIL, "123456")
+    for _ in range(MAX_ATTEMPTS - 1):
+        store.verify_otp(EMAIL, "000000")
+    store.store_otp(EMAIL, "654321")
+    assert store.verify_otp(EMAIL, "000000") is None
+    assert not store.is_blocked(EMAIL)
+    assert store.verify_otp(EMAIL, "654321")
+
+
+def test_token_is_single_use(store):
+    store.store_otp(EMAIL, "123456")
+    token = store.verify_otp(EMAIL, "123456")
+    assert store.consume_token(token) == EMAIL
+    assert store.consume_token(token) is None
+    assert not store.is_otp_verified(EMAIL)
+    assert store.consume_token("unknown-token") is None
+
+
+def test_token_expires(store, clock):
+    store.store_otp(EMAIL, "123456")
+    token = store.verify_otp(EMAIL, "123456")
+    clock.advance(OTP_TOKEN_EXPIRY + 1)
+    assert not store.is_otp_verified(EMAIL)
+    assert store.consume_token(token) is None
+
+
+def test_new_otp_or_clear_revokes_the_token(store):
+    store.store_otp(EMAIL, "123456")
+    token = store.verify_otp(EMAIL, "123456")
+    store.store_otp(EMAIL, "654321")
+    assert store.consume_token(token) is None
+
+    token = store.verify_otp(EMAIL, "654321")
+    store.clear_otp_verified(EMAIL)
+    assert store.consume_token(token) is None
+
+
+def test_expired_records_are_dropped(store, clock):
+    store.store_otp(EMAIL, "123456")
+    store.store_otp("other@example.com", "123456")
+    assert store.stats()["records"] == 2
+    clock.advance(OTP_EXPIRY + 1)
+    # Expired records are evicted on the next write
+    store.store_otp("new@example.com", "123456")
+    assert store.stats()["records"] == 1
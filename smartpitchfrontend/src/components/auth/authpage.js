@@ -10,6 +10,7 @@ export default function AuthPage() {
   const [otp, setOtp] = useState("");
   const [otpSent, setOtpSent] = useState(false);
   const [otpVerified, setOtpVerified] = useState(false);
+  const [verificationToken, setVerificationToken] = useState("");
   const [password, setPassword] = useState("");
   const [confirmPassword, setConfirmPassword] = useState("");
   const [message, setMessage] = useState("");
@@ -186,6 +187,8 @@ export default function AuthPage() {
       body: JSON.stringify({ email, otp }),
     });
     if (res.ok) {
+      const data = await res.json();
+      setVerificationToken(data.verification_token);
       setOtpVerified(true);
       setMessage("OTP verified! Please set your password.");
     } else {
@@ -205,12 +208,17 @@ export default function AuthPage() {
     const res = await fetch("http://localhost:8000/auth/set-password", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ password, confirm_password: confirmPassword }),
+      body: JSON.stringify({
+        verification_token: verificationToken,
+        password,
+        confirm_password: confirmPassword,
+      }),
     });
     if (res.ok) {
       setMessage("Account created successfully! You can now login.");
       setOtpSent(false);
       setOtpVerified(false);
+      setVerificationToken("");
       setEmail("");
       setOtp("");
       setPassword("");